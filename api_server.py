@@ -0,0 +1,512 @@
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+import mimetypes
+from collections import OrderedDict, deque
+from http import HTTPStatus
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+import numpy as np
+from asset_pack import NODATA, asset_name, get_asset_pack, icon_key, image_key
+from batch_calc import process_chunk, process_record
+from damage import all_types
+from data_store import get_store
+from query_engine import QuerySyntaxError, get_query_engine
+from search_index import split_abilities
+from similarity_index import get_similarity_index
+from instrumentation import span
+
+# Local JSON API
+# Serves the Pokédex and the damage calculator over HTTP/1.1 without Qt, for
+# the web front end and bots:
+#     GET  /health
+#     GET  /types                          type names with their icon URLs
+#     GET  /search?q=...&limit=&offset=    same query syntax as the Pokédex
+#     GET  /pokemon/<name>                 full entry with asset URLs
+#     GET  /pokemon/<name>/similar?k=      "plays like" neighbours
+#     GET  /damage?attack_type=&defender=&attacker=&base_damage=...
+#     POST /damage/batch                   JSON array (or JSON lines) of matchups
+#     GET  /assets/<name>                  sprites, radar charts, type icons
+# Matchups take the fields batch_calc.py reads. The indexes come from the
+# process-wide data store, so they are built once and shared by every request.
+# Entry and damage responses are kept encoded in LRU caches, assets in a
+# byte-budgeted one with ETags, so repeat requests and If-None-Match
+# revalidations skip the work. Memory stays bounded with thousands of clients:
+# connections, header size, body size and the bytes of request bodies held at
+# once are all capped, and idle keep-alive connections are closed.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_CONNECTIONS = 8192
+BACKLOG = 4096
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 8 * 1024 * 1024
+# Request bodies read but not yet answered, all connections together
+BODY_BUDGET = 64 * 1024 * 1024
+MAX_BATCH = 100_000         # matchups per batch request
+# Larger batches are computed on a worker thread, smaller ones on the event
+# loop, where they take less time than the hand-off would
+INLINE_BATCH = 1000
+IDLE_TIMEOUT = 30.0         # seconds
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 1000
+MAX_SIMILAR = 50
+ENTRY_CACHE_SIZE = 2048
+DAMAGE_CACHE_SIZE = 4096
+ASSET_BUDGET = 32 * 1024 * 1024     # bytes
+ASSET_MAX_AGE = 3600                # seconds
+
+# Only these are served from /assets/
+ASSET_PREFIXES = ('icons/', 'pokemon_image/', 'pokemon_radar_chart_trans/')
+ASSET_FILES = (NODATA,)
+
+JSON = 'application/json; charset=utf-8'
+
+
+def radar_key(name):
+    """Asset name of an entry's pre-rendered radar chart (may not exist)."""
+    return asset_name('pokemon_radar_chart_trans', f'radar_{name.lower()}.svg')
+
+
+def asset_url(key):
+    return '/assets/' + quote(key)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _plain(value):
+    # numpy scalars to Python ones, NaN to null
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class HttpError(Exception):
+    """Turned into a JSON error response with ``status``."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _LruCache:
+    # OrderedDict LRU bounded by entry count or, with a cost function, by size
+
+    def __init__(self, limit, cost=None):
+        self.limit = limit
+        self.cost = cost
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if key in self._entries:
+            return
+        self._entries[key] = value
+        self.size += self.cost(value) if self.cost else 1
+        while self.size > self.limit and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.size -= self.cost(old) if self.cost else 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _ByteBudget:
+    # Waits while taking ``size`` more bytes would exceed the limit. A request
+    # larger than the whole budget still gets through once nothing else holds
+    # any, so no body waits forever.
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._waiters = deque()
+
+    async def acquire(self, size):
+        while self.used and self.used + size > self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.used += size
+
+    def release(self, size):
+        self.used -= size
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class Catalog:
+    """Encoded entries and search summaries of one dataset version.
+
+    Args:
+        df: The dataset.
+        pack: AssetPack the asset URLs are checked against.
+    """
+
+    def __init__(self, df, pack=None):
+        self.df = df
+        self.pack = pack or get_asset_pack()
+        # Row lookups on arrays; df.iloc builds a Series per call
+        self.columns = {column: df[column].to_numpy() for column in df.columns}
+        self.names = [str(n) for n in df['name']]
+        self.name_rows = {}
+        for row, name in enumerate(self.names):
+            self.name_rows.setdefault(name.lower(), row)
+        types = zip(df['type1'], df['type2'])
+        self.summaries = [
+            _dumps({'name': name, 'pokedex_number': _plain(number), 'types': [t for t in pair if t],
+                    'base_total': _plain(total), 'url': '/pokemon/' + quote(name)})
+            for name, number, total, pair in zip(self.names, df['pokedex_number'], df['base_total'], types)]
+        self._entries = _LruCache(ENTRY_CACHE_SIZE)
+
+    def __len__(self):
+        return len(self.names)
+
+    def row(self, name):
+        """Row position of a Pokémon by name, case-insensitive.
+
+        Raises:
+            HttpError: 404 if there is no such Pokémon.
+        """
+        row = self.name_rows.get(name.strip().lower())
+        if row is None:
+            raise HttpError(404, f'Unknown Pokémon: {name!r}')
+        return row
+
+    def entry(self, row, similar=()):
+        """Encoded JSON of one entry; ``similar`` are neighbour rows."""
+        body = self._entries.get(row)
+        if body is None:
+            record = {column: _plain(values[row]) for column, values in self.columns.items()}
+            name = self.names[row]
+            types = [t for t in (record.get('type1'), record.get('type2')) if t]
+            record['abilities'] = split_abilities(record.get('abilities') or '')
+            record['types'] = types
+            radar = radar_key(name)
+            record['assets'] = {
+                'image': asset_url(image_key(name, record.get('image_content'), self.pack)),
+                'radar': asset_url(radar) if radar in self.pack else None,
+                'type_icons': [asset_url(icon_key(t)) for t in types],
+            }
+            record['similar'] = [self.names[r] for r in similar]
+            body = _dumps(record)
+            self._entries.put(row, body)
+        return body
+
+
+def get_catalog(store):
+    """Return the Catalog for the store's current dataset version."""
+    return store.derived('api_catalog', Catalog)
+
+
+class ApiServer:
+    """The HTTP server and its routes.
+
+    Attributes:
+        store: DataStore the indexes are built from.
+        connections: Open client connections.
+        requests: Requests answered so far.
+    """
+
+    def __init__(self, store=None, pack=None, max_connections=MAX_CONNECTIONS):
+        self.store = store or get_store()
+        self.pack = pack or get_asset_pack()
+        self.max_connections = max_connections
+        self.connections = 0
+        self.requests = 0
+        self._assets = _LruCache(ASSET_BUDGET, cost=lambda asset: len(asset[0]))
+        self._damage = _LruCache(DAMAGE_CACHE_SIZE)
+        self._bodies = None
+        self._routes = {
+            ('GET', 'health'): self.health,
+            ('GET', 'types'): self.types,
+            ('GET', 'search'): self.search,
+            ('GET', 'pokemon'): self.pokemon,
+            ('GET', 'damage'): self.damage,
+            ('POST', 'damage'): self.damage_batch,
+            ('GET', 'assets'): self.asset,
+        }
+
+    def warm(self):
+        """Build the shared indexes now rather than on the first request."""
+        get_query_engine(self.store)
+        get_similarity_index(self.store)
+        get_catalog(self.store)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start listening; returns the asyncio Server."""
+        self._bodies = _ByteBudget(BODY_BUDGET)
+        return await asyncio.start_server(self._serve, host, port, limit=MAX_HEADER_BYTES, backlog=BACKLOG)
+
+    # -- connection handling -------------------------------------------------
+
+    async def _serve(self, reader, writer):
+        if self.connections >= self.max_connections:
+            writer.write(self._error_response(503, 'Too many connections', False))
+            await self._close(writer)
+            return
+        self.connections += 1
+        try:
+            while await self._serve_one(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.connections -= 1
+            await self._close(writer)
+
+    async def _close(self, writer):
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _serve_one(self, reader, writer):
+        # One request; returns whether the connection stays open
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), IDLE_TIMEOUT)
+        except asyncio.LimitOverrunError:
+            writer.write(self._error_response(431, 'Request header too large', False))
+            await writer.drain()
+            return False
+        except asyncio.IncompleteReadError:
+            return False
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            writer.write(self._error_response(400, 'Malformed request line', False))
+            await writer.drain()
+            return False
+        headers = {}
+        for line in lines[1:]:
+            key, sep, value = line.partition(':')
+            if sep:
+                headers[key.strip().lower()] = value.strip()
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        if 'transfer-encoding' in headers:
+            writer.write(self._error_response(411, 'Send a Content-Length', False))
+            await writer.drain()
+            return False
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY_BYTES:
+            writer.write(self._error_response(413, f'Body must be at most {MAX_BODY_BYTES} bytes', False))
+            await writer.drain()
+            return False
+        if length:
+            # Caps the memory held by request bodies however many clients post
+            await self._bodies.acquire(length)
+            try:
+                body = await reader.readexactly(length)
+                response = await self.respond(method, target, headers, body, keep_alive)
+            finally:
+                self._bodies.release(length)
+        else:
+            response = await self.respond(method, target, headers, b'', keep_alive)
+        writer.write(response)
+        await writer.drain()
+        return keep_alive
+
+    def _response(self, status, body, content_type, keep_alive, extra=''):
+        head = (f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+                f'Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n{extra}'
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode('latin-1') + body
+
+    def _error_response(self, status, message, keep_alive=True):
+        return self._response(status, _dumps({'error': message}), JSON, keep_alive)
+
+    async def respond(self, method, target, headers, body, keep_alive=True):
+        """Complete HTTP response bytes for one request."""
+        self.requests += 1
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.split('/') if p]
+        route = parts[0] if parts else ''
+        handler = self._routes.get((method, route))
+        if handler is None:
+            allowed = sorted(m for m, r in self._routes if r == route)
+            if allowed:
+                return self._response(405, _dumps({'error': f'Use {" or ".join(allowed)}'}), JSON, keep_alive,
+                                      f"Allow: {', '.join(allowed)}\r\n")
+            return self._error_response(404, f'No such endpoint: {url.path}', keep_alive)
+        query = dict(parse_qsl(url.query))
+        try:
+            with span(f'api.{route}'):
+                result = handler(parts[1:], query, headers, body)
+                if asyncio.iscoroutine(result):
+                    result = await result
+        except HttpError as e:
+            return self._error_response(e.status, str(e), keep_alive)
+        except Exception as e:
+            print(f'{method} {target}: {e!r}', file=sys.stderr)
+            return self._error_response(500, 'Internal error', keep_alive)
+        status, payload, content_type, extra = result
+        return self._response(status, payload, content_type, keep_alive, extra)
+
+    # -- routes --------------------------------------------------------------
+    # Each takes (path parts after the route, query dict, headers, body) and
+    # returns (status, body bytes, content type, extra header lines).
+
+    def health(self, parts, query, headers, body):
+        return 200, _dumps({'status': 'ok', 'rows': len(self.store.df), 'connections': self.connections,
+                            'requests': self.requests}), JSON, ''
+
+    def types(self, parts, query, headers, body):
+        icons = {t.lower(): asset_url(icon_key(t.lower())) for t in all_types}
+        return 200, _dumps({'types': icons}), JSON, ''
+
+    def search(self, parts, query, headers, body):
+        limit = _int_param(query, 'limit', SEARCH_LIMIT, 0, MAX_SEARCH_LIMIT)
+        offset = _int_param(query, 'offset', 0, 0, None)
+        try:
+            rows = get_query_engine(self.store).run(query.get('q', ''))
+        except QuerySyntaxError as e:
+            raise HttpError(400, f'Query error: {e}') from None
+        catalog = get_catalog(self.store)
+        summaries = catalog.summaries
+        page = b','.join(summaries[r] for r in rows[offset:offset + limit].tolist())
+        head = _dumps({'query': query.get('q', ''), 'total': len(rows), 'offset': offset})
+        return 200, head[:-1] + b',"results":[' + page + b']}', JSON, ''
+
+    def pokemon(self, parts, query, headers, body):
+        if not parts or len(parts) > 2 or (len(parts) == 2 and parts[1] != 'similar'):
+            raise HttpError(404, 'Use /pokemon/<name> or /pokemon/<name>/similar')
+        catalog = get_catalog(self.store)
+        row = catalog.row(parts[0])
+        similarity = get_similarity_index(self.store)
+        if len(parts) == 2:
+            k = _int_param(query, 'k', 5, 1, MAX_SIMILAR)
+            rows, distances = similarity.similar(row, k)
+            similar = [{'name': catalog.names[r], 'distance': round(float(d), 4), 'url': '/pokemon/' + quote(
+                catalog.names[r])} for r, d in zip(rows.tolist(), distances.tolist())]
+            return 200, _dumps({'name': catalog.names[row], 'similar': similar}), JSON, ''
+        similar = similarity.similar(row, 4)[0].tolist()
+        return 200, catalog.entry(row, similar), JSON, ''
+
+    def damage(self, parts, query, headers, body):
+        if parts:
+            raise HttpError(404, 'Use /damage?... or POST /damage/batch')
+        key = tuple(sorted(query.items()))
+        cached = self._damage.get(key)
+        if cached is None:
+            text, error = process_record(query)
+            if error:
+                raise HttpError(400, error)
+            cached = text.rstrip('\n').encode('utf-8')
+            self._damage.put(key, cached)
+        return 200, cached, JSON, ''
+
+    async def damage_batch(self, parts, query, headers, body):
+        if parts != ['batch']:
+            raise HttpError(404, 'Use POST /damage/batch')
+        records = _batch_records(body)
+        if len(records) > MAX_BATCH:
+            raise HttpError(413, f'At most {MAX_BATCH} matchups per request')
+        chunk = ('records', 'jsonl', None, list(enumerate(records, 1)))
+        if len(records) <= INLINE_BATCH:
+            text, count, errors = process_chunk(chunk)
+        else:
+            # Off the event loop, so other clients are served meanwhile
+            text, count, errors = await asyncio.get_running_loop().run_in_executor(None, process_chunk, chunk)
+        payload = (b'{"count":' + str(count).encode() + b',"results":[' + text.rstrip('\n').replace(
+            '\n', ',').encode('utf-8') + b'],"errors":' + _dumps([{'line': line, 'error': message}
+                                                                   for line, message in errors]) + b'}')
+        return 200, payload, JSON, ''
+
+    async def asset(self, parts, query, headers, body):
+        key = asset_name(*parts)
+        if '..' in key.split('/') or not (key.startswith(ASSET_PREFIXES) or key in ASSET_FILES):
+            raise HttpError(404, f'No such asset: {key}')
+        asset = self._assets.get(key)
+        if asset is None:
+            # Pack reads are a memory copy; loose files need the disk
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, self.pack.read, key)
+            if data is None:
+                raise HttpError(404, f'No such asset: {key}')
+            data = bytes(data)
+            etag = '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+            content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+            asset = (data, etag, content_type)
+            self._assets.put(key, asset)
+        data, etag, content_type = asset
+        extra = f'ETag: {etag}\r\nCache-Control: public, max-age={ASSET_MAX_AGE}\r\n'
+        if etag in headers.get('if-none-match', ''):
+            return 304, b'', content_type, extra
+        return 200, data, content_type, extra
+
+
+def _int_param(query, name, default, low, high):
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise HttpError(400, f'{name} expects an integer') from None
+    if value < low or (high is not None and value > high):
+        raise HttpError(400, f'{name} must be between {low} and {high}' if high is not None
+                        else f'{name} must be at least {low}')
+    return value
+
+
+def _batch_records(body):
+    # A JSON array of objects, or one object per line
+    text = body.decode('utf-8', errors='replace')
+    if text.lstrip().startswith('['):
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise HttpError(400, f'invalid JSON: {e.msg}') from None
+        return records
+    records = []
+    for line in text.splitlines():
+        if line.strip():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Kept so later lines keep their numbers; process_chunk rejects it
+                records.append(None)
+    return records
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_connections=MAX_CONNECTIONS):
+    server = ApiServer(max_connections=max_connections)
+    server.warm()
+    listener = await server.start(host, port)
+    address = listener.sockets[0].getsockname()
+    print(f'Listening on http://{address[0]}:{address[1]}/', flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the Pokédex and damage calculator as a local JSON API.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='0 picks a free port')
+    parser.add_argument('--max-connections', type=int, default=MAX_CONNECTIONS)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_connections))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal
+from asset_pack import get_asset_pack, icon_key, image_key
+from sprite_ingest import DETAIL_SIZE, DPRS, THUMBNAIL_SIZE, get_sprite_index
+from instrumentation import timed
+
+# Pokédex image cache
+# Entry images are decoded and scaled at most once while they fit in a byte
+# budget. Entries near the one on screen are loaded ahead of time on a
+# QThreadPool: workers produce QImages, and a queued signal hands them to the
+# GUI thread, which owns the cache. Radar charts are drawn by radar_chart.py.
+# Assets are read through asset_pack, so they come from assets.pack when it
+# has been built and from loose files otherwise. Images are read at the size
+# they are shown when sprite_ingest.py has written that variant.
+# Thumbnails for the results list are a second kind of entry in the same
+# cache. They are only ever loaded on the pool, for the rows being painted.
+
+IMAGE_SIZE = DETAIL_SIZE              # entry images are scaled to fit this square
+ICON_HEIGHT = 24                      # type icons are scaled to this height
+DEFAULT_BUDGET = 32 * 1024 * 1024     # bytes
+PREFETCH_THREADS = 2
+
+IMAGE = 'image'
+THUMBNAIL = 'thumbnail'
+_SIZES = {IMAGE: IMAGE_SIZE, THUMBNAIL: THUMBNAIL_SIZE}
+
+
+def _image_format(key):
+    # Tells Qt which plugin to use, as the file extension did for QImage(path)
+    return os.path.splitext(key)[1][1:].upper() or None
+
+
+@timed('assets.decode')
+def load_image(key, size=IMAGE_SIZE, dpr=1):
+    """Decode an image scaled to fit ``size``; safe to call off the GUI thread.
+
+    The pre-sized variant is read when there is one, so nothing is scaled.
+    """
+    pack = get_asset_pack()
+    variant = get_sprite_index().variant(key, size, dpr)
+    image = QImage.fromData(pack.read(variant) or b'', 'PNG') if variant is not None else QImage()
+    if image.isNull():
+        pixels = round(size * dpr)
+        image = QImage.fromData(pack.read(key) or b'', _image_format(key))
+        image = image.scaled(pixels, pixels, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    image.setDevicePixelRatio(dpr)
+    return image
+
+
+def _entry(name, image_content):
+    # Missing image_content cells are NaN; NaN keys never compare equal
+    return name, image_content if isinstance(image_content, str) else ''
+
+
+def _cost(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class _LoadJob(QRunnable):
+    def __init__(self, cache, job):
+        super().__init__()
+        # The cache keeps the Python object alive and releases it once no
+        # worker is running; letting the pool delete it crashes PySide
+        self.setAutoDelete(False)
+        self.cache = cache
+        self.job = job
+
+    def run(self):
+        self.cache._load(self.job)
+
+
+class AssetCache(QObject):
+    """Byte-budgeted LRU cache of scaled entry pixmaps and thumbnails, plus the type icons.
+
+    Values are keyed by asset name, so entries without their own image share
+    the nodata.svg one. All methods must be called on the GUI thread.
+
+    Args:
+        budget: Cache size in bytes.
+        threads: Prefetch worker threads.
+        parent: Optional QObject parent.
+    """
+
+    # Emitted by workers after queueing results. It carries no arguments:
+    # Python objects sent through cross-thread signals are not reliably
+    # reference counted, so results travel through self._results instead.
+    _loaded = Signal()
+    # Emitted on the GUI thread once newly loaded thumbnails are in the cache
+    thumbnails_loaded = Signal()
+
+    def __init__(self, budget=DEFAULT_BUDGET, threads=PREFETCH_THREADS, parent=None):
+        super().__init__(parent)
+        self.budget = budget
+        # Sprite variants exist at 1x and 2x; HiDPI screens get the 2x ones
+        app = QApplication.instance()
+        self.dpr = max(DPRS) if app is not None and app.devicePixelRatio() > 1 else 1
+        self._entries = OrderedDict()   # (kind, key) -> (value, cost)
+        self._bytes = 0
+        self._icons = {}                # (type, height) -> QPixmap
+        # (name, image_content) -> image key; also filled by workers
+        self._keys = {}
+        self._pending = {}                    # (kind, name, image_content) -> _LoadJob
+        self._retired = []                    # finished jobs, see _LoadJob
+        self._results = queue.SimpleQueue()   # (kind, key, value) from workers
+        self._wanted = {IMAGE: frozenset(), THUMBNAIL: frozenset()}
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(threads)
+        self._loaded.connect(self._store_loaded, Qt.QueuedConnection)
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.evictions = 0
+
+    def key(self, name, image_content=''):
+        entry = _entry(name, image_content)
+        key = self._keys.get(entry)
+        if key is None:
+            key = self._keys[entry] = image_key(*entry)
+        return key
+
+    def _get(self, kind, key):
+        entry = self._entries.get((kind, key))
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((kind, key))
+        self.hits += 1
+        return entry[0]
+
+    def _put(self, kind, key, value):
+        if (kind, key) in self._entries:
+            return
+        cost = _cost(value)
+        self._entries[(kind, key)] = (value, cost)
+        self._bytes += cost
+        while self._bytes > self.budget and len(self._entries) > 1:
+            _, (_, old_cost) = self._entries.popitem(last=False)
+            self._bytes -= old_cost
+            self.evictions += 1
+
+    def image(self, name, image_content=''):
+        """Scaled QPixmap for an entry, loaded now if it is not cached."""
+        key = self.key(name, image_content)
+        pixmap = self._get(IMAGE, key)
+        if pixmap is None:
+            pixmap = QPixmap.fromImage(load_image(key, IMAGE_SIZE, self.dpr))
+            self._put(IMAGE, key, pixmap)
+        return pixmap
+
+    def thumbnail(self, name, image_content=''):
+        """Cached thumbnail QPixmap for an entry, or None if it is not loaded.
+
+        Never decodes on the calling thread; request missing thumbnails with
+        ``prefetch(entries, THUMBNAIL)`` and repaint on ``thumbnails_loaded``.
+        """
+        return self._get(THUMBNAIL, self.key(name, image_content))
+
+    def icon(self, type_name, height=ICON_HEIGHT):
+        """Type icon scaled to ``height``, rasterised on first use.
+
+        There are only 18 types, so icons live in a pool of their own that the
+        byte budget never evicts from.
+        """
+        pixmap = self._icons.get((type_name, height))
+        if pixmap is None:
+            key = icon_key(type_name)
+            image = QImage.fromData(get_asset_pack().read(key) or b'', _image_format(key))
+            pixmap = self._icons[(type_name, height)] = QPixmap.fromImage(
+                image.scaledToHeight(height, Qt.SmoothTransformation))
+        return pixmap
+
+    def prefetch(self, entries, kind=IMAGE):
+        """Load entries in the background, in the order given.
+
+        Queued loads of ``kind`` for entries no longer in ``entries`` are
+        skipped, so this can be called on every navigation step or repaint.
+
+        Args:
+            entries: Iterable of (name, image_content) pairs.
+            kind: IMAGE or THUMBNAIL.
+        """
+        entries = [_entry(name, image_content) for name, image_content in entries]
+        self._wanted[kind] = frozenset(entries)
+        for entry in entries:
+            job = (kind,) + entry
+            cached = self._keys.get(entry)
+            if job in self._pending or (cached is not None and (kind, cached) in self._entries):
+                continue
+            runnable = self._pending[job] = _LoadJob(self, job)
+            self._pool.start(runnable)
+
+    def _load(self, job):
+        # Runs on a pool thread
+        try:
+            kind, entry = job[0], job[1:]
+            if entry in self._wanted[kind]:
+                key = self._keys.get(entry)
+                if key is None:
+                    key = self._keys[entry] = image_key(*entry)
+                if (kind, key) not in self._entries:
+                    image = load_image(key, _SIZES[kind], self.dpr)
+                    self._results.put((kind, key, image))
+                    if kind == IMAGE:
+                        self._results.put((THUMBNAIL, key, self._thumbnail_of(key, image)))
+            self._results.put(('', '', job))
+            self._loaded.emit()
+        except RuntimeError:
+            # The cache was deleted while the application shut down
+            pass
+
+    def _thumbnail_of(self, key, image):
+        # An entry image comes with its thumbnail: the ingested one, or the
+        # image scaled down rather than the source decoded a second time
+        if get_sprite_index().variant(key, THUMBNAIL_SIZE, self.dpr) is not None:
+            return load_image(key, THUMBNAIL_SIZE, self.dpr)
+        pixels = round(THUMBNAIL_SIZE * self.dpr)
+        thumbnail = image.scaled(pixels, pixels, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        thumbnail.setDevicePixelRatio(self.dpr)
+        return thumbnail
+
+    def _store_loaded(self):
+        thumbnails = False
+        while True:
+            try:
+                kind, key, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if not kind:
+                self._retired.append(self._pending.pop(value))
+                if self._pool.activeThreadCount() == 0:
+                    self._retired.clear()
+            elif (kind, key) not in self._entries:
+                self._put(kind, key, QPixmap.fromImage(value))
+                self.prefetched += 1
+                thumbnails = thumbnails or kind == THUMBNAIL
+        if thumbnails:
+            self.thumbnails_loaded.emit()
+
+    def stats(self):
+        """Counters and current size, for diagnostics."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'prefetched': self.prefetched,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'budget': self.budget,
+        }
+
+    def wait(self):
+        """Block until queued prefetches have finished."""
+        self._pool.waitForDone()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_asset_cache():
+    """Return the application-wide AssetCache, creating it on first use.
+
+    Needs a QApplication.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AssetCache()
+                QApplication.instance().aboutToQuit.connect(_cache.wait)
+    return _cache
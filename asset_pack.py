@@ -0,0 +1,271 @@
+import os
+import sys
+import json
+import mmap
+import zlib
+import struct
+import argparse
+import threading
+
+# Packed asset file
+# Type icons and entry images are stored back to back in one file,
+# assets.pack, followed by a JSON index of name -> (offset, length, codec).
+# The pack is memory-mapped once; reading an asset is a slice of the
+# map, with no open() or stat() per file. Names are the assets' paths relative
+# to the repository root with '/' separators, e.g.
+#     icons/fire.svg
+#     pokemon_image/pikachu/pikachu.png
+# Anything missing from the pack is read from that path on disk instead, so
+# images added to pokemon_image/ show up before the pack is rebuilt.
+MAGIC = b'PKDXPACK'
+FORMAT_VERSION = 1
+# magic, format version, index offset, index length
+HEADER = struct.Struct('<8sIQQ')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PACK_NAME = 'assets.pack'
+DEFAULT_PACK = os.path.join(BASE_DIR, PACK_NAME)
+
+RAW = 'raw'
+ZLIB = 'zlib'
+# Already compressed; zlib would only cost time on every read
+STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+IMAGE_EXTENSIONS = STORED_EXTENSIONS + ('.svg', '.bmp')
+
+# Directories packed; only images are taken. .sprite_cache holds the
+# variants written by sprite_ingest.py, so build the pack after ingesting.
+LOOSE_DIRS = ('icons', 'pokemon_image', '.sprite_cache')
+LOOSE_FILES = ('nodata.svg',)
+# Old icon set kept in the repo for reference, never shown
+SKIP_DIRS = ('icons/icons_old',)
+# Shown for entries without an image
+NODATA = 'nodata.svg'
+
+
+class PackFormatError(ValueError):
+    """assets.pack is truncated, corrupt or from another format version."""
+
+
+def asset_name(*parts):
+    """Join path parts into a pack name ('/' separated, no leading './')."""
+    return '/'.join(str(p).replace(os.sep, '/').strip('/') for p in parts if p != '')
+
+
+def image_key(name, image_content, pack=None):
+    """Asset name of an entry image, or nodata.svg if there is none."""
+    pack = pack or get_asset_pack()
+    if not name or not image_content:
+        return NODATA
+    key = asset_name('pokemon_image', name.lower().replace(' ', '_'), image_content)
+    return key if key in pack else NODATA
+
+
+def icon_key(type_name):
+    return asset_name('icons', f'{type_name}.svg')
+
+
+class AssetPack:
+    """Read-only view of assets.pack with fallback to loose files.
+
+    A missing pack is not an error: every lookup then goes to disk, which is
+    how the app behaved before packs existed. Reads are thread-safe.
+
+    Args:
+        path: Pack file.
+        base_dir: Root that asset names are relative to, for the fallback.
+    """
+
+    def __init__(self, path=DEFAULT_PACK, base_dir=BASE_DIR):
+        self.path = path
+        self.base_dir = base_dir
+        self._file = None
+        self._map = None
+        self._index = {}
+        # Fallback lookups are remembered so a missing file is stat()ed once
+        self._loose_sizes = {}
+        if os.path.exists(path):
+            self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._map) < HEADER.size:
+                raise PackFormatError(f'{self.path}: truncated header')
+            magic, version, index_offset, index_length = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise PackFormatError(f'{self.path}: not a version {FORMAT_VERSION} asset pack')
+            if index_offset + index_length > len(self._map):
+                raise PackFormatError(f'{self.path}: truncated index')
+            index = json.loads(self._map[index_offset:index_offset + index_length].decode('utf-8'))
+            self._index = {name: tuple(entry) for name, entry in index.items()}
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def packed(self):
+        """True if a pack file is open."""
+        return self._map is not None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return self.size(name) is not None
+
+    def names(self, prefix=''):
+        """Sorted names of the packed assets starting with ``prefix``."""
+        return sorted(name for name in self._index if name.startswith(prefix))
+
+    def size(self, name):
+        """Stored size of an asset in bytes, or None if it does not exist."""
+        entry = self._index.get(name)
+        if entry is not None:
+            return entry[1]
+        if name not in self._loose_sizes:
+            try:
+                self._loose_sizes[name] = os.path.getsize(os.path.join(self.base_dir, name))
+            except OSError:
+                self._loose_sizes[name] = None
+        return self._loose_sizes[name]
+
+    def mtime_ns(self, name):
+        """Modification time of a loose asset in ns; None if packed or missing."""
+        if name in self._index:
+            return None
+        try:
+            return os.stat(os.path.join(self.base_dir, name)).st_mtime_ns
+        except OSError:
+            return None
+
+    def read(self, name):
+        """Contents of an asset as bytes, or None if it does not exist."""
+        entry = self._index.get(name)
+        if entry is not None:
+            offset, length, codec = entry
+            data = self._map[offset:offset + length]
+            return zlib.decompress(data) if codec == ZLIB else data
+        if self.size(name) is None:
+            return None
+        try:
+            with open(os.path.join(self.base_dir, name), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _walk_images(root, prefix):
+    # (name, path) for every image file under root
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        rel_dir = '' if rel_dir == '.' else rel_dir
+        dirnames[:] = sorted(d for d in dirnames if asset_name(prefix, rel_dir, d) not in SKIP_DIRS)
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                yield asset_name(prefix, rel_dir, filename), os.path.join(dirpath, filename)
+
+
+def collect_sources(base_dir):
+    """Map pack names to the source files under ``base_dir``."""
+    sources = {}
+    for directory in LOOSE_DIRS:
+        full = os.path.join(base_dir, directory)
+        if os.path.isdir(full):
+            sources.update(_walk_images(full, directory))
+    for filename in LOOSE_FILES:
+        full = os.path.join(base_dir, filename)
+        if os.path.exists(full):
+            sources[asset_name(filename)] = full
+    return sources
+
+
+def write_pack(sources, path=DEFAULT_PACK, level=6):
+    """Write ``sources`` (name -> file path) into a pack at ``path``.
+
+    Returns:
+        Dict with the number of assets and the raw and packed byte counts.
+    """
+    tmp_path = path + '.tmp'
+    index = {}
+    raw_bytes = 0
+    with open(tmp_path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+        for name in sorted(sources):
+            with open(sources[name], 'rb') as f:
+                data = f.read()
+            raw_bytes += len(data)
+            codec = RAW
+            if not name.lower().endswith(STORED_EXTENSIONS):
+                packed = zlib.compress(data, level)
+                if len(packed) < len(data):
+                    data, codec = packed, ZLIB
+            index[name] = (out.tell(), len(data), codec)
+            out.write(data)
+        index_offset = out.tell()
+        index_blob = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        out.write(index_blob)
+        size = out.tell()
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, index_offset, len(index_blob)))
+    os.replace(tmp_path, path)
+    return {'assets': len(index), 'raw_bytes': raw_bytes, 'pack_bytes': size}
+
+
+def build_pack(base_dir=BASE_DIR, path=DEFAULT_PACK, level=6):
+    """Pack icons/, pokemon_image/, .sprite_cache/ and nodata.svg."""
+    return write_pack(collect_sources(base_dir), path, level)
+
+
+_pack = None
+_pack_lock = threading.Lock()
+
+
+def get_asset_pack():
+    """Return the process-wide AssetPack, opening it on first use."""
+    global _pack
+    if _pack is None:
+        with _pack_lock:
+            if _pack is None:
+                _pack = AssetPack()
+    return _pack
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or inspect the packed asset file.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help='pack type icons and entry images')
+    build_cmd.add_argument('--base-dir', default=BASE_DIR, help='repository root to read assets from')
+    build_cmd.add_argument('--output', default=DEFAULT_PACK, help='pack file to write')
+    build_cmd.add_argument('--level', type=int, default=6, help='zlib level for SVGs (0-9)')
+    list_cmd = sub.add_parser('list', help='list packed assets')
+    list_cmd.add_argument('--pack', default=DEFAULT_PACK, help='pack file to read')
+    list_cmd.add_argument('prefix', nargs='?', default='', help='only names starting with this')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        stats = build_pack(args.base_dir, args.output, args.level)
+        print(f"Packed {stats['assets']} assets, {stats['raw_bytes'] / 1e6:.1f} MB -> "
+              f"{stats['pack_bytes'] / 1e6:.1f} MB, into {args.output}")
+    elif args.command == 'list':
+        if not os.path.exists(args.pack):
+            print(f'{args.pack} does not exist; run: python asset_pack.py build', file=sys.stderr)
+            return 1
+        pack = AssetPack(args.pack)
+        for name in pack.names(args.prefix):
+            offset, length, codec = pack._index[name]
+            print(f'{length:>10}  {codec:<4}  {name}')
+        pack.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
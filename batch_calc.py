@@ -0,0 +1,415 @@
+import os
+import sys
+import csv
+import json
+import math
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from damage import all_types, batch_damage, type_index, NO_TYPE
+
+# Headless batch damage calculator
+# Streams matchup records from CSV or JSONL through damage.batch_damage in
+# fixed-size chunks, so memory stays flat however large the input is. Each
+# record gives an attack type, the defender's types (or a defender name looked
+# up in pokemon.xlsx), STAB and base damage:
+#     attack_type,defender_type1,defender_type2,stab,base_damage
+#     Fire,Grass,Steel,yes,90
+#     {"attack_type": "Ground", "defender": "Charizard", "attacker": "Garchomp", "base_damage": 100}
+# Without a stab field, STAB is worked out from the attacker's types if an
+# attacker name is given. Bad records are reported with their line number and
+# skipped. Nothing here imports Qt.
+
+DEFAULT_CHUNK_SIZE = 65536
+PROGRESS_INTERVAL = 2.0   # seconds between progress lines on stderr
+
+OUTPUT_FIELDS = ('line', 'attack_type', 'defender_type1', 'defender_type2', 'stab',
+                 'base_damage', 'multiplier', 'damage')
+
+TRUE_WORDS = ('yes', 'y', 'true', '1')
+FALSE_WORDS = ('no', 'n', 'false', '0', '')
+
+# Output names for type indices, with '' for NO_TYPE
+_TYPE_NAMES = all_types + ['']
+
+
+@lru_cache(maxsize=1)
+def _name_types():
+    # Loaded on the first record that names a Pokémon, once per process
+    from dataset import load_dataset
+    df = load_dataset()
+    return {name.lower(): (type_index(t1), type_index(t2))
+            for name, t1, t2 in zip(df['name'], df['type1'], df['type2'])}
+
+
+def _pokemon_types(name):
+    try:
+        return _name_types()[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f'Unknown Pokémon: {name!r}') from None
+
+
+def _blank(value):
+    return isinstance(value, str) and not value.strip()
+
+
+def _type_name(value, field):
+    # JSON numbers, booleans and NaN are not type names
+    if not isinstance(value, str):
+        raise ValueError(f'{field} expects a type name, got {value!r}')
+    return type_index(value)
+
+
+def _attack_type(value):
+    if _blank(value):
+        raise ValueError('missing attack_type')
+    return _type_name(value, 'attack_type')
+
+
+def _defender_type1(value):
+    if _blank(value):
+        raise ValueError('missing defender_type1 or defender')
+    return _type_name(value, 'defender_type1')
+
+
+def _optional_type(value):
+    return NO_TYPE if _blank(value) else _type_name(value, 'defender_type2')
+
+
+def _optional_pokemon(value):
+    # Both types packed into one int, -1 for no name
+    if _blank(value):
+        return -1
+    type1, type2 = _pokemon_types(str(value))
+    return type1 * 32 + type2
+
+
+def _stab(value):
+    # 1 or 0, or -1 to take STAB from the attacker's types
+    if isinstance(value, bool):
+        return int(value)
+    if _blank(value):
+        return -1
+    word = str(value).strip().lower()
+    if word not in TRUE_WORDS and word not in FALSE_WORDS:
+        raise ValueError(f'stab expects yes or no, got {value!r}')
+    return int(word in TRUE_WORDS)
+
+
+def _base_damage(value):
+    if _blank(value):
+        raise ValueError('missing base_damage')
+    try:
+        base = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'base_damage expects a number, got {value!r}') from None
+    if not math.isfinite(base):
+        raise ValueError(f'base_damage expects a finite number, got {value!r}')
+    return base
+
+
+def _resolve(values, resolve, dtype):
+    # Run resolve() once per distinct value instead of once per row. Returns
+    # the results (0 where resolve failed) and the error messages (None where
+    # it succeeded), both aligned with values.
+    codes, uniques = pd.factorize(np.array(values, dtype=object), use_na_sentinel=False)
+    results = np.zeros(len(uniques), dtype=dtype)
+    errors = np.full(len(uniques), None, dtype=object)
+    for k, value in enumerate(uniques):
+        try:
+            results[k] = resolve(value)
+        except ValueError as e:
+            errors[k] = str(e)
+    return results[codes], errors[codes]
+
+
+def _scalar(value):
+    # Missing or null JSON values are blank; arrays and objects become text,
+    # so every value is hashable
+    if value is None:
+        return ''
+    return value if isinstance(value, (str, int, float)) else json.dumps(value)
+
+
+def _columns(input_format, header, items):
+    # Split a chunk into line numbers, field -> values, and rows rejected
+    # before any field is looked at
+    lines = []
+    records = []
+    errors = []
+    for line, raw in items:
+        if input_format == 'csv':
+            if len(raw) != len(header):
+                errors.append((line, f'expected {len(header)} fields, got {len(raw)}'))
+                continue
+            records.append(raw)
+        else:
+            if input_format == 'records':
+                record = raw
+            else:
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError as e:
+                    errors.append((line, f'invalid JSON: {e.msg}'))
+                    continue
+            if not isinstance(record, dict):
+                errors.append((line, 'expected a JSON object'))
+                continue
+            records.append(record)
+        lines.append(line)
+    if input_format == 'csv':
+        columns = dict(zip(header, zip(*records))) if records else {}
+    else:
+        keys = {k for record in records for k in record}
+        columns = {k: [_scalar(record.get(k)) for record in records] for k in keys}
+    return lines, columns, errors
+
+
+def _format_csv(line, a, t1, t2, stab, base, mult, dmg):
+    return f'{line},{_TYPE_NAMES[a]},{_TYPE_NAMES[t1]},{_TYPE_NAMES[t2]},{int(stab)},{base:g},{mult:g},{dmg:.2f}\n'
+
+
+def _format_jsonl(line, a, t1, t2, stab, base, mult, dmg):
+    # Type names are plain words, so no JSON escaping is needed
+    return (f'{{"line": {line}, "attack_type": "{_TYPE_NAMES[a]}", "defender_type1": "{_TYPE_NAMES[t1]}", '
+            f'"defender_type2": "{_TYPE_NAMES[t2]}", "stab": {"true" if stab else "false"}, '
+            f'"base_damage": {base:g}, "multiplier": {mult:g}, "damage": {round(dmg, 2)}}}\n')
+
+
+def process_chunk(chunk):
+    """Parse, compute and format one chunk of input records.
+
+    Fields are resolved column by column, once per distinct value, and the
+    damage of the whole chunk comes from one batch_damage() call.
+
+    Args:
+        chunk: (input_format, output_format, header, items). items are
+            (line, raw) pairs, where raw is a JSON line, for CSV a list of
+            fields matching header, and for 'records' an already decoded
+            JSON value.
+
+    Returns:
+        (output text, number of rows written, list of (line, error message))
+    """
+    input_format, output_format, header, items = chunk
+    lines, columns, errors = _columns(input_format, header, items)
+    n = len(lines)
+    if n == 0:
+        return '', 0, errors
+    blank = [''] * n
+    message = np.full(n, None, dtype=object)
+
+    def field(name, resolve, dtype=np.intp, where=None):
+        values, problems = _resolve(columns.get(name, blank), resolve, dtype)
+        # Keep the first problem of each row
+        first = pd.isna(message) & pd.notna(problems)
+        if where is not None:
+            first &= where
+        message[first] = problems[first]
+        return values
+
+    attack = field('attack_type', _attack_type)
+    defender = field('defender', _optional_pokemon)
+    named = defender >= 0
+    type1 = np.where(named, defender // 32, field('defender_type1', _defender_type1, where=~named))
+    type2 = np.where(named, defender % 32, field('defender_type2', _optional_type, where=~named))
+    stab = field('stab', _stab)
+    inferred = stab < 0
+    attacker = field('attacker', _optional_pokemon, where=inferred)
+    own_type = (attacker >= 0) & ((attack == attacker // 32) | (attack == attacker % 32))
+    stab = np.where(inferred, own_type, stab > 0)
+    base = field('base_damage', _base_damage, np.float64)
+
+    bad = np.flatnonzero(pd.notna(message))
+    if len(bad):
+        errors.extend((lines[i], message[i]) for i in bad)
+        errors.sort()
+        keep = pd.isna(message)
+        lines = [line for line, ok in zip(lines, keep) if ok]
+        attack, type1, type2, stab, base = (a[keep] for a in (attack, type1, type2, stab, base))
+    if not lines:
+        return '', 0, errors
+    # batch_damage ignores a second type equal to the first; show that in the output
+    type2 = np.where(type2 == type1, NO_TYPE, type2)
+    multipliers, damages = batch_damage(attack, type1, type2, stab, base)
+    fmt = _format_csv if output_format == 'csv' else _format_jsonl
+    text = ''.join(map(fmt, lines, attack.tolist(), type1.tolist(), type2.tolist(), stab.tolist(),
+                       base.tolist(), multipliers.tolist(), damages.tolist()))
+    return text, len(lines), errors
+
+
+def process_record(record, line=1):
+    """process_chunk() for a single decoded JSON record, as JSONL.
+
+    Resolves the fields one by one, which for one record is much cheaper than
+    the column-wise setup of a chunk. Errors are the ones process_chunk
+    reports.
+
+    Returns:
+        (output line, None), or ('', error message) if the record is rejected.
+    """
+    if not isinstance(record, dict):
+        return '', 'expected a JSON object'
+
+    def field(name):
+        return _scalar(record.get(name))
+
+    try:
+        attack = _attack_type(field('attack_type'))
+        defender = _optional_pokemon(field('defender'))
+        if defender >= 0:
+            type1, type2 = divmod(defender, 32)
+        else:
+            type1 = _defender_type1(field('defender_type1'))
+            type2 = _optional_type(field('defender_type2'))
+        stab = _stab(field('stab'))
+        if stab < 0:
+            attacker = _optional_pokemon(field('attacker'))
+            stab = attacker >= 0 and attack in divmod(attacker, 32)
+        base = _base_damage(field('base_damage'))
+    except ValueError as e:
+        return '', str(e)
+    if type2 == type1:
+        type2 = NO_TYPE
+    multiplier, damage = batch_damage(attack, type1, type2, bool(stab), base)
+    return _format_jsonl(line, attack, type1, type2, bool(stab), base, float(multiplier), float(damage)), None
+
+
+def read_chunks(stream, input_format, output_format, chunk_size):
+    """Yield process_chunk() arguments for successive chunks of ``stream``."""
+    if input_format == 'csv':
+        reader = csv.reader(stream)
+        header = None
+        for raw in reader:
+            if raw:
+                header = [h.strip().lower() for h in raw]
+                break
+        if header is None:
+            return
+        items = []
+        for raw in reader:
+            if not raw:
+                continue
+            items.append((reader.line_num, raw))
+            if len(items) == chunk_size:
+                yield input_format, output_format, header, items
+                items = []
+    else:
+        header = None
+        items = []
+        for line_num, raw in enumerate(stream, 1):
+            if not raw.strip():
+                continue
+            items.append((line_num, raw))
+            if len(items) == chunk_size:
+                yield input_format, output_format, header, items
+                items = []
+    if items:
+        yield input_format, output_format, header, items
+
+
+def run_batch(stream, out, input_format='csv', output_format=None, chunk_size=DEFAULT_CHUNK_SIZE,
+              workers=0, on_error=None, on_progress=None):
+    """Stream matchups from ``stream`` to ``out``.
+
+    Output rows keep input order. At most two chunks per worker are in flight,
+    so memory use does not grow with the input size.
+
+    Args:
+        stream: Text stream of CSV (with a header row) or JSONL records.
+        out: Text stream for the results.
+        input_format: 'csv' or 'jsonl'.
+        output_format: 'csv' or 'jsonl'; defaults to the input format.
+        chunk_size: Records per chunk.
+        workers: Worker processes; 0 computes in this process.
+        on_error: Called with (line, message) for each rejected record.
+        on_progress: Called with (rows written, errors, seconds) after each chunk.
+
+    Returns:
+        (rows written, rows rejected, seconds)
+    """
+    output_format = output_format or input_format
+    if output_format == 'csv':
+        out.write(','.join(OUTPUT_FIELDS) + '\n')
+    started = time.perf_counter()
+    rows = rejected = 0
+
+    def collect(result):
+        nonlocal rows, rejected
+        text, count, errors = result
+        out.write(text)
+        rows += count
+        rejected += len(errors)
+        if on_error is not None:
+            for line, message in errors:
+                on_error(line, message)
+        if on_progress is not None:
+            on_progress(rows, rejected, time.perf_counter() - started)
+
+    chunks = read_chunks(stream, input_format, output_format, chunk_size)
+    if workers == 0:
+        for chunk in chunks:
+            collect(process_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(process_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+    return rows, rejected, time.perf_counter() - started
+
+
+def _guess_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    return 'jsonl' if ext in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute damage for a file of matchups without the GUI.')
+    parser.add_argument('input', help="CSV or JSONL file, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help='input format (default: from the file extension)')
+    parser.add_argument('--output-format', choices=('csv', 'jsonl'), help='output format (default: input format)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='records per chunk')
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (0 = compute in this process)')
+    parser.add_argument('--quiet', action='store_true', help='no progress lines')
+    args = parser.parse_args(argv)
+
+    input_format = args.format or _guess_format(args.input if args.input != '-' else '')
+    output_format = args.output_format or (_guess_format(args.output) if args.output != '-' else input_format)
+    source = args.input if args.input != '-' else '<stdin>'
+
+    def on_error(line, message):
+        print(f'{source}:{line}: {message}', file=sys.stderr)
+
+    last_report = [0.0]
+
+    def on_progress(rows, rejected, seconds):
+        if not args.quiet and seconds - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = seconds
+            print(f'{rows} rows, {rejected} rejected, {rows / seconds:,.0f} rows/s', file=sys.stderr)
+
+    stream = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', newline='')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        rows, rejected, seconds = run_batch(stream, out, input_format, output_format, args.chunk_size,
+                                            args.workers, on_error, on_progress)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+    rate = rows / seconds if seconds > 0 else 0.0
+    print(f'{rows} rows, {rejected} rejected in {seconds:.2f} s ({rate:,.0f} rows/s)', file=sys.stderr)
+    return 1 if rejected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,346 @@
+import sys
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from damage import STAB_MULTIPLIER
+from matchups import DEFAULT_LEVEL, DEFAULT_POWER, Combatants, base_damage, defender_effectiveness
+
+# Monte Carlo 1v1 battles
+# Each side attacks every turn with its best STAB move against the other, as
+# in matchups.py: a move of fixed power in one of its types, physical or
+# special, whichever has the higher top roll. Each hit rolls 85-100% damage,
+# then STAB and the type_chart multiplier are applied. The faster Pokémon
+# moves first; speed ties are settled by a coin flip. A battle nobody has won
+# after MAX_TURNS turns is a draw (e.g. two Pokémon immune to each other).
+# Battles are not simulated one at a time: a batch of battles (for many
+# pairs) is a set of flat arrays, and TURN_WINDOW turns of rolls are drawn at
+# once per battle, so a KO is found with a cumulative sum. Only undecided
+# battles are carried into the next window.
+# Every chunk of work draws from its own SeedSequence child, keyed by chunk
+# number, so a seed reproduces the same results with any number of workers.
+#     python battle_sim.py duel Garchomp Blissey --battles 100000 --seed 1
+#     python battle_sim.py tournament --gen 1 --battles 1000 --workers 4
+
+MAX_TURNS = 100
+TURN_WINDOW = 8
+# Battles per chunk; bounds the size of the roll arrays
+CHUNK_BATTLES = 1 << 17
+ROLLS = np.arange(85, 101)
+Z_95 = 1.96
+PROGRESS_INTERVAL = 2.0   # seconds between progress lines on stderr
+
+
+def wilson_interval(wins, battles, z=Z_95):
+    """Wilson score interval of a win rate (vectorized).
+
+    Returns:
+        (low, high) arrays; (0, 1) where no battles were fought.
+    """
+    wins = np.asarray(wins, dtype=np.float64)
+    n = np.asarray(battles, dtype=np.float64)
+    safe = np.maximum(n, 1)
+    p = wins / safe
+    denominator = 1 + z * z / safe
+    centre = (p + z * z / (2 * safe)) / denominator
+    half = z * np.sqrt(p * (1 - p) / safe + z * z / (4 * safe * safe)) / denominator
+    return np.where(n > 0, centre - half, 0.0), np.where(n > 0, centre + half, 1.0)
+
+
+def damage_rolls(combatants, attackers, defenders, power=DEFAULT_POWER):
+    """Damage of each attacker's best move against its paired defender, per roll.
+
+    Args:
+        combatants: Combatants of the dataset.
+        attackers: Row positions of the attacking Pokémon.
+        defenders: Row positions of the defending Pokémon, same length.
+        power: Move power.
+
+    Returns:
+        int32 array of shape (len(attackers), len(ROLLS)), ascending by roll.
+    """
+    c = combatants
+    attackers = np.asarray(attackers, dtype=np.intp)
+    defenders = np.asarray(defenders, dtype=np.intp)
+    effectiveness = defender_effectiveness(c).astype(np.float64)
+    physical = base_damage(c.level, power, c.attack[attackers], c.defense[defenders])
+    special = base_damage(c.level, power, c.sp_attack[attackers], c.sp_defense[defenders])
+    best = None
+    for types in (c.type1[attackers], c.type2[attackers]):
+        # Row NO_TYPE is zero: no second type, no second move
+        eff = effectiveness[types, defenders][:, None]
+        for base in (physical, special):
+            rolled = np.floor(np.floor((base[:, None] * ROLLS) // 100 * STAB_MULTIPLIER) * eff)
+            best = rolled if best is None else np.where((rolled[:, -1] > best[:, -1])[:, None], rolled, best)
+    return best.astype(np.int32)
+
+
+def first_mover(combatants, a, b):
+    """Probability that ``a`` moves before ``b``: 1, 0 or 0.5 on a speed tie."""
+    speed = combatants.speed
+    if speed is None:
+        return np.full(len(np.atleast_1d(a)), 0.5)
+    sa, sb = speed[a], speed[b]
+    return np.where(sa > sb, 1.0, np.where(sa < sb, 0.0, 0.5))
+
+
+def simulate(rolls_a, rolls_b, hp_a, hp_b, a_first, battles, rng, max_turns=MAX_TURNS):
+    """Fight ``battles`` independent battles for each of P pairs.
+
+    Args:
+        rolls_a: (P, len(ROLLS)) damage A deals to B, see damage_rolls().
+        rolls_b: (P, len(ROLLS)) damage B deals to A.
+        hp_a: (P,) HP of A.
+        hp_b: (P,) HP of B.
+        a_first: (P,) probability that A moves first.
+        battles: Battles per pair.
+        rng: numpy Generator.
+        max_turns: Turns after which an undecided battle is a draw.
+
+    Returns:
+        (wins of A, wins of B, draws) as int64 arrays of shape (P,).
+    """
+    pairs = len(hp_a)
+    pair = np.repeat(np.arange(pairs), battles)
+    left_a = np.repeat(np.asarray(hp_a, dtype=np.int32), battles)
+    left_b = np.repeat(np.asarray(hp_b, dtype=np.int32), battles)
+    # Only the turn both would faint on needs the order, so one draw per battle does
+    first = rng.random(len(pair)) < np.asarray(a_first)[pair]
+    outcome = np.zeros(len(pair), dtype=np.int8)   # 0 draw, 1 A wins, 2 B wins
+    # Pairs where neither side can do damage are draws without rolling
+    active = np.flatnonzero((rolls_a[:, -1] > 0) | (rolls_b[:, -1] > 0))
+    active = np.flatnonzero(np.isin(pair, active)) if len(active) < pairs else np.arange(len(pair))
+    turn = 0
+    while active.size and turn < max_turns:
+        window = min(TURN_WINDOW, max_turns - turn)
+        p = pair[active][:, None]
+        dealt_a = np.cumsum(rolls_a[p, rng.integers(0, len(ROLLS), (len(active), window), dtype=np.uint8)], axis=1)
+        dealt_b = np.cumsum(rolls_b[p, rng.integers(0, len(ROLLS), (len(active), window), dtype=np.uint8)], axis=1)
+        ko_b = dealt_a >= left_b[active, None]
+        ko_a = dealt_b >= left_a[active, None]
+        # Turn within the window on which each side faints; ``window`` if it does not
+        turn_b = np.where(ko_b[:, -1], ko_b.argmax(axis=1), window)
+        turn_a = np.where(ko_a[:, -1], ko_a.argmax(axis=1), window)
+        a_first_here = first[active]
+        a_wins = (turn_b < turn_a) | ((turn_b == turn_a) & (turn_b < window) & a_first_here)
+        b_wins = (turn_a < turn_b) | ((turn_a == turn_b) & (turn_a < window) & ~a_first_here)
+        outcome[active[a_wins]] = 1
+        outcome[active[b_wins]] = 2
+        undecided = ~(a_wins | b_wins)
+        active = active[undecided]
+        left_a[active] -= dealt_b[undecided, -1]
+        left_b[active] -= dealt_a[undecided, -1]
+        turn += window
+    wins_a = np.bincount(pair[outcome == 1], minlength=pairs)
+    wins_b = np.bincount(pair[outcome == 2], minlength=pairs)
+    return wins_a, wins_b, battles - wins_a - wins_b
+
+
+def chunk_rng(seed, chunk):
+    """Generator for chunk number ``chunk`` of a run seeded with ``seed``."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+
+
+def _run_chunk(job):
+    seed, chunk, rolls_a, rolls_b, hp_a, hp_b, a_first, battles, max_turns = job
+    return simulate(rolls_a, rolls_b, hp_a, hp_b, a_first, battles, chunk_rng(seed, chunk), max_turns)
+
+
+class Estimate:
+    """Running result of a duel.
+
+    Attributes:
+        battles: Battles fought so far.
+        wins: Battles won by the first Pokémon.
+        losses: Battles won by the second.
+        draws: Battles nobody won.
+    """
+
+    __slots__ = ('battles', 'wins', 'losses', 'draws')
+
+    def __init__(self, battles=0, wins=0, losses=0, draws=0):
+        self.battles = battles
+        self.wins = wins
+        self.losses = losses
+        self.draws = draws
+
+    @property
+    def win_rate(self):
+        return self.wins / self.battles if self.battles else 0.0
+
+    def interval(self, z=Z_95):
+        """(low, high) Wilson interval of the win rate."""
+        low, high = wilson_interval(self.wins, self.battles, z)
+        return float(low), float(high)
+
+
+def duel(combatants, a, b, battles, seed=None, batch=CHUNK_BATTLES, power=DEFAULT_POWER, max_turns=MAX_TURNS):
+    """Fight ``a`` against ``b`` ``battles`` times, in batches.
+
+    Yields:
+        The cumulative Estimate after each batch; stop iterating to stop early.
+    """
+    c = combatants
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    rolls_a = damage_rolls(c, [a], [b], power)
+    rolls_b = damage_rolls(c, [b], [a], power)
+    hp_a, hp_b = c.hp[[a]], c.hp[[b]]
+    a_first = first_mover(c, [a], [b])
+    estimate = Estimate()
+    for chunk, start in enumerate(range(0, battles, batch)):
+        size = min(batch, battles - start)
+        wins_a, wins_b, draws = simulate(rolls_a, rolls_b, hp_a, hp_b, a_first, size,
+                                         chunk_rng(seed, chunk), max_turns)
+        estimate.battles += size
+        estimate.wins += int(wins_a[0])
+        estimate.losses += int(wins_b[0])
+        estimate.draws += int(draws[0])
+        yield estimate
+
+
+def tournament(combatants, rows, battles, seed=None, workers=0, power=DEFAULT_POWER, max_turns=MAX_TURNS):
+    """Fight every pair of ``rows`` ``battles`` times.
+
+    Pairs are split into chunks of about CHUNK_BATTLES battles, computed in
+    this process (``workers`` 0) or in a process pool with at most two chunks
+    per worker in flight.
+
+    Yields:
+        (a rows, b rows, wins of a, wins of b, draws) per chunk, in order.
+    """
+    c = combatants
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    rows = np.asarray(rows, dtype=np.intp)
+    first, second = np.triu_indices(len(rows), 1)
+    a_rows, b_rows = rows[first], rows[second]
+    per_chunk = max(1, CHUNK_BATTLES // max(battles, 1))
+
+    def jobs():
+        for chunk, start in enumerate(range(0, len(a_rows), per_chunk)):
+            a, b = a_rows[start:start + per_chunk], b_rows[start:start + per_chunk]
+            yield a, b, (seed, chunk, damage_rolls(c, a, b, power), damage_rolls(c, b, a, power),
+                         c.hp[a], c.hp[b], first_mover(c, a, b), battles, max_turns)
+
+    if workers == 0:
+        for a, b, job in jobs():
+            yield (a, b) + _run_chunk(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pending = deque()
+        for a, b, job in jobs():
+            pending.append((a, b, pool.submit(_run_chunk, job)))
+            if len(pending) >= 2 * workers:
+                a_done, b_done, future = pending.popleft()
+                yield (a_done, b_done) + future.result()
+        while pending:
+            a_done, b_done, future = pending.popleft()
+            yield (a_done, b_done) + future.result()
+
+
+def _percent(value):
+    return f'{value * 100:5.1f}%'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo 1v1 battle simulator.')
+    parser.add_argument('--level', type=int, default=DEFAULT_LEVEL)
+    parser.add_argument('--power', type=int, default=DEFAULT_POWER)
+    parser.add_argument('--seed', type=int, help='seed for reproducible results (default: random, printed)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    duel_cmd = sub.add_parser('duel', help='win probability of one Pokémon against another')
+    duel_cmd.add_argument('first')
+    duel_cmd.add_argument('second')
+    duel_cmd.add_argument('--battles', type=int, default=100_000)
+    duel_cmd.add_argument('--batch', type=int, default=CHUNK_BATTLES, help='battles between progress lines')
+    duel_cmd.add_argument('--precision', type=float, default=0.0,
+                          help='stop once the 95%% interval is at most this wide on each side, e.g. 0.005')
+    tour_cmd = sub.add_parser('tournament', help='every pair of Pokémon, ranked by win rate')
+    tour_cmd.add_argument('--gen', type=int, nargs='+', help='generations to include (default: all)')
+    tour_cmd.add_argument('--battles', type=int, default=1000, help='battles per pair')
+    tour_cmd.add_argument('--workers', type=int, default=0, help='worker processes (0 = compute in this process)')
+    tour_cmd.add_argument('--top', type=int, default=20, help='Pokémon to list (0 for all)')
+    tour_cmd.add_argument('--out', help='CSV file for the per-pair results')
+    args = parser.parse_args(argv)
+
+    seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+    from data_store import get_store
+    store = get_store()
+    df = store.df
+    names = df['name'].to_numpy(dtype=object)
+    c = Combatants(df, args.level)
+    print(f'seed {seed}', file=sys.stderr)
+
+    if args.command == 'duel':
+        index = store.name_index()
+        rows = [index.get(name.lower()) for name in (args.first, args.second)]
+        for name, row in zip((args.first, args.second), rows):
+            if row is None:
+                print(f'Unknown Pokémon: {name}', file=sys.stderr)
+                return 2
+        a, b = rows
+        start = time.perf_counter()
+        for estimate in duel(c, a, b, args.battles, seed, args.batch, args.power):
+            low, high = estimate.interval()
+            print(f'{estimate.battles:>10,} battles: {names[a]} wins {_percent(estimate.win_rate)} '
+                  f'(95% CI {_percent(low)} - {_percent(high)}), {names[b]} {_percent(estimate.losses / estimate.battles)}, '
+                  f'draws {_percent(estimate.draws / estimate.battles)}')
+            if args.precision and max(estimate.win_rate - low, high - estimate.win_rate) <= args.precision:
+                break
+        seconds = time.perf_counter() - start
+        print(f'{estimate.battles:,} battles in {seconds:.2f} s ({estimate.battles / seconds:,.0f} battles/s)',
+              file=sys.stderr)
+        return 0
+
+    rows = np.arange(len(df)) if not args.gen else np.flatnonzero(df['generation'].isin(args.gen).to_numpy())
+    if len(rows) < 2:
+        print('Fewer than two Pokémon selected', file=sys.stderr)
+        return 2
+    pair_count = len(rows) * (len(rows) - 1) // 2
+    wins = np.zeros(len(df), dtype=np.int64)
+    fought = np.zeros(len(df), dtype=np.int64)
+    out = open(args.out, 'w', encoding='utf-8', newline='') if args.out else None
+    if out:
+        out.write('first,second,battles,first_wins,second_wins,draws,win_rate,ci_low,ci_high\n')
+    start = last_report = time.perf_counter()
+    done = 0
+    try:
+        for a, b, wins_a, wins_b, draws in tournament(c, rows, args.battles, seed, args.workers, args.power):
+            np.add.at(wins, a, wins_a)
+            np.add.at(wins, b, wins_b)
+            np.add.at(fought, a, args.battles)
+            np.add.at(fought, b, args.battles)
+            done += len(a)
+            if out:
+                low, high = wilson_interval(wins_a, args.battles)
+                for line in zip(names[a], names[b], wins_a, wins_b, draws, wins_a / args.battles, low, high):
+                    out.write('{},{},{},{},{},{},{:.4f},{:.4f},{:.4f}\n'.format(line[0], line[1], args.battles, *line[2:]))
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                leader = int(np.argmax(np.where(fought > 0, wins / np.maximum(fought, 1), -1)))
+                print(f'{done:,}/{pair_count:,} pairs, {done * args.battles / (now - start):,.0f} battles/s, '
+                      f'leading: {names[leader]} {_percent(wins[leader] / fought[leader])}', file=sys.stderr)
+    finally:
+        if out:
+            out.close()
+    seconds = time.perf_counter() - start
+
+    rate = np.where(fought > 0, wins / np.maximum(fought, 1), np.nan)[rows]
+    low, high = wilson_interval(wins[rows], fought[rows])
+    order = np.argsort(-rate, kind='stable')
+    shown = order[:args.top] if args.top else order
+    print(f"{'':>4} {'Pokémon':<14} {'win rate':>8}  95% CI")
+    for place, i in enumerate(shown, 1):
+        print(f'{place:>4} {names[rows[i]]:<14} {_percent(rate[i]):>8}  {_percent(low[i])} - {_percent(high[i])}')
+    total = pair_count * args.battles
+    print(f'{pair_count:,} pairs, {total:,} battles in {seconds:.2f} s ({total / seconds:,.0f} battles/s)',
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
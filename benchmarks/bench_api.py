@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import multiprocessing
+from urllib.parse import quote, urlsplit
+import numpy as np
+
+# Load test for the local JSON API (api_server.py)
+# Run from the repository root: python -m benchmarks.bench_api
+# Starts the server in a subprocess on a free port, unless --url points at a
+# running one, then opens many keep-alive connections from several client
+# processes, each sending a mix of searches, entries, single damage lookups,
+# asset fetches (half of them revalidations with If-None-Match) and small
+# batches as fast as the server answers. Prints throughput and the latency
+# percentiles per request kind. Anything but 200/304 counts as an error.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_START_TIMEOUT = 120      # seconds
+# Request kind -> share of the mix
+MIX = {'search': 0.25, 'entry': 0.25, 'damage': 0.25, 'asset': 0.2, 'batch': 0.05}
+BATCH_SIZE = 100
+TYPES = ('Fire', 'Water', 'Grass', 'Electric', 'Ice', 'Ground', 'Psychic', 'Dragon', 'Fairy', 'Steel')
+
+
+def _request(method, path, body=b'', headers=''):
+    return (f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n'
+            f'{headers}\r\n').encode('latin-1') + body
+
+
+async def _exchange(reader, writer, request):
+    writer.write(request)
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head[9:12])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line[:15].lower() == b'content-length:':
+            length = int(line[15:])
+    body = await reader.readexactly(length) if length else b''
+    return status, head, body
+
+
+async def _fetch(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, head, body = await _exchange(reader, writer, _request('GET', path))
+        return status, head, body
+    finally:
+        writer.close()
+
+
+async def _plan(host, port):
+    # Names and asset URLs come from the server, so the client needs no dataset
+    _, _, body = await _fetch(host, port, '/search?q=&limit=1000')
+    names = [r['name'] for r in json.loads(body)['results']]
+    assets = []
+    for name in names[:100]:
+        _, _, body = await _fetch(host, port, '/pokemon/' + quote(name))
+        entry = json.loads(body)['assets']
+        assets += [entry['image']] + entry['type_icons'] + ([entry['radar']] if entry['radar'] else [])
+    etags = {}
+    for url in sorted(set(assets)):
+        _, head, _ = await _fetch(host, port, url)
+        for line in head.decode('latin-1').split('\r\n'):
+            if line.lower().startswith('etag:'):
+                etags[url] = line.split(':', 1)[1].strip()
+    return names, etags
+
+
+def _make_request(kind, names, etags, rng):
+    if kind == 'search':
+        return _request('GET', '/search?limit=20&q=' + quote(rng.choice(names)[:3].lower()))
+    if kind == 'entry':
+        return _request('GET', '/pokemon/' + quote(rng.choice(names)))
+    if kind == 'damage':
+        return _request('GET', f'/damage?attack_type={rng.choice(TYPES)}&defender={quote(rng.choice(names))}'
+                               f'&attacker={quote(rng.choice(names))}&base_damage={rng.randrange(10, 150)}')
+    if kind == 'asset':
+        url = rng.choice(sorted(etags))
+        return _request('GET', url, headers=f'If-None-Match: {etags[url]}\r\n' if rng.random() < 0.5 else '')
+    matchups = [{'attack_type': rng.choice(TYPES), 'defender': rng.choice(names), 'attacker': rng.choice(names),
+                 'base_damage': rng.randrange(10, 150)} for _ in range(BATCH_SIZE)]
+    return _request('POST', '/damage/batch', json.dumps(matchups).encode('utf-8'),
+                    'Content-Type: application/json\r\n')
+
+
+async def _client(host, port, connections, seconds, names, etags, seed):
+    rng = random.Random(seed)
+    kinds = list(MIX)
+    weights = list(MIX.values())
+    # Requests are prepared up front so the client spends its time on I/O
+    pool = {kind: [_make_request(kind, names, etags, rng) for _ in range(200)] for kind in kinds}
+    latencies = {kind: [] for kind in kinds}
+    errors = 0
+    opened = []
+    for _ in range(connections):
+        opened.append(await asyncio.open_connection(host, port))
+    start = time.perf_counter()
+    deadline = start + seconds
+
+    async def loop(reader, writer):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            sent = time.perf_counter_ns()
+            try:
+                status, _, _ = await _exchange(reader, writer, rng.choice(pool[kind]))
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors += 1
+                return
+            latencies[kind].append(time.perf_counter_ns() - sent)
+            if status not in (200, 304):
+                errors += 1
+        writer.close()
+
+    await asyncio.gather(*(loop(reader, writer) for reader, writer in opened))
+    return {kind: np.array(values, dtype=np.int64) for kind, values in latencies.items()}, errors, \
+        time.perf_counter() - start
+
+
+def _client_process(args):
+    return asyncio.run(_client(*args))
+
+
+def _start_server():
+    process = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'api_server.py'), '--port', '0'],
+                               cwd=BASE_DIR, stdout=subprocess.PIPE, text=True)
+    started = time.perf_counter()
+    line = process.stdout.readline()
+    if not line.startswith('Listening on') or time.perf_counter() - started > SERVER_START_TIMEOUT:
+        process.kill()
+        raise RuntimeError(f'api_server.py did not start: {line!r}')
+    return process, line.split()[-1]
+
+
+def _summary(samples):
+    us = samples / 1e3
+    return {'count': len(us), 'p50_us': float(np.median(us)), 'p95_us': float(np.percentile(us, 95)),
+            'p99_us': float(np.percentile(us, 99)), 'max_us': float(us.max())}
+
+
+def run(connections=2000, seconds=10.0, processes=4, url=None):
+    """Load the server with ``connections`` keep-alive clients for ``seconds``.
+
+    Returns:
+        Dict with requests per second, errors, and latency percentiles (µs)
+        overall and per request kind.
+    """
+    server = None
+    if url is None:
+        server, url = _start_server()
+    try:
+        address = urlsplit(url)
+        host, port = address.hostname, address.port
+        names, etags = asyncio.run(_plan(host, port))
+        processes = max(1, min(processes, connections))
+        shares = [connections // processes + (i < connections % processes) for i in range(processes)]
+        jobs = [(host, port, share, seconds, names, etags, i) for i, share in enumerate(shares)]
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            outcomes = pool.map(_client_process, jobs)
+    finally:
+        if server is not None:
+            server.kill()
+            server.wait()
+
+    by_kind = {kind: np.concatenate([o[0][kind] for o in outcomes]) for kind in MIX}
+    every = np.concatenate(list(by_kind.values()))
+    elapsed = max(o[2] for o in outcomes)
+    errors = sum(o[1] for o in outcomes)
+    result = {'connections': connections, 'seconds': elapsed, 'requests': len(every),
+              'requests_per_s': len(every) / elapsed, 'errors': errors, **_summary(every)}
+    print(f"{connections} connections, {result['requests']} requests in {elapsed:.1f} s: "
+          f"{result['requests_per_s']:,.0f} req/s, {errors} errors")
+    print(f"    {'all':<8} p50 {result['p50_us']:9.0f} µs  p95 {result['p95_us']:9.0f} µs  "
+          f"p99 {result['p99_us']:9.0f} µs  max {result['max_us']:9.0f} µs")
+    for kind, samples in by_kind.items():
+        if len(samples):
+            s = result[kind] = _summary(samples)
+            print(f"    {kind:<8} p50 {s['p50_us']:9.0f} µs  p95 {s['p95_us']:9.0f} µs  "
+                  f"p99 {s['p99_us']:9.0f} µs  max {s['max_us']:9.0f} µs  ({s['count']} requests)")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test for the local JSON API.')
+    parser.add_argument('--connections', type=int, default=2000, help='concurrent keep-alive clients')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--processes', type=int, default=4, help='client processes')
+    parser.add_argument('--url', help='running server, e.g. http://127.0.0.1:8765/ (default: start one)')
+    args = parser.parse_args(argv)
+    run(args.connections, args.seconds, args.processes, args.url)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import sys
+import time
+import argparse
+import numpy as np
+from matchups import Combatants
+from battle_sim import duel, tournament
+
+# Throughput benchmark for battle_sim
+# Run from the repository root: python -m benchmarks.bench_battle
+# Times duels of increasing size for a close matchup and a one-sided one,
+# then a tournament of every pair in one generation, in this process and in
+# a process pool. Results are in battles per second.
+
+DUELS = (('Chansey', 'Diglett'), ('Garchomp', 'Blissey'))
+
+
+def run(sizes=(1000, 100_000, 1_000_000), generation=1, battles=1000, workers=(0, 2), seed=0):
+    """Time duels of ``sizes`` battles and a tournament of ``generation``.
+
+    Returns:
+        List of result dicts with the time and battles per second.
+    """
+    from data_store import get_store
+    store = get_store()
+    c = Combatants(store.df)
+    index = store.name_index()
+    results = []
+    for first, second in DUELS:
+        a, b = index[first.lower()], index[second.lower()]
+        for size in sizes:
+            start = time.perf_counter()
+            estimate = list(duel(c, a, b, size, seed))[-1]
+            seconds = time.perf_counter() - start
+            rate = size / seconds
+            print(f'duel {first}-{second} {size:>9} battles  {seconds * 1e3:9.2f} ms  {rate / 1e6:6.2f} M battles/s  '
+                  f'win rate {estimate.win_rate:.3f}')
+            results.append({'case': f'duel.{first}-{second}', 'battles': size, 'seconds': seconds,
+                            'battles_per_s': rate})
+
+    rows = np.flatnonzero(store.df['generation'].to_numpy() == generation)
+    total = len(rows) * (len(rows) - 1) // 2 * battles
+    for count in workers:
+        start = time.perf_counter()
+        for _chunk in tournament(c, rows, battles, seed, count):
+            pass
+        seconds = time.perf_counter() - start
+        rate = total / seconds
+        print(f'tournament gen {generation} ({total:,} battles, {count} workers)  {seconds:7.2f} s  '
+              f'{rate / 1e6:6.2f} M battles/s')
+        results.append({'case': f'tournament.workers{count}', 'battles': total, 'seconds': seconds,
+                        'battles_per_s': rate})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo battle throughput benchmark.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100_000, 1_000_000], help='battles per duel')
+    parser.add_argument('--gen', type=int, default=1, help='generation of the tournament')
+    parser.add_argument('--battles', type=int, default=1000, help='battles per tournament pair')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2], help='pool sizes to time (0 = in process)')
+    args = parser.parse_args(argv)
+    run(args.sizes, args.gen, args.battles, args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
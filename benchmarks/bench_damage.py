@@ -0,0 +1,46 @@
+import sys
+import time
+import argparse
+import numpy as np
+from damage import all_types, batch_damage, NO_TYPE
+
+# Throughput benchmark for damage.batch_damage
+# Run from the repository root: python -m benchmarks.bench_damage
+
+
+def run(sizes=(1, 1000, 1_000_000, 10_000_000), repeat=5, seed=0):
+    """Time batch_damage on random matchups of several batch sizes.
+
+    Returns:
+        List of result dicts with the best time and matchups per second.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in sizes:
+        attack = rng.integers(0, len(all_types), size)
+        defend1 = rng.integers(0, len(all_types), size)
+        defend2 = rng.integers(0, NO_TYPE + 1, size)
+        stab = rng.random(size) < 0.5
+        base = rng.uniform(10, 150, size)
+        best = np.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            batch_damage(attack, defend1, defend2, stab, base)
+            best = min(best, time.perf_counter() - start)
+        rate = size / best
+        print(f'{size:>10} matchups  {best * 1e3:9.3f} ms  {rate / 1e6:8.2f} M matchups/s')
+        results.append({'size': size, 'seconds': best, 'matchups_per_s': rate})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch damage throughput benchmark.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    run(args.sizes, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Event-latency benchmark for Pokédex navigation
+# Run from the repository root: python -m benchmarks.bench_pokedex
+# Each sample clicks Next and processes events until the click has been
+# handled and the window repainted; the click handler alone is timed too.
+# Without a display Qt's offscreen platform is used.
+
+
+def _percentiles(samples):
+    samples = np.array(samples) * 1e6
+    return float(np.median(samples)), float(np.percentile(samples, 95)), float(samples.max())
+
+
+def run(steps=300, query=''):
+    """Time Next clicks through the results of ``query``.
+
+    Images and results list thumbnails are loaded before each click, as they
+    are when the user pauses between clicks, so the numbers are the cost of
+    updating the window.
+
+    Returns:
+        Dict with median, p95 and max latency in µs for the handler and for the
+        whole event, and the time to open the window.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    from pokedex import PokedexWindow
+
+    start = time.perf_counter()
+    window = PokedexWindow()
+    open_ms = (time.perf_counter() - start) * 1e3
+    window.show()
+    window.search_input.setText(query)
+    window.run_search()
+    app.processEvents()
+
+    samples = []
+    handler = []
+    for _ in range(min(steps, len(window.rows) - 1)):
+        # Thumbnails for the results list are queued once the list has painted
+        app.processEvents()
+        window.assets.wait()
+        app.processEvents()
+        start = time.perf_counter()
+        window.btn_next.click()
+        handled = time.perf_counter()
+        app.processEvents()
+        samples.append(time.perf_counter() - start)
+        handler.append(handled - start)
+    h_median, h_p95, h_worst = _percentiles(handler)
+    median, p95, worst = _percentiles(samples)
+    print(f'window opened in {open_ms:8.1f} ms')
+    print(f'{len(samples):>5} Next clicks')
+    print(f'    handler   median {h_median:8.1f} µs  p95 {h_p95:8.1f} µs  max {h_worst:8.1f} µs')
+    print(f'    +repaint  median {median:8.1f} µs  p95 {p95:8.1f} µs  max {worst:8.1f} µs')
+    print(f'image cache: {window.assets.stats()}')
+    window.close()
+    return {'steps': len(samples), 'handler_median_us': h_median, 'handler_p95_us': h_p95,
+            'median_us': median, 'p95_us': p95, 'max_us': worst, 'open_ms': open_ms}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pokédex navigation latency benchmark.')
+    parser.add_argument('--steps', type=int, default=300)
+    parser.add_argument('--query', default='', help='search to navigate through (default: everything)')
+    args = parser.parse_args(argv)
+    run(args.steps, args.query)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import sys
+import time
+import argparse
+import numpy as np
+from dataset import load_dataset, synthetic_dataset
+from search_index import SearchIndex
+from query_engine import QueryEngine, compile_query
+
+# Microbenchmark for query_engine.QueryEngine
+# Run from the repository root: python -m benchmarks.bench_query
+
+QUERIES = [
+    'hp>=100',
+    'type1:fire hp>=100 gen:1..3 legendary:no ability:"flash fire" sort:-speed',
+    'gen:1..3 -type:water sort:-base_total,name',
+    'legendary:yes sort:-attack',
+    'against_ground>=2 against_electric<=0.5',
+    'weak:ground resists:electric',
+    'resists:fire resists:ground immune:electric -weak:water,ice',
+    'capture<=45 weight>=100 sort:weight',
+    'char sort:-speed',
+]
+
+
+def run(factors=(1, 10, 100), repeat=500):
+    """Time plan compilation (cold and cached) and whole-table query execution.
+
+    Returns:
+        List of result dicts, one per (factor, query) pair. Times are in µs.
+    """
+    base = load_dataset()
+    results = []
+    for factor in factors:
+        df = synthetic_dataset(base, factor)
+        engine = QueryEngine(df, SearchIndex(df))
+        print(f'{len(df):>7} rows')
+        for query in QUERIES:
+            compile_query.cache_clear()
+            start = time.perf_counter()
+            compile_query(query)
+            parse_us = (time.perf_counter() - start) * 1e6
+            engine.run(query)
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = engine.run(query)
+                samples.append(time.perf_counter() - start)
+            samples = np.array(samples) * 1e6
+            median, p95 = float(np.median(samples)), float(np.percentile(samples, 95))
+            print(f'    {len(rows):>7} hits  parse {parse_us:7.1f} µs  run median {median:8.1f} µs  p95 {p95:8.1f} µs  {query}')
+            results.append({'rows': len(df), 'query': query, 'hits': len(rows), 'parse_us': parse_us,
+                            'median_us': median, 'p95_us': p95})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Field query microbenchmark.')
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100], help='dataset scale factors')
+    parser.add_argument('--repeat', type=int, default=500, help='timed runs per query')
+    args = parser.parse_args(argv)
+    run(args.factors, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Repaint benchmark for the app's windows
+# Run from the repository root: python -m benchmarks.bench_repaint
+# Each window is opened and shown, then repainted synchronously; a sample is
+# the wall time of one repaint(), which paints the window and every child.
+# CPU time over all samples is reported too. Without a display Qt's offscreen
+# platform is used.
+
+
+def _main_window():
+    # Shown and left to finish its background loading, so that the timed
+    # repaints neither miss the background nor compete with the preloader
+    from PySide6.QtWidgets import QApplication
+    from main import MainWindow
+    window = MainWindow()
+    window.show()
+    window.image_loader.wait()
+    while window.preloader is None or not window.preloader.isFinished():
+        QApplication.processEvents()
+        time.sleep(0.01)
+    QApplication.processEvents()
+    return window
+
+
+def _window(module, name):
+    def make():
+        return getattr(__import__(module), name)()
+    return make
+
+
+WINDOWS = {
+    'main': _main_window,
+    'reports': _window('bsc_data', 'BscDataWindow'),
+    'pokedex': _window('pokedex', 'PokedexWindow'),
+    'calculator': _window('damage_calculator', 'CalculatorWindow'),
+    'team': _window('team_window', 'TeamBuilderWindow'),
+}
+
+
+def run(repaints=200, names=tuple(WINDOWS)):
+    """Time full repaints of each window in ``names``.
+
+    Returns:
+        Dict of window name -> median, p95 and max repaint time in µs and CPU
+        time per repaint in µs.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+
+    results = {}
+    for name in names:
+        window = WINDOWS[name]()
+        window.show()
+        app.processEvents()
+        window.repaint()
+        samples = []
+        cpu_start = time.process_time()
+        for _ in range(repaints):
+            start = time.perf_counter()
+            window.repaint()
+            samples.append(time.perf_counter() - start)
+        cpu = (time.process_time() - cpu_start) / repaints * 1e6
+        window.close()
+        app.processEvents()
+        samples = np.array(samples) * 1e6
+        median, p95, worst = float(np.median(samples)), float(np.percentile(samples, 95)), float(samples.max())
+        print(f'{name:<12} median {median:8.1f} µs  p95 {p95:8.1f} µs  max {worst:8.1f} µs  cpu {cpu:8.1f} µs')
+        results[name] = {'median_us': median, 'p95_us': p95, 'max_us': worst, 'cpu_us': cpu}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Window repaint benchmark.')
+    parser.add_argument('--repaints', type=int, default=200)
+    parser.add_argument('windows', nargs='*', help=f"windows to time, of: {' '.join(WINDOWS)} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.windows if name not in WINDOWS]
+    if unknown:
+        parser.error(f"unknown window: {', '.join(unknown)}")
+    run(args.repaints, args.windows or list(WINDOWS))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
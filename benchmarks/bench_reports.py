@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from dataset import load_dataset, synthetic_dataset
+from report_engine import REPORT_NAMES, ReportEngine
+
+# Benchmark for the Basic Data Reports
+# Run from the repository root: python -m benchmarks.bench_reports
+# Times computing every report from scratch, bringing them up to date after
+# a few rows change (the incremental path), drawing each chart, and switching
+# reports in the window once they have been prerendered. Without a display
+# Qt's offscreen platform is used.
+
+
+class _Store:
+    # Just what ReportEngine reads from a DataStore
+    def __init__(self, df):
+        self.df = df
+        self.version = 1
+
+    def replace(self, df):
+        self.df = df
+        self.version += 1
+
+
+def _all_charts(engine):
+    start = time.perf_counter()
+    for name in REPORT_NAMES:
+        engine.chart(name)
+    return (time.perf_counter() - start) * 1e3
+
+
+def run(factors=(1, 10, 100), changed=(1, 10, 100), repeat=5):
+    """Time full and incremental report computation, and chart drawing.
+
+    Returns:
+        List of result dicts; times are in ms.
+    """
+    base = load_dataset()
+    rng = np.random.default_rng(0)
+    results = []
+    for factor in factors:
+        df = synthetic_dataset(base, factor)
+        full = []
+        for _ in range(repeat):
+            full.append(_all_charts(ReportEngine(_Store(df))))
+        full_ms = float(np.median(full))
+        print(f'{len(df):>7} rows  all reports from scratch  {full_ms:8.1f} ms')
+        results.append({'rows': len(df), 'changed': len(df), 'mode': 'full', 'ms': full_ms})
+
+        store = _Store(df)
+        engine = ReportEngine(store)
+        _all_charts(engine)
+        for count in changed:
+            if count > len(df):
+                continue
+            samples = []
+            for _ in range(repeat):
+                edited = store.df.copy()
+                rows = rng.choice(len(edited), count, replace=False)
+                edited.loc[edited.index[rows], 'attack'] = rng.integers(5, 190, count)
+                store.replace(edited)
+                samples.append(_all_charts(engine))
+            ms = float(np.median(samples))
+            print(f'    {count:>5} rows changed  {engine.last_refresh["mode"]:<11}  {ms:8.1f} ms')
+            results.append({'rows': len(df), 'changed': count, 'mode': engine.last_refresh['mode'], 'ms': ms})
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    from report_charts import render_chart
+    engine = ReportEngine(_Store(base))
+    print('drawing at 680x430')
+    for name in REPORT_NAMES:
+        chart = engine.chart(name)
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render_chart(chart, 680, 430)
+            samples.append(time.perf_counter() - start)
+        ms = float(np.median(samples)) * 1e3
+        print(f'    {name:<32} {ms:8.2f} ms')
+        results.append({'report': name, 'draw_ms': ms})
+
+    # Switching in the window: the chart comes from the prerendered pixmaps
+    from bsc_data import BscDataWindow
+    window = BscDataWindow()
+    window.show()
+    window.prerenderer.wait()
+    app.processEvents()
+    samples = []
+    for _ in range(repeat):
+        for index in range(window.combo.count()):
+            start = time.perf_counter()
+            window.combo.setCurrentIndex(index)
+            window.repaint()
+            samples.append(time.perf_counter() - start)
+    window.close()
+    samples = np.array(samples) * 1e3
+    print(f'switching reports  median {np.median(samples):6.2f} ms  max {samples.max():6.2f} ms')
+    results.append({'switch_ms': float(np.median(samples)), 'switch_max_ms': float(samples.max())})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report engine benchmark.')
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100], help='dataset scale factors')
+    parser.add_argument('--changed', type=int, nargs='+', default=[1, 10, 100], help='rows changed per update')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    run(args.factors, args.changed, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Scrolling benchmark for the Pokédex results list
+# Run from the repository root: python -m benchmarks.bench_results
+# Lists the whole dataset repeated --factor times (100k rows at the default
+# 125) in a QTableView set up like the Pokédex's, then scrolls it from top to
+# bottom a few rows per step, as a mouse wheel does, and times each repaint.
+# Thumbnails are not waited for: they arrive from the pool while scrolling,
+# as they would for the user. Also times sorting the result by each column.
+# Without a display Qt's offscreen platform is used.
+
+FRAME_BUDGET_MS = 1000 / 60
+WHEEL_ROWS = 3
+
+
+def run(factor=125, steps=2000, wheel_rows=WHEEL_ROWS):
+    """Scroll a ``factor`` times repeated result for ``steps`` wheel steps.
+
+    Returns:
+        Dict with the row count, repaint median/p95/max in ms, frames over
+        the 60 fps budget, sort times per column and the asset cache size.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication, QTableView, QHeaderView, QAbstractItemView
+    from PySide6.QtCore import Qt, QSize
+    app = QApplication.instance() or QApplication([])
+    from data_store import get_store
+    from dataset import synthetic_dataset
+    from display_records import DisplayTable
+    from query_engine import QueryColumns
+    from asset_cache import THUMBNAIL_SIZE, AssetCache
+    from results_model import COLUMNS, ROW_HEIGHT, ResultsModel
+    from pokedex import RESULTS_WIDTH, RESULTS_COLUMN_WIDTHS
+
+    df = synthetic_dataset(get_store().df, factor)
+    records = DisplayTable(df)
+    assets = AssetCache()
+    model = ResultsModel(records, QueryColumns(df), assets)
+    model.set_rows(np.arange(len(df)))
+
+    view = QTableView()
+    view.setModel(model)
+    view.resize(RESULTS_WIDTH, 500)
+    view.setSelectionBehavior(QAbstractItemView.SelectRows)
+    view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+    view.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    view.verticalHeader().hide()
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    for column, width in enumerate(RESULTS_COLUMN_WIDTHS):
+        view.horizontalHeader().resizeSection(column, width)
+    view.setSortingEnabled(True)
+    view.show()
+    app.processEvents()
+
+    # Evenly spaced over the whole list, so every part of it is painted
+    bar = view.verticalScrollBar()
+    stride = max(wheel_rows * ROW_HEIGHT, bar.maximum() // max(steps, 1))
+    frames = []
+    for value in range(0, bar.maximum() + 1, stride)[:steps]:
+        start = time.perf_counter()
+        bar.setValue(value)
+        view.viewport().repaint()
+        app.processEvents()
+        frames.append(time.perf_counter() - start)
+    assets.wait()
+    app.processEvents()
+    frames = np.array(frames) * 1e3
+
+    sorts = {}
+    for column, (header, _field) in enumerate(COLUMNS):
+        start = time.perf_counter()
+        view.sortByColumn(column, Qt.DescendingOrder)
+        view.viewport().repaint()
+        sorts[header] = (time.perf_counter() - start) * 1e3
+
+    result = {'rows': len(df), 'frames': len(frames), 'median_ms': float(np.median(frames)),
+              'p95_ms': float(np.percentile(frames, 95)), 'max_ms': float(frames.max()),
+              'over_budget': int((frames > FRAME_BUDGET_MS).sum()),
+              'sort_ms': sorts, 'cache': assets.stats()}
+    print(f"{result['rows']:,} rows, {len(frames)} scroll steps")
+    print(f"    repaint   median {result['median_ms']:6.2f} ms  p95 {result['p95_ms']:6.2f} ms  "
+          f"max {result['max_ms']:6.2f} ms  ({result['over_budget']} over {FRAME_BUDGET_MS:.1f} ms)")
+    print('    sort      ' + '  '.join(f'{header} {ms:6.1f} ms' for header, ms in sorts.items()))
+    print(f"image cache: {result['cache']}")
+    view.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pokédex results list scrolling benchmark.')
+    parser.add_argument('--factor', type=int, default=125, help='times the dataset is repeated')
+    parser.add_argument('--steps', type=int, default=2000, help='scroll steps')
+    args = parser.parse_args(argv)
+    run(args.factor, args.steps)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import sys
+import time
+import argparse
+import numpy as np
+from dataset import load_dataset, synthetic_dataset
+from search_index import SearchIndex, IncrementalSearch
+
+# Microbenchmark for search_index.SearchIndex
+# Run from the repository root: python -m benchmarks.bench_search
+
+QUERIES = ['a', 'fi', 'fire', 'pika', 'pikachu', 'char', 'lightning rod', 'dragon', 'pikachy', 'ピカ', 'zzzz']
+TYPED = 'charizard'
+
+
+def _time_per_call(fn, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1e6
+    return float(np.median(samples)), float(np.percentile(samples, 95))
+
+
+def run(factors=(1, 10, 100), repeat=200):
+    """Time index build, single queries and a search-as-you-type sequence.
+
+    The result cache is cleared before every timed call, so these are cold
+    query costs.
+
+    Returns:
+        List of result dicts, one per (factor, query) pair. Times are in µs.
+    """
+    base = load_dataset()
+    results = []
+    for factor in factors:
+        df = synthetic_dataset(base, factor)
+        start = time.perf_counter()
+        index = SearchIndex(df)
+        build_ms = (time.perf_counter() - start) * 1e3
+        print(f'{len(df):>7} rows  index built in {build_ms:8.1f} ms  ({len(index.terms)} terms)')
+        for query in QUERIES:
+            median, p95 = _time_per_call(lambda: index.search(query), repeat, index.clear_cache)
+            hits = len(index.search(query))
+            print(f'    {query!r:>16}  {hits:>7} hits  median {median:8.1f} µs  p95 {p95:8.1f} µs')
+            results.append({'rows': len(df), 'query': query, 'hits': hits, 'median_us': median, 'p95_us': p95})
+
+        def typed():
+            session = IncrementalSearch(index)
+            for i in range(1, len(TYPED) + 1):
+                session.search(TYPED[:i])
+        median, p95 = _time_per_call(typed, max(1, repeat // 10), index.clear_cache)
+        per_key = median / len(TYPED)
+        print(f'    typing {TYPED!r}: {per_key:8.1f} µs per keystroke')
+        results.append({'rows': len(df), 'query': f'typed:{TYPED}', 'median_us': per_key, 'p95_us': p95 / len(TYPED)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search index microbenchmark.')
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100], help='dataset scale factors')
+    parser.add_argument('--repeat', type=int, default=200, help='timed calls per query')
+    args = parser.parse_args(argv)
+    run(args.factors, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
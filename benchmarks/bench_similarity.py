@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+from dataset import load_dataset, synthetic_dataset
+from similarity_index import BASE_STATS, Partition, SimilarityIndex
+
+# Benchmark for the "similar Pokémon" index
+# Run from the repository root: python -m benchmarks.bench_similarity
+# Times building the index, reloading a saved partition, exact queries, and
+# approximate queries at several probe counts together with their recall
+# (the share of the exact k nearest neighbours they return). The copies made
+# by synthetic_dataset get jittered stats, so that rows are not exact
+# duplicates of each other.
+
+
+def _jittered(df, factor, rng):
+    df = synthetic_dataset(df, factor)
+    if factor > 1:
+        df = df.copy()
+        copies = np.arange(len(df)) >= len(df) // factor
+        for stat in BASE_STATS:
+            noise = rng.integers(-10, 11, len(df)) * copies
+            df[stat] = np.maximum(df[stat].to_numpy() + noise, 1)
+    return df
+
+
+def _per_query(function, rows):
+    start = time.perf_counter()
+    results = [function(row) for row in rows]
+    return (time.perf_counter() - start) / len(rows) * 1e6, results
+
+
+def _recall(exact, approximate):
+    # Ties: any row as close as the exact k-th neighbour counts as a hit
+    hits = 0
+    for (_, ed), (_, ad) in zip(exact, approximate):
+        hits += int(np.sum(ad <= ed[-1] + 1e-5))
+    return hits / sum(len(ed) for _, ed in exact)
+
+
+def run(factors=(1, 10, 100), k=10, queries=200, probes=(1, 2, 4, 8, 16, 32, 64)):
+    """Time exact and approximate similarity queries.
+
+    Returns:
+        List of result dicts; times are in µs per query unless named ``_ms``.
+    """
+    base = load_dataset()
+    rng = np.random.default_rng(0)
+    results = []
+    for factor in factors:
+        df = _jittered(base, factor, rng)
+        start = time.perf_counter()
+        index = SimilarityIndex(df, approximate=False)
+        vectors_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        index.partition = Partition.build(index.vectors)
+        partition_ms = (time.perf_counter() - start) * 1e3
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'similarity.npz')
+            index.save(path)
+            start = time.perf_counter()
+            index.load_partition(path)
+            load_ms = (time.perf_counter() - start) * 1e3
+        print(f'{len(df):>7} rows  vectors {vectors_ms:7.1f} ms  partition {partition_ms:8.1f} ms'
+              f'  ({len(index.partition.centroids)} clusters)  load saved {load_ms:6.1f} ms')
+
+        rows = rng.choice(len(df), min(queries, len(df)), replace=False)
+        exact_us, exact = _per_query(lambda r: index.similar(r, k, exact=True), rows)
+        print(f'    exact               {exact_us:8.1f} µs/query')
+        results.append({'rows': len(df), 'mode': 'exact', 'us': exact_us, 'recall': 1.0,
+                        'partition_ms': partition_ms, 'load_ms': load_ms})
+        for count in probes:
+            if count > len(index.partition.centroids):
+                break
+            us, approximate = _per_query(lambda r: index.similar(r, k, exact=False, probes=count), rows)
+            recall = _recall(exact, approximate)
+            print(f'    {count:>3} probes          {us:8.1f} µs/query  recall@{k} {recall:6.3f}')
+            results.append({'rows': len(df), 'mode': 'approximate', 'probes': count, 'us': us, 'recall': recall})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Similarity index benchmark.')
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100], help='dataset scale factors')
+    parser.add_argument('-k', type=int, default=10, help='neighbours per query')
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args(argv)
+    run(args.factors, args.k, args.queries)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
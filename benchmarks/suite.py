@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+# Benchmark suite
+# Run from the repository root:
+#   python -m benchmarks.suite run [--quick] [--label NAME] [case ...]
+#   python -m benchmarks.suite compare [--baseline REF] [--current REF] [--threshold 0.1]
+# ``run`` times every hot path (dataset load, search, queries, Pokédex
+# navigation, results list scrolling, damage, battle simulation, reports, the
+# JSON API, cold start) headless and appends one entry to the history file.
+# Each entry maps metric names to times, lower is better.
+# ``compare`` lines up two entries and exits with status 1 if any metric got
+# slower than the threshold allows, so it can gate dependency upgrades.
+# The case benchmarks are the bench_* modules; their own output is shown as
+# they run.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_HISTORY = os.path.join(BASE_DIR, 'benchmarks', 'history.json')
+DEFAULT_FACTORS = (1, 10, 100)
+DEFAULT_THRESHOLD = 0.10
+# Changes smaller than this (in µs) are never reported, however large the ratio
+DEFAULT_NOISE_US = 20.0
+STARTUP_TIMEOUT = 120       # seconds
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e3
+
+
+def _dataset(factors, quick):
+    from dataset import read_source, load_dataset
+    from data_store import DataStore
+    metrics = {
+        'dataset.xlsx_parse_ms': _median_ms(read_source, 1 if quick else 3),
+        'dataset.cache_load_ms': _median_ms(load_dataset, 5 if quick else 20),
+        'dataset.store_first_access_ms': _median_ms(lambda: DataStore().df, 5 if quick else 20),
+    }
+    for name, value in metrics.items():
+        print(f'{name:<36} {value:9.2f} ms')
+    return metrics
+
+
+def _search(factors, quick):
+    from benchmarks import bench_search
+    results = bench_search.run(factors, 50 if quick else 200)
+    return {f"search.{r['rows']}.{r['query']}_us": r['median_us'] for r in results}
+
+
+def _query(factors, quick):
+    from benchmarks import bench_query
+    results = bench_query.run(factors, 100 if quick else 500)
+    return {f"query.{r['rows']}.{r['query']}_us": r['median_us'] for r in results}
+
+
+def _pokedex(factors, quick):
+    # Next through the whole table, one entry at a time
+    from benchmarks import bench_pokedex
+    from data_store import get_store
+    result = bench_pokedex.run(steps=100 if quick else len(get_store().df) - 1)
+    return {f'pokedex.{key}': value for key, value in result.items() if key.endswith(('_us', '_ms'))}
+
+
+def _results(factors, quick):
+    from benchmarks import bench_results
+    result = bench_results.run(steps=300 if quick else 2000)
+    return {'results.repaint_median_ms': result['median_ms'], 'results.repaint_p95_ms': result['p95_ms'],
+            'results.sort_max_ms': max(result['sort_ms'].values())}
+
+
+def _damage(factors, quick):
+    from benchmarks import bench_damage
+    sizes = (1, 1000, 100_000) if quick else (1, 1000, 1_000_000, 10_000_000)
+    metrics = {f"damage.batch.{r['size']}_ms": r['seconds'] * 1e3 for r in bench_damage.run(sizes)}
+
+    # One click of the calculator's button, including the result label
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    from damage_calculator import CalculatorWindow
+    window = CalculatorWindow()
+    window.damage_entry.setText('80')
+    metrics['damage.calculator_click_us'] = _median_ms(window.calculate_damage, 200 if quick else 1000) * 1e3
+    window.close()
+    print(f"calculator click  {metrics['damage.calculator_click_us']:8.1f} µs")
+    return metrics
+
+
+def _battle(factors, quick):
+    # Time per million battles, so that lower is better like the rest
+    from benchmarks import bench_battle
+    sizes = (1000, 100_000) if quick else (1000, 100_000, 1_000_000)
+    results = bench_battle.run(sizes, battles=200 if quick else 1000, workers=(0,))
+    return {f"battle.{r['case']}.{r['battles']}.per_m_ms": 1e9 / r['battles_per_s'] for r in results}
+
+
+def _reports(factors, quick):
+    from benchmarks import bench_reports
+    metrics = {}
+    for r in bench_reports.run(factors, (1, 100), 3 if quick else 5):
+        if 'switch_ms' in r:
+            metrics['reports.switch_ms'] = r['switch_ms']
+            metrics['reports.switch_max_ms'] = r['switch_max_ms']
+        elif 'report' in r:
+            metrics[f"reports.draw.{r['report']}_ms"] = r['draw_ms']
+        elif r['mode'] == 'full':
+            metrics[f"reports.{r['rows']}.full_ms"] = r['ms']
+        else:
+            metrics[f"reports.{r['rows']}.changed{r['changed']}_ms"] = r['ms']
+    return metrics
+
+
+def _api(factors, quick):
+    # Throughput as time per request, so that lower is better like the rest
+    from benchmarks import bench_api
+    result = bench_api.run(connections=200 if quick else 2000, seconds=3 if quick else 10)
+    return {'api.per_request_us': 1e6 / result['requests_per_s'], 'api.p50_us': result['p50_us'],
+            'api.p99_us': result['p99_us']}
+
+
+def _start_once():
+    # main.py in a fresh interpreter, with its startup timeline on stderr
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen', POKEMON_TOOLS_TIMELINE='1')
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'main.py')], cwd=BASE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    marks = {}
+    try:
+        for line in process.stderr:
+            if not line.startswith('[startup]'):
+                continue
+            elapsed, event = line[len('[startup]'):].split('ms', 1)
+            event = event.strip()
+            marks[event] = float(elapsed)
+            if event == 'first paint':
+                marks['process first paint'] = (time.perf_counter() - start) * 1e3
+            if event == 'ready' or event.startswith('preload failed') \
+                    or time.perf_counter() - start > STARTUP_TIMEOUT:
+                break
+    finally:
+        process.kill()
+        process.wait()
+    return marks
+
+
+def _startup(factors, quick):
+    runs = [_start_once() for _ in range(2 if quick else 5)]
+    metrics = {}
+    for event in ('imports', 'window shown', 'first paint', 'ready', 'process first paint'):
+        values = [marks[event] for marks in runs if event in marks]
+        if values:
+            name = f"startup.{event.replace(' ', '_')}_ms"
+            metrics[name] = float(np.median(values))
+            print(f'{name:<36} {metrics[name]:9.1f} ms')
+    return metrics
+
+
+CASES = {
+    'dataset': _dataset,
+    'search': _search,
+    'query': _query,
+    'pokedex': _pokedex,
+    'results': _results,
+    'damage': _damage,
+    'battle': _battle,
+    'reports': _reports,
+    'api': _api,
+    'startup': _startup,
+}
+
+
+def _versions():
+    versions = {'python': platform.python_version(), 'platform': platform.platform()}
+    for module in ('numpy', 'pandas', 'PySide6'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    try:
+        versions['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return versions
+
+
+def load_history(path=DEFAULT_HISTORY):
+    """Entries of the history file, oldest first; [] if there is none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _save_history(path, history):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def run(cases=tuple(CASES), factors=DEFAULT_FACTORS, quick=False, label=None, history=DEFAULT_HISTORY):
+    """Run ``cases`` and append the results to ``history``.
+
+    Returns:
+        The new history entry.
+    """
+    metrics = {}
+    for name in cases:
+        print(f'== {name}', flush=True)
+        metrics.update(CASES[name](factors, quick))
+    entry = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'label': label,
+        'quick': quick,
+        'factors': list(factors),
+        'versions': _versions(),
+        'metrics': metrics,
+    }
+    if history:
+        entries = load_history(history)
+        entries.append(entry)
+        _save_history(history, entries)
+        print(f'{len(metrics)} metrics saved as entry {len(entries) - 1} of {history}')
+    return entry
+
+
+def _find(history, ref):
+    # An entry by index (negative counts from the end) or by label, latest first
+    try:
+        return history[int(ref)]
+    except ValueError:
+        pass
+    except IndexError:
+        raise KeyError(ref)
+    for entry in reversed(history):
+        if entry.get('label') == ref:
+            return entry
+    raise KeyError(ref)
+
+
+def _in_us(name, value):
+    return value * 1e3 if name.endswith('_ms') else value
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, noise_us=DEFAULT_NOISE_US):
+    """Metrics of two history entries side by side.
+
+    Returns:
+        List of (name, baseline value, current value, ratio, regressed) for the
+        metrics present in both. A metric regressed when it is slower by more
+        than ``threshold`` (a fraction) and by more than ``noise_us``.
+    """
+    rows = []
+    for name, old in baseline['metrics'].items():
+        new = current['metrics'].get(name)
+        if new is None:
+            continue
+        ratio = new / old if old else float('inf') if new else 1.0
+        regressed = ratio > 1 + threshold and _in_us(name, new - old) > noise_us
+        rows.append((name, old, new, ratio, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the benchmark suite or compare two of its runs.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_cmd = sub.add_parser('run', help='run benchmarks and record the results')
+    run_cmd.add_argument('cases', nargs='*', help=f"cases to run, of: {' '.join(CASES)} (default: all)")
+    run_cmd.add_argument('--factors', type=int, nargs='+', default=list(DEFAULT_FACTORS),
+                         help='dataset scale factors for the cases that scale')
+    run_cmd.add_argument('--quick', action='store_true', help='fewer repetitions and smaller batches')
+    run_cmd.add_argument('--label', help='name of this run, e.g. "numpy-2.1"')
+    run_cmd.add_argument('--history', default=DEFAULT_HISTORY, help='JSON history file')
+    cmp_cmd = sub.add_parser('compare', help='compare two recorded runs')
+    cmp_cmd.add_argument('--baseline', default='-2', help='entry index or label (default: the one before last)')
+    cmp_cmd.add_argument('--current', default='-1', help='entry index or label (default: the last)')
+    cmp_cmd.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help='allowed slowdown as a fraction (default: 0.1)')
+    cmp_cmd.add_argument('--noise-us', type=float, default=DEFAULT_NOISE_US,
+                         help='ignore changes smaller than this many µs')
+    cmp_cmd.add_argument('--all', action='store_true', help='list every metric, not only regressions')
+    cmp_cmd.add_argument('--history', default=DEFAULT_HISTORY, help='JSON history file')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        unknown = [name for name in args.cases if name not in CASES]
+        if unknown:
+            parser.error(f"unknown case: {', '.join(unknown)}")
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        run(args.cases or list(CASES), args.factors, args.quick, args.label, args.history)
+        return 0
+
+    history = load_history(args.history)
+    try:
+        baseline, current = _find(history, args.baseline), _find(history, args.current)
+    except KeyError as e:
+        print(f'No history entry {e.args[0]!r} in {args.history}', file=sys.stderr)
+        return 2
+    rows = compare(baseline, current, args.threshold, args.noise_us)
+    regressions = [row for row in rows if row[4]]
+    print(f"baseline {baseline['time']} {baseline.get('label') or ''}  vs  current {current['time']} "
+          f"{current.get('label') or ''}  ({len(rows)} metrics in common)")
+    for name, old, new, ratio, regressed in rows if args.all else regressions:
+        flag = 'REGRESSION' if regressed else ''
+        print(f'{name:<60} {old:12.2f} -> {new:12.2f}  x{ratio:5.2f}  {flag}')
+    print(f'{len(regressions)} regression(s) beyond {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,17 @@
 import os
-import pandas as pd
 from PySide6.QtWidgets import (
-    QWidget, QLabel, QComboBox, QVBoxLayout, QHBoxLayout, QSizePolicy,
-    QGraphicsDropShadowEffect
+    QWidget, QLabel, QComboBox, QVBoxLayout, QHBoxLayout
 )
-from PySide6.QtSvgWidgets import QSvgWidget
-from PySide6.QtGui import QPixmap, QPainter, QIcon
-from PySide6.QtCore import Qt
+from PySide6.QtGui import QIcon
+from PySide6.QtCore import Qt, QSize
+from raster_cache import add_shadow, paint_background
+from data_store import get_store
+from report_engine import REPORT_NAMES, get_report_engine
+from report_charts import ReportChart, is_cached, put_image
+from report_gallery import ReportGallery, ReportPrerenderer, ThumbnailStore
+from instrumentation import timed
+
+CHART_SIZE = QSize(680, 360)
 
 class BscDataWindow(QWidget):
     def __init__(self):
@@ -19,13 +24,13 @@ class BscDataWindow(QWidget):
 
         self.setWindowTitle("Basic Data Reports (ver. 2.0)")
         self.setFixedSize(800, 600)
-        self.bg_pixmap = QPixmap(os.path.join(base_dir, 'bgpoke.png'))
 
-        # Read available report images
-        data_dir = os.path.join(base_dir, 'pokemon_total_data')
-        svg_files = [f for f in os.listdir(data_dir) if f.lower().endswith('.svg')]
-        self.report_names = [os.path.splitext(f)[0] for f in svg_files]
-        self.svg_paths = {name: os.path.join(data_dir, name + '.svg') for name in self.report_names}
+        # Reports are computed from the shared dataset when first shown
+        self.store = get_store()
+        self.store.add_listener(self.on_dataset_reloaded)
+        self.reports = get_report_engine(self.store)
+        self.report_names = list(REPORT_NAMES)
+        self.prerenderer = None
 
         # Combo box
         self.combo = QComboBox()
@@ -41,14 +46,11 @@ class BscDataWindow(QWidget):
             "  background: white;"
             "}"
         )
-        combo_shadow = QGraphicsDropShadowEffect(self)
-        combo_shadow.setBlurRadius(10)
-        combo_shadow.setOffset(0, 2)
-        self.combo.setGraphicsEffect(combo_shadow)
+        add_shadow(self.combo, blur=10, offset=(0, 2), radius=8)
 
         # Chart container
         container = QWidget()
-        container.setFixedSize(700, 450)
+        container.setFixedSize(CHART_SIZE + QSize(20, 20))
         container.setStyleSheet(
             "QWidget {"
             "  border: 3px dashed #b0b0b0;"
@@ -56,15 +58,23 @@ class BscDataWindow(QWidget):
             "  background-color: rgba(255,255,255,153);"
             "}"
         )
-        container_shadow = QGraphicsDropShadowEffect(self)
-        container_shadow.setBlurRadius(12)
-        container_shadow.setOffset(0, 3)
-        container.setGraphicsEffect(container_shadow)
+        add_shadow(container, blur=12, offset=(0, 3), radius=12)
 
-        # SVG display
-        self.svg_widget = QSvgWidget()
-        self.svg_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.svg_widget.setStyleSheet("background: transparent;")
+        # Chart display
+        self.chart_widget = ReportChart()
+        self.chart_widget.setFixedSize(CHART_SIZE)
+
+        # Thumbnails of every report; clicking one shows it
+        self.gallery = ReportGallery(self.report_names)
+        self.gallery.setFixedSize(CHART_SIZE.width() + 20, 92)
+        self.gallery.setStyleSheet(
+            "QListWidget {"
+            "  border: 1px solid #b0b0b0;"
+            "  border-radius: 8px;"
+            "  background-color: rgba(255,255,255,153);"
+            "}"
+        )
+        self.gallery.currentRowChanged.connect(self.on_gallery_selected)
 
         # Layouts
         top_layout = QHBoxLayout()
@@ -74,22 +84,63 @@ class BscDataWindow(QWidget):
 
         chart_layout = QVBoxLayout(container)
         chart_layout.setContentsMargins(10, 10, 10, 10)
-        chart_layout.addWidget(self.svg_widget)
+        chart_layout.addWidget(self.chart_widget)
 
         main_layout = QVBoxLayout(self)
         main_layout.addLayout(top_layout)
-        main_layout.addWidget(container)
-        main_layout.setContentsMargins(40, 40, 40, 40)
-        main_layout.setSpacing(20)
+        main_layout.addWidget(container, alignment=Qt.AlignHCenter)
+        main_layout.addWidget(self.gallery, alignment=Qt.AlignHCenter)
+        main_layout.setContentsMargins(40, 20, 40, 20)
+        main_layout.setSpacing(12)
 
         # Initial chart
         self.update_chart(self.report_names[0])
 
+    @timed('paint.reports')
     def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.bg_pixmap)
+        paint_background(self, 'bgpoke.png')
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.prerenderer is None:
+            self.start_prerender()
 
+    def closeEvent(self, event):
+        self.stop_prerender()
+        super().closeEvent(event)
+
+    def start_prerender(self):
+        # Render every report at the chart size in the background, so that
+        # switching is a blit; thumbnails come along, from disk when possible
+        self.stop_prerender()
+        self.prerenderer = ReportPrerenderer(self.reports, self.report_names, CHART_SIZE,
+                                             self.devicePixelRatioF(), ThumbnailStore(), self)
+        self.prerenderer.rendered.connect(self.on_prerendered)
+        self.prerenderer.thumbnail.connect(self.gallery.set_thumbnail)
+        self.prerenderer.start()
+
+    def stop_prerender(self):
+        if self.prerenderer is not None:
+            self.prerenderer.requestInterruption()
+            self.prerenderer.wait()
+
+    def on_prerendered(self, chart, image):
+        size, dpr = CHART_SIZE, image.devicePixelRatio()
+        if chart.version == self.reports.version and not is_cached(chart, size.width(), size.height(), dpr):
+            put_image(chart, size.width(), size.height(), dpr, image)
+
+    @timed('reports.switch')
     def update_chart(self, name):
-        path = self.svg_paths.get(name)
-        if path and os.path.exists(path):
-            self.svg_widget.load(path)
+        if name in self.report_names:
+            self.chart_widget.set_chart(self.reports.chart(name))
+            self.gallery.select(name)
+
+    def on_gallery_selected(self, row):
+        name = self.gallery.name_at(row)
+        if name is not None:
+            self.combo.setCurrentText(name)
+
+    def on_dataset_reloaded(self, store):
+        self.update_chart(self.combo.currentText())
+        if self.prerenderer is not None:
+            self.start_prerender()
@@ -0,0 +1,476 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+from dataset import DEFAULT_XLSX, DEFAULT_CACHE_DIR, TEXT_COLUMNS, cache_is_fresh, compile_dataset, load_dataset
+from search_index import split_abilities
+
+# Compact typed dataset
+# The DataFrame from dataset.py holds text as one Python str per cell, the
+# abilities as the workbook's stringified lists and numbers as float64/int64,
+# about 890 bytes per row. This is the same data column by column in the
+# smallest types that hold it exactly:
+#   - type1/type2 and classfication are dictionary-encoded: small int codes
+#     into a vocabulary (type1 and type2 share theirs), -1 for none
+#   - abilities are parsed once and stored as ids into an ability vocabulary,
+#     with per-row offsets into that shared id array
+#   - name, japanese_name and image_content are one UTF-8 blob plus offsets
+#   - numbers are cleaned (capture_rate's '30 (Meteorite)255 (Core)' is 30)
+#     and stored as the smallest integer type, scaled by 4, 10 or 100 where
+#     that makes them whole (height 1.7 -> 17, against_* 0.25 -> 1), with
+#     the type's maximum standing for a missing value
+# Every array can be saved and memory-mapped, so millions of rows open in
+# milliseconds; load_compact() keeps a copy next to the compiled dataset.
+# synthetic_compact() grows a dataset with made-up forms and variants for
+# scale tests, and `python compact_dataset.py report` prints bytes per row
+# before and after.
+
+FORMAT_VERSION = 1
+COMPACT_DIR_NAME = 'compact'
+SCHEMA_NAME = 'schema.json'
+
+# Text column -> vocabulary it is encoded against
+CATEGORY_COLUMNS = {'type1': 'types', 'type2': 'types', 'classfication': 'classfication'}
+LIST_COLUMNS = {'abilities': 'abilities'}
+# Tried in order; the first that makes every value whole is used
+SCALES = (1, 4, 10, 100)
+# A text column is treated as numbers when at least this share of it parses
+NUMERIC_SHARE = 0.5
+
+# Stats jittered by synthetic_compact; base_total is their sum
+BASE_STATS = ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed')
+FORMS = ('Alolan', 'Galarian', 'Hisuian', 'Paldean', 'Mega', 'Gigantamax', 'Origin', 'Totem')
+GAMES = ('RB', 'GS', 'RS', 'DP', 'BW', 'XY', 'SM', 'SwSh', 'SV')
+
+
+def _int_dtype(low, high):
+    for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _code_dtype(size):
+    # Room for -1 (none)
+    return np.dtype(np.int8 if size < 128 else np.int16 if size < 32768 else np.int32)
+
+
+def _offset_dtype(total):
+    return np.dtype(np.uint32 if total < 2 ** 32 else np.int64)
+
+
+def encode_text(values):
+    """UTF-8 blob and offsets of a sequence of strings."""
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets.astype(_offset_dtype(offsets[-1])), np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def decode_text(offsets, data):
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(bounds) - 1)]
+
+
+def take_ragged(offsets, values, rows):
+    """Rows ``rows`` of a ragged array (offsets + values), as a new one."""
+    starts = offsets[rows].astype(np.int64)
+    lengths = offsets[rows + 1].astype(np.int64) - starts
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    index = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return new_offsets.astype(_offset_dtype(new_offsets[-1])), values[index]
+
+
+def _numbers(series):
+    # Numbers stay numbers; text cells contribute their leading number
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().any() and not pd.api.types.is_numeric_dtype(series):
+        lead = series.astype(str).str.extract(r'^\s*(-?\d+(?:\.\d+)?)', expand=False)
+        values = values.fillna(pd.to_numeric(lead, errors='coerce'))
+    return values.to_numpy(dtype=np.float64)
+
+
+def encode_numbers(values):
+    """Smallest exact integer form of a float64 column.
+
+    Returns:
+        (integer array, scale, missing sentinel or None); values are
+        ``array / scale``. None if no scale makes every value whole.
+    """
+    present = ~np.isnan(values)
+    finite = values[present]
+    for scale in SCALES:
+        scaled = np.round(finite * scale)
+        if not np.all(np.abs(scaled - finite * scale) < 1e-6):
+            continue
+        low, high = (scaled.min(), scaled.max()) if len(scaled) else (0, 0)
+        missing = None
+        if present.all():
+            dtype = _int_dtype(low, high)
+        else:
+            # The type's maximum, above every value, marks a missing cell
+            dtype = _int_dtype(low, high + 1)
+            missing = int(np.iinfo(dtype).max)
+        out = np.full(len(values), missing or 0, dtype=dtype)
+        out[present] = scaled.astype(dtype)
+        return out, scale, missing
+    return None
+
+
+def decode_numbers(array, scale, missing):
+    if scale == 1 and missing is None:
+        return array.astype(np.int64)
+    values = array.astype(np.float64)
+    if missing is not None:
+        values[array == missing] = np.nan
+    return values / scale if scale != 1 else values
+
+
+class CompactDataset:
+    """The dataset in compact column arrays.
+
+    Attributes:
+        columns: Column specs in DataFrame order, dicts with 'name', 'kind'
+            ('number', 'float', 'category', 'list' or 'text') and the
+            encoding's parameters.
+        arrays: Array name -> numpy array ('<column>.values', '.codes',
+            '.offsets', '.ids', '.data', '.missing').
+        vocabularies: Vocabulary name -> list of strings.
+        row_count: Number of rows.
+    """
+
+    def __init__(self, columns, arrays, vocabularies, row_count):
+        self.columns = columns
+        self.arrays = arrays
+        self.vocabularies = vocabularies
+        self.row_count = row_count
+        self._specs = {spec['name']: spec for spec in columns}
+        self._vocabulary_index = {}
+
+    def __len__(self):
+        return self.row_count
+
+    @classmethod
+    def from_frame(cls, df):
+        """Encode a dataset as loaded by dataset.py."""
+        columns = []
+        arrays = {}
+        vocabularies = {}
+        words = {}
+        for name in df.columns:
+            series = df[name]
+            if name in CATEGORY_COLUMNS or name in LIST_COLUMNS:
+                vocabulary = CATEGORY_COLUMNS.get(name) or LIST_COLUMNS[name]
+                known = words.setdefault(vocabulary, {})
+                text = series.fillna('').astype(str).tolist()
+                if name in CATEGORY_COLUMNS:
+                    codes = [known.setdefault(v, len(known)) if v else -1 for v in text]
+                    arrays[f'{name}.codes'] = np.array(codes, dtype=np.int32)
+                    columns.append({'name': name, 'kind': 'category', 'vocabulary': vocabulary})
+                else:
+                    lists = [split_abilities(v) for v in text]
+                    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+                    np.cumsum([len(items) for items in lists], out=offsets[1:])
+                    ids = [known.setdefault(item, len(known)) for items in lists for item in items]
+                    arrays[f'{name}.offsets'] = offsets.astype(_offset_dtype(offsets[-1]))
+                    arrays[f'{name}.ids'] = np.array(ids, dtype=np.int64)
+                    columns.append({'name': name, 'kind': 'list', 'vocabulary': vocabulary})
+                continue
+            numeric = pd.api.types.is_numeric_dtype(series)
+            if name not in TEXT_COLUMNS:
+                values = _numbers(series)
+                if numeric or np.isfinite(values).mean() >= NUMERIC_SHARE:
+                    encoded = encode_numbers(values)
+                    if encoded is None:
+                        arrays[f'{name}.values'] = values.astype(np.float64)
+                        columns.append({'name': name, 'kind': 'float'})
+                    else:
+                        arrays[f'{name}.values'], scale, missing = encoded
+                        columns.append({'name': name, 'kind': 'number', 'scale': scale, 'missing': missing})
+                    continue
+            offsets, data = encode_text(series.fillna('').astype(str).tolist())
+            arrays[f'{name}.offsets'] = offsets
+            arrays[f'{name}.data'] = data
+            missing = series.isna().to_numpy()
+            if missing.any():
+                # One bit per row, only for columns that have gaps
+                arrays[f'{name}.missing'] = np.packbits(missing)
+            columns.append({'name': name, 'kind': 'text'})
+
+        for vocabulary, known in words.items():
+            vocabularies[vocabulary] = list(known)
+        # Narrow the codes and ids now that the vocabulary sizes are known
+        for spec in columns:
+            if spec['kind'] == 'category':
+                key = f"{spec['name']}.codes"
+                arrays[key] = arrays[key].astype(_code_dtype(len(vocabularies[spec['vocabulary']])))
+            elif spec['kind'] == 'list':
+                key = f"{spec['name']}.ids"
+                arrays[key] = arrays[key].astype(_int_dtype(0, max(len(vocabularies[spec['vocabulary']]) - 1, 0)))
+        return cls(columns, arrays, vocabularies, len(df))
+
+    # -- access -----------------------------------------------------------
+
+    def spec(self, name):
+        return self._specs[name]
+
+    def codes(self, name):
+        """Codes of a category column (-1 for none)."""
+        return self.arrays[f'{name}.codes']
+
+    def vocabulary(self, name):
+        """Vocabulary a category or list column is encoded against."""
+        return self.vocabularies[self._specs[name]['vocabulary']]
+
+    def code_of(self, name, word):
+        """Code of ``word`` in a column's vocabulary, or None."""
+        vocabulary = self._specs[name]['vocabulary']
+        index = self._vocabulary_index.get(vocabulary)
+        if index is None:
+            index = self._vocabulary_index[vocabulary] = {w: i for i, w in enumerate(self.vocabularies[vocabulary])}
+        return index.get(word)
+
+    def items(self, name, row):
+        """The list of a list column (e.g. the abilities) at ``row``."""
+        offsets = self.arrays[f'{name}.offsets']
+        words = self.vocabulary(name)
+        return [words[i] for i in self.arrays[f'{name}.ids'][offsets[row]:offsets[row + 1]].tolist()]
+
+    def rows_with(self, name, word):
+        """Rows whose list column contains ``word``, ascending."""
+        code = self.code_of(name, word)
+        if code is None:
+            return np.empty(0, dtype=np.intp)
+        positions = np.flatnonzero(self.arrays[f'{name}.ids'] == code)
+        return np.unique(np.searchsorted(self.arrays[f'{name}.offsets'], positions, side='right') - 1)
+
+    def column(self, name):
+        """Decoded values of one column, as to_frame() has them."""
+        spec = self._specs[name]
+        kind = spec['kind']
+        if kind == 'number':
+            return decode_numbers(self.arrays[f'{name}.values'], spec['scale'], spec['missing'])
+        if kind == 'float':
+            return np.asarray(self.arrays[f'{name}.values'])
+        if kind == 'text':
+            values = decode_text(self.arrays[f'{name}.offsets'], self.arrays[f'{name}.data'])
+            packed = self.arrays.get(f'{name}.missing')
+            if packed is not None:
+                for row in np.flatnonzero(np.unpackbits(packed, count=self.row_count)).tolist():
+                    values[row] = np.nan
+            return values
+        if kind == 'category':
+            words = np.array(self.vocabulary(name) + [''], dtype=object)
+            return words[self.codes(name)].tolist()
+        words = self.vocabulary(name)
+        offsets = self.arrays[f'{name}.offsets'].tolist()
+        ids = self.arrays[f'{name}.ids'].tolist()
+        return [repr([words[i] for i in ids[offsets[r]:offsets[r + 1]]]) for r in range(self.row_count)]
+
+    def to_frame(self):
+        """The dataset as a DataFrame in dataset.py's layout.
+
+        Text and abilities come back as strings, numbers as int64 or float64,
+        with capture_rate and other cleaned columns as numbers.
+        """
+        return pd.DataFrame({spec['name']: self.column(spec['name']) for spec in self.columns})
+
+    def nbytes(self):
+        """Column name -> bytes held, vocabularies split over their columns."""
+        sizes = {}
+        users = {}
+        for spec in self.columns:
+            if 'vocabulary' in spec:
+                users.setdefault(spec['vocabulary'], []).append(spec['name'])
+        for spec in self.columns:
+            name = spec['name']
+            size = sum(a.nbytes for key, a in self.arrays.items() if key.rsplit('.', 1)[0] == name)
+            if 'vocabulary' in spec:
+                words = self.vocabularies[spec['vocabulary']]
+                size += sum(len(w.encode('utf-8')) + 4 for w in words) // len(users[spec['vocabulary']])
+            sizes[name] = size
+        return sizes
+
+    # -- storage ----------------------------------------------------------
+
+    def save(self, directory):
+        """Write every array and the schema into ``directory`` (replaced)."""
+        tmp_dir = directory + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for key, array in self.arrays.items():
+            np.save(os.path.join(tmp_dir, f'{key}.npy'), np.ascontiguousarray(array))
+        for name, words in self.vocabularies.items():
+            offsets, data = encode_text(words)
+            np.save(os.path.join(tmp_dir, f'vocabulary.{name}.offsets.npy'), offsets)
+            np.save(os.path.join(tmp_dir, f'vocabulary.{name}.data.npy'), data)
+        schema = {'format_version': FORMAT_VERSION, 'rows': self.row_count, 'columns': self.columns,
+                  'arrays': sorted(self.arrays), 'vocabularies': sorted(self.vocabularies)}
+        with open(os.path.join(tmp_dir, SCHEMA_NAME), 'w', encoding='utf-8') as f:
+            json.dump(schema, f, indent=1)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved dataset; arrays are memory-mapped unless ``mmap`` is False.
+
+        Raises:
+            OSError: If it is missing, ValueError if it has another format.
+        """
+        with open(os.path.join(directory, SCHEMA_NAME), 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+        if schema.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f'{directory}: not a version {FORMAT_VERSION} compact dataset')
+        mode = 'r' if mmap else None
+        arrays = {key: np.load(os.path.join(directory, f'{key}.npy'), mmap_mode=mode) for key in schema['arrays']}
+        vocabularies = {}
+        for name in schema['vocabularies']:
+            offsets = np.load(os.path.join(directory, f'vocabulary.{name}.offsets.npy'))
+            data = np.load(os.path.join(directory, f'vocabulary.{name}.data.npy'))
+            vocabularies[name] = decode_text(offsets, data)
+        return cls(schema['columns'], arrays, vocabularies, schema['rows'])
+
+
+def load_compact(xlsx_path=DEFAULT_XLSX, cache_dir=DEFAULT_CACHE_DIR):
+    """The compact form of pokemon.xlsx, kept with the compiled dataset.
+
+    Falls back to encoding load_dataset() in memory when the cache cannot be
+    written.
+    """
+    manifest = cache_is_fresh(xlsx_path, cache_dir)
+    try:
+        if manifest is None:
+            manifest = compile_dataset(xlsx_path, cache_dir)
+        directory = os.path.join(cache_dir, manifest['build'], COMPACT_DIR_NAME)
+        try:
+            return CompactDataset.load(directory)
+        except (OSError, ValueError):
+            compact = CompactDataset.from_frame(load_dataset(xlsx_path, cache_dir))
+            compact.save(directory)
+            return CompactDataset.load(directory)
+    except OSError:
+        return CompactDataset.from_frame(load_dataset(xlsx_path, cache_dir))
+
+
+def get_compact_dataset(store):
+    """Return the CompactDataset for the store's current dataset version."""
+    return store.derived('compact_dataset', CompactDataset.from_frame)
+
+
+def synthetic_compact(base, rows, seed=0, jitter=0.1):
+    """Grow ``base`` to ``rows`` rows of made-up forms and per-game variants.
+
+    Each new row copies a random original, gets a name such as
+    'Vulpix (Alolan SM 12)', base stats moved by up to ``jitter`` (base_total
+    follows), and a third of them a different second type. Built directly on
+    the arrays, so millions of rows take seconds.
+
+    Args:
+        base: CompactDataset to grow; its own rows come first.
+        rows: Total row count.
+        seed: Random seed.
+        jitter: Largest relative change of a stat.
+    """
+    extra = rows - base.row_count
+    if extra <= 0:
+        return base
+    rng = np.random.default_rng(seed)
+    source = np.concatenate([np.arange(base.row_count), rng.integers(0, base.row_count, extra)])
+    arrays = {}
+    for spec in base.columns:
+        name = spec['name']
+        kind = spec['kind']
+        if kind in ('number', 'float'):
+            arrays[f'{name}.values'] = base.arrays[f'{name}.values'][source]
+        elif kind == 'category':
+            arrays[f'{name}.codes'] = base.arrays[f'{name}.codes'][source]
+        elif kind == 'list':
+            arrays[f'{name}.offsets'], arrays[f'{name}.ids'] = take_ragged(
+                base.arrays[f'{name}.offsets'], base.arrays[f'{name}.ids'], source)
+        else:
+            arrays[f'{name}.offsets'], arrays[f'{name}.data'] = take_ragged(
+                base.arrays[f'{name}.offsets'], base.arrays[f'{name}.data'], source)
+            packed = base.arrays.get(f'{name}.missing')
+            if packed is not None:
+                arrays[f'{name}.missing'] = np.packbits(np.unpackbits(packed, count=base.row_count)[source])
+
+    new = slice(base.row_count, rows)
+    specs = {spec['name']: spec for spec in base.columns}
+    total = None
+    for stat in BASE_STATS:
+        spec = specs.get(stat)
+        if spec is None or spec['kind'] != 'number' or spec['missing'] is not None:
+            continue
+        values = arrays[f'{stat}.values']
+        moved = values[new] * (1 + rng.uniform(-jitter, jitter, extra))
+        high = np.iinfo(values.dtype).max
+        values[new] = np.clip(np.round(moved), 1, high).astype(values.dtype)
+        total = values.astype(np.int64) if total is None else total + values
+    if total is not None and specs.get('base_total', {}).get('kind') == 'number':
+        arrays['base_total.values'] = total.astype(_int_dtype(0, int(total.max())))
+    if specs.get('type2', {}).get('kind') == 'category':
+        codes = arrays['type2.codes']
+        changed = np.flatnonzero(rng.random(extra) < 1 / 3) + base.row_count
+        codes[changed] = rng.integers(0, len(base.vocabularies['types']), len(changed))
+    if specs.get('name', {}).get('kind') == 'text':
+        names = decode_text(base.arrays['name.offsets'], base.arrays['name.data'])
+        forms = rng.integers(0, len(FORMS), extra).tolist()
+        games = rng.integers(0, len(GAMES), extra).tolist()
+        suffixed = [f'{names[s]} ({FORMS[f]} {GAMES[g]} {i})' for i, (s, f, g)
+                    in enumerate(zip(source[new].tolist(), forms, games), 1)]
+        offsets, data = encode_text(names + suffixed)
+        arrays['name.offsets'], arrays['name.data'] = offsets, data
+    return CompactDataset(base.columns, arrays, base.vocabularies, rows)
+
+
+def _report(df, compact, label):
+    before = df.memory_usage(deep=True, index=False)
+    after = compact.nbytes()
+    rows = len(df)
+    print(f"{label}: {rows} rows")
+    print(f"{'column':<20} {'kind':<9} {'before B/row':>13} {'after B/row':>12}")
+    for spec in compact.columns:
+        name = spec['name']
+        print(f"{name:<20} {spec['kind']:<9} {before[name] / rows:13.1f} {after[name] / rows:12.2f}")
+    total_before = before.sum() / rows
+    total_after = sum(after.values()) / rows
+    print(f"{'total':<30} {total_before:13.1f} {total_after:12.2f}   ({total_before / total_after:.1f}x smaller)")
+    return total_before, total_after
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compact typed form of the dataset.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    report_cmd = sub.add_parser('report', help='bytes per row before and after, per column')
+    report_cmd.add_argument('--rows', type=int, nargs='*', default=[100_000, 1_000_000],
+                            help='synthetic sizes to report as well')
+    report_cmd.add_argument('--frame-max-rows', type=int, default=200_000,
+                            help='largest synthetic size whose DataFrame is built for the "before" column')
+    args = parser.parse_args(argv)
+
+    df = load_dataset()
+    compact = CompactDataset.from_frame(df)
+    _report(df, compact, 'pokemon.xlsx')
+    for rows in args.rows:
+        start = time.perf_counter()
+        grown = synthetic_compact(compact, rows)
+        seconds = time.perf_counter() - start
+        print()
+        if rows <= args.frame_max_rows:
+            _report(grown.to_frame(), grown, f'synthetic ({seconds:.2f} s to generate)')
+        else:
+            size = sum(grown.nbytes().values())
+            print(f'synthetic: {rows} rows in {seconds:.2f} s, {size / rows:.2f} B/row, {size / 2 ** 20:.1f} MiB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
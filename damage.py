@@ -0,0 +1,104 @@
+import numpy as np
+
+# Damage math shared by the calculator window and headless tools. Nothing in
+# this module imports Qt.
+
+# Type effectiveness data
+type_chart = {
+    "Normal": {"Ghost": 0, "Rock": 0.5, "Steel": 0.5},
+    "Fire": {"Grass": 2, "Ice": 2, "Bug": 2, "Steel": 2, "Fire": 0.5, "Water": 0.5, "Rock": 0.5, "Dragon": 0.5},
+    "Water": {"Fire": 2, "Rock": 2, "Ground": 2, "Water": 0.5, "Grass": 0.5, "Dragon": 0.5},
+    "Electric": {"Water": 2, "Flying": 2, "Electric": 0.5, "Grass": 0.5, "Dragon": 0.5, "Ground": 0},
+    "Grass": {"Water": 2, "Ground": 2, "Rock": 2, "Fire": 0.5, "Grass": 0.5, "Poison": 0.5, "Flying": 0.5, "Bug": 0.5, "Dragon": 0.5, "Steel": 0.5},
+    "Ice": {"Grass": 2, "Ground": 2, "Flying": 2, "Dragon": 2, "Fire": 0.5, "Water": 0.5, "Ice": 0.5, "Steel": 0.5},
+    "Fighting": {"Normal": 2, "Ice": 2, "Rock": 2, "Dark": 2, "Steel": 2, "Poison": 0.5, "Flying": 0.5, "Psychic": 0.5, "Bug": 0.5, "Ghost": 0, "Fairy": 0.5},
+    "Poison": {"Grass": 2, "Fairy": 2, "Poison": 0.5, "Ground": 0.5, "Rock": 0.5, "Ghost": 0.5, "Steel": 0},
+    "Ground": {"Fire": 2, "Electric": 2, "Poison": 2, "Rock": 2, "Steel": 2, "Grass": 0.5, "Bug": 0.5, "Flying": 0},
+    "Flying": {"Grass": 2, "Fighting": 2, "Bug": 2, "Electric": 0.5, "Rock": 0.5, "Steel": 0.5},
+    "Psychic": {"Fighting": 2, "Poison": 2, "Psychic": 0.5, "Steel": 0.5, "Dark": 0},
+    "Bug": {"Grass": 2, "Psychic": 2, "Dark": 2, "Fire": 0.5, "Fighting": 0.5, "Poison": 0.5, "Flying": 0.5, "Ghost": 0.5, "Steel": 0.5, "Fairy": 0.5},
+    "Rock": {"Fire": 2, "Ice": 2, "Flying": 2, "Bug": 2, "Fighting": 0.5, "Ground": 0.5, "Steel": 0.5},
+    "Ghost": {"Ghost": 2, "Psychic": 2, "Dark": 0.5, "Normal": 0},
+    "Dragon": {"Dragon": 2, "Steel": 0.5, "Fairy": 0},
+    "Dark": {"Psychic": 2, "Ghost": 2, "Fighting": 0.5, "Dark": 0.5, "Fairy": 0.5},
+    "Steel": {"Ice": 2, "Rock": 2, "Fairy": 2, "Fire": 0.5, "Water": 0.5, "Electric": 0.5, "Steel": 0.5},
+    "Fairy": {"Fighting": 2, "Dragon": 2, "Dark": 2, "Fire": 0.5, "Poison": 0.5, "Steel": 0.5},
+}
+
+all_types = sorted(type_chart.keys())
+
+# Dense form of type_chart: TYPE_MATRIX[attack, defend] is the multiplier
+TYPE_INDEX = {t: i for i, t in enumerate(all_types)}
+TYPE_MATRIX = np.ones((len(all_types), len(all_types)), dtype=np.float64)
+for _attack, _row in type_chart.items():
+    for _defend, _mult in _row.items():
+        TYPE_MATRIX[TYPE_INDEX[_attack], TYPE_INDEX[_defend]] = _mult
+TYPE_MATRIX.setflags(write=False)
+
+# Index used for "no second type"; it has a neutral column in ATTACK_TABLE
+NO_TYPE = len(all_types)
+ATTACK_TABLE = np.hstack([TYPE_MATRIX, np.ones((len(all_types), 1))])
+
+STAB_MULTIPLIER = 1.5
+
+# Case-insensitive lookup, so the dataset's lower-case type names work too
+_TYPE_LOOKUP = {t.lower(): i for t, i in TYPE_INDEX.items()}
+
+# against_* columns use 'fight' for Fighting
+_AGAINST_NAMES = {'fight': 'fighting'}
+
+
+def type_index(name):
+    """Index of a type name in all_types; '' or None mean no type (NO_TYPE).
+
+    Raises:
+        ValueError: If the name is not a known type, or not a string (NaN
+            included: a missing cell is not taken for "no second type").
+    """
+    if name is None or name == '':
+        return NO_TYPE
+    try:
+        return _TYPE_LOOKUP[name.strip().lower()]
+    except (KeyError, AttributeError):
+        raise ValueError(f"Unknown type: {name!r}") from None
+
+
+def type_indices(names):
+    """Vector form of type_index for a sequence of names."""
+    return np.fromiter((type_index(n) for n in names), dtype=np.intp)
+
+
+def against_columns(df):
+    """Map attack type index -> against_* column name present in ``df``."""
+    columns = {}
+    for col in df.columns:
+        if col.startswith('against_'):
+            name = col[len('against_'):]
+            columns[type_index(_AGAINST_NAMES.get(name, name))] = col
+    return columns
+
+
+def batch_damage(attack_types, defender_type1, defender_type2, stab, base_damage):
+    """Type multipliers and final damage for many matchups in one call.
+
+    All arguments broadcast against each other, so scalars can be mixed with
+    arrays.
+
+    Args:
+        attack_types: Attack type indices (see TYPE_INDEX).
+        defender_type1: Defender primary type indices.
+        defender_type2: Defender secondary type indices, NO_TYPE for none. A
+            second type equal to the first is ignored.
+        stab: Booleans, True where the same-type attack bonus applies.
+        base_damage: Base damage values.
+
+    Returns:
+        (multipliers, damages) as float64 arrays.
+    """
+    attack_types = np.asarray(attack_types, dtype=np.intp)
+    defender_type1 = np.asarray(defender_type1, dtype=np.intp)
+    defender_type2 = np.asarray(defender_type2, dtype=np.intp)
+    defender_type2 = np.where(defender_type2 == defender_type1, NO_TYPE, defender_type2)
+    multipliers = ATTACK_TABLE[attack_types, defender_type1] * ATTACK_TABLE[attack_types, defender_type2]
+    multipliers = multipliers * np.where(stab, STAB_MULTIPLIER, 1.0)
+    return multipliers, multipliers * np.asarray(base_damage, dtype=np.float64)
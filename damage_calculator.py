@@ -1,38 +1,31 @@
 import os
+import numpy as np
 from PySide6.QtWidgets import (
     QWidget, QLabel, QPushButton, QComboBox, QLineEdit, QVBoxLayout, QHBoxLayout,
-    QCheckBox, QMessageBox, QGraphicsDropShadowEffect
+    QCheckBox, QMessageBox, QCompleter
 )
-from PySide6.QtGui import QIcon, QFontDatabase, QPixmap, QPainter, QFont
+from PySide6.QtGui import QIcon, QFontDatabase, QFont
 from PySide6.QtCore import Qt
-
-# Type effectiveness data
-type_chart = {
-    "Normal": {"Ghost": 0, "Rock": 0.5, "Steel": 0.5},
-    "Fire": {"Grass": 2, "Ice": 2, "Bug": 2, "Steel": 2, "Fire": 0.5, "Water": 0.5, "Rock": 0.5, "Dragon": 0.5},
-    "Water": {"Fire": 2, "Rock": 2, "Ground": 2, "Water": 0.5, "Grass": 0.5, "Dragon": 0.5},
-    "Electric": {"Water": 2, "Flying": 2, "Electric": 0.5, "Grass": 0.5, "Dragon": 0.5, "Ground": 0},
-    "Grass": {"Water": 2, "Ground": 2, "Rock": 2, "Fire": 0.5, "Grass": 0.5, "Poison": 0.5, "Flying": 0.5, "Bug": 0.5, "Dragon": 0.5, "Steel": 0.5},
-    "Ice": {"Grass": 2, "Ground": 2, "Flying": 2, "Dragon": 2, "Fire": 0.5, "Water": 0.5, "Ice": 0.5, "Steel": 0.5},
-    "Fighting": {"Normal": 2, "Ice": 2, "Rock": 2, "Dark": 2, "Steel": 2, "Poison": 0.5, "Flying": 0.5, "Psychic": 0.5, "Bug": 0.5, "Ghost": 0, "Fairy": 0.5},
-    "Poison": {"Grass": 2, "Fairy": 2, "Poison": 0.5, "Ground": 0.5, "Rock": 0.5, "Ghost": 0.5, "Steel": 0},
-    "Ground": {"Fire": 2, "Electric": 2, "Poison": 2, "Rock": 2, "Steel": 2, "Grass": 0.5, "Bug": 0.5, "Flying": 0},
-    "Flying": {"Grass": 2, "Fighting": 2, "Bug": 2, "Electric": 0.5, "Rock": 0.5, "Steel": 0.5},
-    "Psychic": {"Fighting": 2, "Poison": 2, "Psychic": 0.5, "Steel": 0.5, "Dark": 0},
-    "Bug": {"Grass": 2, "Psychic": 2, "Dark": 2, "Fire": 0.5, "Fighting": 0.5, "Poison": 0.5, "Flying": 0.5, "Ghost": 0.5, "Steel": 0.5, "Fairy": 0.5},
-    "Rock": {"Fire": 2, "Ice": 2, "Flying": 2, "Bug": 2, "Fighting": 0.5, "Ground": 0.5, "Steel": 0.5},
-    "Ghost": {"Ghost": 2, "Psychic": 2, "Dark": 0.5, "Normal": 0},
-    "Dragon": {"Dragon": 2, "Steel": 0.5, "Fairy": 0},
-    "Dark": {"Psychic": 2, "Ghost": 2, "Fighting": 0.5, "Dark": 0.5, "Fairy": 0.5},
-    "Steel": {"Ice": 2, "Rock": 2, "Fairy": 2, "Fire": 0.5, "Water": 0.5, "Electric": 0.5, "Steel": 0.5},
-    "Fairy": {"Fighting": 2, "Dragon": 2, "Dark": 2, "Fire": 0.5, "Poison": 0.5, "Steel": 0.5},
-}
-
-all_types = sorted(type_chart.keys())
+from raster_cache import add_shadow, paint_background
+from damage import type_chart, all_types, batch_damage, type_index, NO_TYPE
+from defense_index import get_defense_index
+from instrumentation import timed
+
+# Defender list filters: (label, DefenseIndex group taken against the attack type)
+DEFENDER_FILTERS = (
+    ('Any', None),
+    ('Weak to it', 'weak'),
+    ('Resists it', 'resists'),
+    ('Immune to it', 'immune'),
+)
 
 class CalculatorWindow(QWidget):
     def __init__(self):
         super().__init__()
+        # The dataset is only needed for the defender list; see showEvent
+        self.store = None
+        self.defense = None
+        self.defender_rows = np.empty(0, dtype=np.intp)
         base_dir = os.path.dirname(__file__)
         # Window icon
         icon_path = os.path.join(base_dir, 'ptlogo.svg')
@@ -40,9 +33,7 @@ class CalculatorWindow(QWidget):
             self.setWindowIcon(QIcon(icon_path))
 
         self.setWindowTitle("Final Damage Calculator (ver. 2.0)")
-        self.setFixedSize(750, 450)
-        # Background image
-        self.bg_pixmap = QPixmap(os.path.join(base_dir, 'bgpoke.png'))
+        self.setFixedSize(750, 520)
 
         # Load main font
         font_id = QFontDatabase.addApplicationFont(os.path.join(base_dir, 'font', '汉仪文黑-65W.ttf'))
@@ -58,7 +49,7 @@ class CalculatorWindow(QWidget):
 
         # Container
         container = QWidget(self)
-        container.setFixedSize(500, 330)
+        container.setFixedSize(500, 400)
         container.setStyleSheet(
             "QWidget {"
             "  border: 3px dashed #b0b0b0;"
@@ -66,10 +57,7 @@ class CalculatorWindow(QWidget):
             "  background-color: rgba(255,255,255,0.6);"
             "}"
         )
-        container_shadow = QGraphicsDropShadowEffect(self)
-        container_shadow.setBlurRadius(12)
-        container_shadow.setOffset(0, 3)
-        container.setGraphicsEffect(container_shadow)
+        add_shadow(container, blur=12, offset=(0, 3), radius=12)
 
         form_layout = QVBoxLayout(container)
         form_layout.setContentsMargins(20, 20, 20, 20)
@@ -81,10 +69,7 @@ class CalculatorWindow(QWidget):
         self.damage_entry.setStyleSheet(
             "QLineEdit { padding: 5px 10px; border: 1px solid #707070; border-radius: 8px; background: white; }"
         )
-        entry_shadow = QGraphicsDropShadowEffect(self)
-        entry_shadow.setBlurRadius(10)
-        entry_shadow.setOffset(0, 2)
-        self.damage_entry.setGraphicsEffect(entry_shadow)
+        add_shadow(self.damage_entry, blur=10, offset=(0, 2), radius=8)
         form_layout.addLayout(self._row("Base Damage:", self.damage_entry, main_font))
 
         # ComboBox style: border retained, remove popup border
@@ -92,26 +77,46 @@ class CalculatorWindow(QWidget):
             "QComboBox { padding: 5px 10px; border: 1px solid #707070; border-radius: 8px; background: white; }"
             "QComboBox QAbstractItemView { border: none; }"
         )
-        combo_shadow = QGraphicsDropShadowEffect(self)
-        combo_shadow.setBlurRadius(10)
-        combo_shadow.setOffset(0, 2)
 
         # Attacker type
         self.attacker_type = QComboBox()
         self.attacker_type.addItems(all_types)
         self.attacker_type.setFixedHeight(40)
         self.attacker_type.setStyleSheet(combo_style)
-        self.attacker_type.setGraphicsEffect(combo_shadow)
+        add_shadow(self.attacker_type, blur=10, offset=(0, 2), radius=8)
         # Narrow popup width to avoid overlapping border
         self.attacker_type.view().setFixedWidth(240)
         form_layout.addLayout(self._row("Attack Type:", self.attacker_type, main_font))
 
+        # Defender Pokémon, optionally only those weak to / resisting the attack
+        self.defender_filter = QComboBox()
+        self.defender_filter.addItems([label for label, _group in DEFENDER_FILTERS])
+        self.defender_filter.setFixedHeight(40)
+        self.defender_filter.setStyleSheet(combo_style)
+        add_shadow(self.defender_filter, blur=10, offset=(0, 2), radius=8)
+        self.defender_pokemon = QComboBox()
+        self.defender_pokemon.setEditable(True)
+        self.defender_pokemon.setInsertPolicy(QComboBox.NoInsert)
+        self.defender_pokemon.completer().setFilterMode(Qt.MatchContains)
+        self.defender_pokemon.completer().setCompletionMode(QCompleter.PopupCompletion)
+        self.defender_pokemon.lineEdit().setPlaceholderText("Pokémon")
+        self.defender_pokemon.setFixedHeight(40)
+        self.defender_pokemon.setStyleSheet(combo_style)
+        add_shadow(self.defender_pokemon, blur=10, offset=(0, 2), radius=8)
+        self.defender_pokemon.view().setFixedWidth(240)
+        defender_row = self._row("Defender:", self.defender_filter, main_font)
+        defender_row.addWidget(self.defender_pokemon, 1)
+        form_layout.addLayout(defender_row)
+        self.attacker_type.currentIndexChanged.connect(self.update_defenders)
+        self.defender_filter.currentIndexChanged.connect(self.update_defenders)
+        self.defender_pokemon.currentIndexChanged.connect(self.on_defender_selected)
+
         # Defender type 1
         self.defender_type_1 = QComboBox()
         self.defender_type_1.addItems(all_types)
         self.defender_type_1.setFixedHeight(40)
         self.defender_type_1.setStyleSheet(combo_style)
-        self.defender_type_1.setGraphicsEffect(combo_shadow)
+        add_shadow(self.defender_type_1, blur=10, offset=(0, 2), radius=8)
         self.defender_type_1.view().setFixedWidth(240)
         form_layout.addLayout(self._row("Defender Type 1:", self.defender_type_1, main_font))
 
@@ -121,7 +126,7 @@ class CalculatorWindow(QWidget):
         self.defender_type_2.addItems(all_types)
         self.defender_type_2.setFixedHeight(40)
         self.defender_type_2.setStyleSheet(combo_style)
-        self.defender_type_2.setGraphicsEffect(combo_shadow)
+        add_shadow(self.defender_type_2, blur=10, offset=(0, 2), radius=8)
         self.defender_type_2.view().setFixedWidth(240)
         form_layout.addLayout(self._row("Defender Type 2:", self.defender_type_2, main_font))
 
@@ -148,9 +153,60 @@ class CalculatorWindow(QWidget):
         main_layout.addWidget(title_label, alignment=Qt.AlignHCenter)
         main_layout.addWidget(container, alignment=Qt.AlignHCenter|Qt.AlignTop)
 
+    @timed('paint.calculator')
     def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.bg_pixmap)
+        paint_background(self, 'bgpoke.png')
+
+    def showEvent(self, event):
+        # Load the dataset on first show rather than when the window is built
+        if self.store is None:
+            from data_store import get_store
+            self.store = get_store()
+            self.store.add_listener(self.on_dataset_reloaded)
+            self.on_dataset_reloaded(self.store)
+        super().showEvent(event)
+
+    def on_dataset_reloaded(self, store):
+        self.defense = get_defense_index(store)
+        df = store.df
+        self.defender_names = df['name'].to_numpy(dtype=object)
+        self.defender_types = (df['type1'].to_numpy(dtype=object), df['type2'].to_numpy(dtype=object))
+        self.update_defenders()
+
+    @timed('calculator.defenders')
+    def update_defenders(self, _index=None):
+        """Refill the defender list for the current filter and attack type."""
+        if self.defense is None:
+            return
+        group = DEFENDER_FILTERS[self.defender_filter.currentIndex()][1]
+        if group is None:
+            rows = np.arange(self.defense.row_count)
+        else:
+            rows = self.defense.rows(self.defense.bitset(group, type_index(self.attacker_type.currentText())))
+        current = self.defender_pokemon.currentText()
+        self.defender_rows = rows
+        # Repopulating is not a selection; keep the chosen Pokémon if it still matches
+        self.defender_pokemon.blockSignals(True)
+        self.defender_pokemon.clear()
+        self.defender_pokemon.addItem("")
+        self.defender_pokemon.addItems([str(name) for name in self.defender_names[rows]])
+        self.defender_pokemon.setCurrentIndex(max(self.defender_pokemon.findText(current), 0) if current else 0)
+        self.defender_pokemon.blockSignals(False)
+
+    def on_defender_selected(self, index):
+        # Item 0 is the empty entry
+        if index <= 0 or index > len(self.defender_rows):
+            return
+        row = self.defender_rows[index - 1]
+        type1, type2 = (types[row] for types in self.defender_types)
+        try:
+            type1, type2 = type_index(type1), type_index(type2)
+        except ValueError:
+            return
+        if type1 == NO_TYPE:
+            return
+        self.defender_type_1.setCurrentIndex(type1)
+        self.defender_type_2.setCurrentIndex(0 if type2 in (NO_TYPE, type1) else type2 + 1)
 
     def _row(self, label_text, widget, font_family):
         row = QHBoxLayout()
@@ -166,26 +222,21 @@ class CalculatorWindow(QWidget):
         button.setStyleSheet(
             f"QPushButton {{ background-color: #FEE6A3; color: #7E5249; font-family: '{font_family}'; font-size: 14px; font-weight: bold; border: none; border-radius: 20px; }}"
         )
-        shadow = QGraphicsDropShadowEffect(self)
-        shadow.setBlurRadius(12)
-        shadow.setOffset(0, 3)
-        button.setGraphicsEffect(shadow)
+        add_shadow(button, blur=12, offset=(0, 3), radius=20)
 
+    @timed('calculator.calculate')
     def calculate_damage(self):
         try:
             base_damage = float(self.damage_entry.text())
-            attack_type = self.attacker_type.currentText()
-            defender_type1 = self.defender_type_1.currentText()
-            defender_type2 = self.defender_type_2.currentText()
-
-            mult1 = type_chart.get(attack_type, {}).get(defender_type1, 1)
-            mult2 = 1
-            if defender_type2 and defender_type2 != defender_type1:
-                mult2 = type_chart.get(attack_type, {}).get(defender_type2, 1)
-
-            stab_mult = 1.5 if self.stab_check.isChecked() else 1
-            final_mult = mult1 * mult2 * stab_mult
-            final_dmg = base_damage * final_mult
+            multipliers, damages = batch_damage(
+                type_index(self.attacker_type.currentText()),
+                type_index(self.defender_type_1.currentText()),
+                type_index(self.defender_type_2.currentText()),
+                self.stab_check.isChecked(),
+                base_damage,
+            )
+            final_mult = float(multipliers)
+            final_dmg = float(damages)
 
             # Display result with enlarged red font for the number
             self.result_label.setText(
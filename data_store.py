@@ -0,0 +1,133 @@
+import threading
+import weakref
+from dataset import DEFAULT_XLSX, DEFAULT_CACHE_DIR, load_dataset
+from instrumentation import span
+
+# Process-wide Pokémon data store
+# Every window (and any headless tool) reads the dataset and anything derived
+# from it through get_store(), so the workbook is loaded once per process no
+# matter how many windows are opened.
+
+
+class DataStore:
+    """Lazily loaded, thread-safe holder of the dataset and its derived tables.
+
+    Args:
+        xlsx_path: Source workbook.
+        cache_dir: Compiled dataset cache directory (see dataset.py).
+    """
+
+    def __init__(self, xlsx_path=DEFAULT_XLSX, cache_dir=DEFAULT_CACHE_DIR):
+        self.xlsx_path = xlsx_path
+        self.cache_dir = cache_dir
+        self._lock = threading.RLock()
+        self._df = None
+        self._derived = {}
+        self._listeners = []
+        # Bumped on every (re)load so callers can tell stale results apart
+        self.version = 0
+
+    @property
+    def df(self):
+        """The shared DataFrame. Treat it as read-only."""
+        df = self._df
+        if df is None:
+            with self._lock:
+                if self._df is None:
+                    with span('dataset.load'):
+                        self._df = load_dataset(self.xlsx_path, self.cache_dir)
+                    self.version += 1
+                df = self._df
+        return df
+
+    def derived(self, key, factory):
+        """Return ``factory(df)``, computed once per dataset version.
+
+        Args:
+            key: Hashable name of the derived table or index.
+            factory: Callable taking the DataFrame and returning the value.
+        """
+        with self._lock:
+            # Together, so a reload cannot slip in between: the value has to
+            # be built from the DataFrame of the version it is stored under
+            df = self.df
+            version = self.version
+            entry = self._derived.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+        with span(f'derived.{key}'):
+            value = factory(df)
+        with self._lock:
+            # Only publish if no reload happened while we were building
+            if version == self.version:
+                self._derived[key] = (version, value)
+        return value
+
+    def name_index(self):
+        """Lower-cased Pokémon name -> row position in ``df``."""
+        return self.derived('name_index', lambda df: {n.lower(): i for i, n in enumerate(df['name'])})
+
+    def type_list(self):
+        """Sorted list of the type names that appear in type1/type2."""
+        return self.derived('type_list', lambda df: sorted((set(df['type1']) | set(df['type2'])) - {''}))
+
+    def invalidate(self, key=None):
+        """Drop one derived entry, or everything (dataset included) if ``key`` is None.
+
+        Nothing is reloaded until the next access.
+        """
+        with self._lock:
+            if key is None:
+                self._df = None
+                self._derived.clear()
+            else:
+                self._derived.pop(key, None)
+
+    def reload(self):
+        """Reload the dataset now and notify listeners.
+
+        Listeners run on the calling thread, so GUI code should call this from
+        the GUI thread.
+        """
+        with self._lock:
+            self.invalidate()
+            df = self.df
+            listeners = list(self._listeners)
+        for ref in listeners:
+            callback = ref()
+            if callback is not None:
+                callback(self)
+        self._prune_listeners()
+        return df
+
+    def add_listener(self, callback):
+        """Call ``callback(store)`` after each reload.
+
+        Only a weak reference is kept, so a closed window does not linger just
+        because it registered a bound method here.
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else weakref.ref(callback)
+        with self._lock:
+            self._listeners.append(ref)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners = [ref for ref in self._listeners if ref() not in (None, callback)]
+
+    def _prune_listeners(self):
+        with self._lock:
+            self._listeners = [ref for ref in self._listeners if ref() is not None]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide DataStore, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DataStore()
+    return _store
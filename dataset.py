@@ -0,0 +1,302 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+
+# Compiled dataset cache
+# pokemon.xlsx is parsed once with openpyxl and written out as one .npy file per
+# column next to a manifest. Later opens memory-map those files instead of
+# re-parsing the workbook.
+FORMAT_VERSION = 2
+CACHE_DIR_NAME = '.dataset_cache'
+MANIFEST_NAME = 'manifest.json'
+
+# Columns the Pokédex always treats as plain text ('' instead of NaN)
+TEXT_COLUMNS = ('name', 'type1', 'type2', 'abilities', 'japanese_name')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_XLSX = os.path.join(BASE_DIR, 'pokemon.xlsx')
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, CACHE_DIR_NAME)
+
+
+def read_source(xlsx_path=DEFAULT_XLSX):
+    """Parse the workbook the slow way and normalise the text columns.
+
+    Args:
+        xlsx_path: Path to pokemon.xlsx.
+
+    Returns:
+        pandas.DataFrame with the same contents the Pokédex used to build itself.
+    """
+    df = pd.read_excel(xlsx_path, engine='openpyxl')
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna('').astype(str)
+    return df
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _encode_text(values):
+    # Strings are stored as one UTF-8 blob plus an offsets array, both of
+    # which can be memory-mapped; missing cells are tracked in a mask.
+    valid = np.array([isinstance(v, str) or not pd.isna(v) for v in values], dtype=bool)
+    encoded = [str(v).encode('utf-8') if ok else b'' for v, ok in zip(values, valid)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return offsets, data, valid
+
+
+def _decode_text(offsets, data, valid):
+    raw = data.tobytes()
+    out = np.empty(len(valid), dtype=object)
+    for i in range(len(valid)):
+        out[i] = raw[offsets[i]:offsets[i + 1]].decode('utf-8') if valid[i] else np.nan
+    return out
+
+
+# Per-cell type tags for object columns that mix numbers with text, such as
+# capture_rate ('30 (Meteorite)255 (Core)' among plain ints).
+TAG_TEXT, TAG_INT, TAG_FLOAT, TAG_BOOL = 0, 1, 2, 3
+
+
+def _is_mixed(values):
+    return any(not isinstance(v, str) and not pd.isna(v) for v in values)
+
+
+def _encode_mixed(values):
+    # Numbers go into a float64 array, text cells through _encode_text; the
+    # tags say which one to read back and whether the number was an int.
+    tags = np.full(len(values), TAG_TEXT, dtype=np.uint8)
+    numbers = np.full(len(values), np.nan, dtype=np.float64)
+    for i, v in enumerate(values):
+        if isinstance(v, (bool, np.bool_)):
+            tags[i] = TAG_BOOL
+        elif isinstance(v, (int, np.integer)):
+            tags[i] = TAG_INT
+        elif isinstance(v, (float, np.floating)) and not np.isnan(v):
+            tags[i] = TAG_FLOAT
+        else:
+            continue
+        numbers[i] = v
+    text = [v if tag == TAG_TEXT else np.nan for v, tag in zip(values, tags)]
+    return tags, numbers, _encode_text(text)
+
+
+def _decode_mixed(tags, numbers, offsets, data, valid):
+    out = _decode_text(offsets, data, valid)
+    for i in np.flatnonzero(tags == TAG_INT):
+        out[i] = int(numbers[i])
+    for i in np.flatnonzero(tags == TAG_FLOAT):
+        out[i] = float(numbers[i])
+    for i in np.flatnonzero(tags == TAG_BOOL):
+        out[i] = bool(numbers[i])
+    return out
+
+
+def compile_dataset(xlsx_path=DEFAULT_XLSX, cache_dir=DEFAULT_CACHE_DIR, source_hash=None):
+    """Build the compiled column cache for ``xlsx_path``.
+
+    Args:
+        xlsx_path: Path to pokemon.xlsx.
+        cache_dir: Directory receiving the manifest and column files.
+        source_hash: Pre-computed SHA-256 of the workbook, if already known.
+
+    Returns:
+        The manifest dict that was written.
+    """
+    source_hash = source_hash or _file_hash(xlsx_path)
+    stamp = _source_stamp(xlsx_path)
+    df = read_source(xlsx_path)
+
+    # Each build goes into its own directory so a reader holding memory maps
+    # of the previous build is never disturbed.
+    build_name = source_hash[:16]
+    build_dir = os.path.join(cache_dir, build_name)
+    tmp_dir = build_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            np.save(os.path.join(tmp_dir, f'{i}.npy'), series.to_numpy())
+            columns.append({'name': col, 'kind': 'numeric', 'dtype': str(series.dtype)})
+        else:
+            values = series.to_numpy(dtype=object)
+            kind = 'mixed' if _is_mixed(values) else 'text'
+            if kind == 'mixed':
+                tags, numbers, (offsets, data, valid) = _encode_mixed(values)
+                np.save(os.path.join(tmp_dir, f'{i}.tags.npy'), tags)
+                np.save(os.path.join(tmp_dir, f'{i}.numbers.npy'), numbers)
+            else:
+                offsets, data, valid = _encode_text(values)
+            np.save(os.path.join(tmp_dir, f'{i}.offsets.npy'), offsets)
+            np.save(os.path.join(tmp_dir, f'{i}.data.npy'), data)
+            np.save(os.path.join(tmp_dir, f'{i}.valid.npy'), valid)
+            columns.append({'name': col, 'kind': kind})
+
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.replace(tmp_dir, build_dir)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'source': os.path.abspath(xlsx_path),
+        'source_sha256': source_hash,
+        'source_mtime_ns': stamp['mtime_ns'],
+        'source_size': stamp['size'],
+        'build': build_name,
+        'rows': len(df),
+        'columns': columns,
+    }
+    _write_manifest(cache_dir, manifest)
+
+    # Drop builds that no longer match the manifest
+    for entry in os.listdir(cache_dir):
+        full = os.path.join(cache_dir, entry)
+        if os.path.isdir(full) and entry != build_name:
+            shutil.rmtree(full, ignore_errors=True)
+    return manifest
+
+
+def _open_build(cache_dir, manifest):
+    build_dir = os.path.join(cache_dir, manifest['build'])
+    data = {}
+    for i, spec in enumerate(manifest['columns']):
+        if spec['kind'] == 'numeric':
+            data[spec['name']] = np.load(os.path.join(build_dir, f'{i}.npy'), mmap_mode='r')
+        else:
+            offsets = np.load(os.path.join(build_dir, f'{i}.offsets.npy'), mmap_mode='r')
+            blob = np.load(os.path.join(build_dir, f'{i}.data.npy'), mmap_mode='r')
+            valid = np.load(os.path.join(build_dir, f'{i}.valid.npy'), mmap_mode='r')
+            if spec['kind'] == 'mixed':
+                tags = np.load(os.path.join(build_dir, f'{i}.tags.npy'), mmap_mode='r')
+                numbers = np.load(os.path.join(build_dir, f'{i}.numbers.npy'), mmap_mode='r')
+                data[spec['name']] = _decode_mixed(tags, numbers, offsets, blob, valid)
+            else:
+                data[spec['name']] = _decode_text(offsets, blob, valid)
+    # copy=False keeps the numeric columns backed by the memory maps
+    return pd.DataFrame(data, copy=False)
+
+
+def cache_is_fresh(xlsx_path=DEFAULT_XLSX, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the manifest if the cache matches ``xlsx_path``, else ``None``.
+
+    A matching mtime and size are trusted without hashing. When they differ the
+    workbook is re-hashed; an unchanged hash only refreshes the stored stamp.
+    """
+    manifest = _read_manifest(cache_dir)
+    if manifest is None or not os.path.isdir(os.path.join(cache_dir, manifest['build'])):
+        return None
+    stamp = _source_stamp(xlsx_path)
+    if stamp['mtime_ns'] == manifest['source_mtime_ns'] and stamp['size'] == manifest['source_size']:
+        return manifest
+    if _file_hash(xlsx_path) != manifest['source_sha256']:
+        return None
+    manifest['source_mtime_ns'] = stamp['mtime_ns']
+    manifest['source_size'] = stamp['size']
+    try:
+        _write_manifest(cache_dir, manifest)
+    except OSError:
+        pass
+    return manifest
+
+
+def load_dataset(xlsx_path=DEFAULT_XLSX, cache_dir=DEFAULT_CACHE_DIR):
+    """Load pokemon.xlsx through the compiled cache, building it if needed.
+
+    Args:
+        xlsx_path: Path to pokemon.xlsx.
+        cache_dir: Directory holding the compiled cache.
+
+    Returns:
+        pandas.DataFrame whose numeric columns are memory-mapped read-only arrays.
+    """
+    manifest = cache_is_fresh(xlsx_path, cache_dir)
+    if manifest is None:
+        try:
+            manifest = compile_dataset(xlsx_path, cache_dir)
+        except OSError:
+            # Read-only install: fall back to parsing the workbook directly
+            return read_source(xlsx_path)
+    return _open_build(cache_dir, manifest)
+
+
+def synthetic_dataset(df, factor):
+    """Return ``df`` repeated ``factor`` times with unique names.
+
+    Used by the benchmarks to measure behaviour at larger row counts. Copies
+    after the first get a numeric suffix on ``name`` so text indexes grow
+    with the row count instead of collapsing onto the same terms.
+
+    Args:
+        df: Source dataset.
+        factor: Number of copies.
+    """
+    if factor <= 1:
+        return df
+    parts = [df]
+    for i in range(1, factor):
+        part = df.copy()
+        part['name'] = part['name'] + f'-{i}'
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile pokemon.xlsx into the memory-mapped dataset cache.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    compile_cmd = sub.add_parser('compile', help='(re)build the compiled dataset')
+    compile_cmd.add_argument('--xlsx', default=DEFAULT_XLSX, help='source workbook')
+    compile_cmd.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='output directory')
+    compile_cmd.add_argument('--force', action='store_true', help='rebuild even if the cache is fresh')
+    args = parser.parse_args(argv)
+
+    if args.command == 'compile':
+        manifest = None if args.force else cache_is_fresh(args.xlsx, args.cache_dir)
+        if manifest is None:
+            manifest = compile_dataset(args.xlsx, args.cache_dir)
+            print(f"Compiled {manifest['rows']} rows x {len(manifest['columns'])} columns into {args.cache_dir}")
+        else:
+            print(f"Cache in {args.cache_dir} is up to date ({manifest['rows']} rows)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
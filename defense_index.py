@@ -0,0 +1,228 @@
+import sys
+import argparse
+import numpy as np
+from damage import ATTACK_TABLE, NO_TYPE, against_columns, all_types, type_index, type_indices
+
+# Bitset index of defensive profiles
+# Each against_* column is classified per row into immune, 1/4, 1/2, 1, 2 or 4
+# times damage, and every (attack type, class) pair keeps the set of rows in
+# that class as a packed bitset, 64 rows per uint64 word. A query such as
+# "resists Fire and Ground and is immune to Electric" is then a few bitwise
+# ANDs over N/64 words instead of a scan of the rows:
+#     index.rows(index.select(all_of=[('resists', 'fire'), ('resists', 'ground'),
+#                                     ('immune', 'electric')]))
+# The same conditions are query fields in the Pokédex search (resists:fire
+# weak:water,grass -immune:ground), and the damage calculator filters its
+# defender list with them. The columns are also checked against type_chart in
+# damage.py; rows whose multipliers disagree with their types are listed by
+# ``python defense_index.py check``.
+
+CLASSES = (0.0, 0.25, 0.5, 1.0, 2.0, 4.0)
+CLASS_NAMES = ('immune', 'quarter', 'half', 'neutral', 'double', 'quadruple')
+IMMUNE, QUARTER, HALF, NEUTRAL, DOUBLE, QUADRUPLE = range(len(CLASSES))
+# Multipliers outside CLASSES, and missing cells
+UNCLASSIFIED = -1
+
+# Query words -> the classes they cover. Immunities count as resistances, as
+# they do in team_builder.py.
+GROUPS = {
+    'immune': (IMMUNE,),
+    'resists': (IMMUNE, QUARTER, HALF),
+    'resists4': (QUARTER,),
+    'neutral': (NEUTRAL,),
+    'weak': (DOUBLE, QUADRUPLE),
+    'weak4': (QUADRUPLE,),
+}
+
+
+def _type(value):
+    # Type names or indices; NO_TYPE is not an attack type
+    t = type_index(value) if not isinstance(value, (int, np.integer)) else int(value)
+    if not 0 <= t < len(all_types):
+        raise ValueError(f'Unknown type: {value!r}')
+    return t
+
+
+def chart_multipliers(type1, type2):
+    """(N, 18) multipliers by attack type from type_chart for the given types.
+
+    A second type equal to the first counts once.
+    """
+    type1 = np.asarray(type1, dtype=np.intp)
+    type2 = np.where(np.asarray(type2, dtype=np.intp) == type1, NO_TYPE, type2)
+    return (ATTACK_TABLE[:, type1] * ATTACK_TABLE[:, type2]).T
+
+
+class DefenseIndex:
+    """Packed row bitsets per attack type and multiplier class.
+
+    Attributes:
+        row_count: Rows in the dataset.
+        values: (N, 18) against_* multipliers, NaN where a column is missing.
+        classes: (N, 18) int8 indices into CLASSES, or UNCLASSIFIED.
+        expected: (N, 18) multipliers from type_chart and the row's types.
+        bits: (18, len(CLASSES), words) uint64 bitsets.
+        group_bits: GROUPS key -> (18, words) uint64 bitsets, read-only.
+
+    Args:
+        df: The dataset.
+    """
+
+    def __init__(self, df):
+        n = self.row_count = len(df)
+        self.words = (n + 63) // 64
+        self.values = np.full((n, len(all_types)), np.nan, dtype=np.float64)
+        for t, col in against_columns(df).items():
+            if t < len(all_types):
+                self.values[:, t] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.classes = np.full(self.values.shape, UNCLASSIFIED, dtype=np.int8)
+        for c, multiplier in enumerate(CLASSES):
+            self.classes[np.isclose(self.values, multiplier)] = c
+        self.expected = chart_multipliers(type_indices(df['type1']), type_indices(df['type2'])) \
+            if {'type1', 'type2'} <= set(df.columns) else np.full(self.values.shape, np.nan)
+
+        self.bits = np.zeros((len(all_types), len(CLASSES), self.words), dtype='<u8')
+        for c in range(len(CLASSES)):
+            self.bits[:, c] = self._pack((self.classes == c).T)
+        # Groups are ORed once here, so a condition is a lookup
+        self.group_bits = {}
+        for group, classes in GROUPS.items():
+            planes = np.bitwise_or.reduce(self.bits[:, classes], axis=1)
+            planes.flags.writeable = False
+            self.group_bits[group] = planes
+        self._all = self._pack(np.ones(n, dtype=bool))
+
+    def _pack(self, mask):
+        # Rows along the last axis -> little-endian words, bit r % 64 of word r // 64
+        packed = np.packbits(mask, axis=-1, bitorder='little')
+        padding = self.words * 8 - packed.shape[-1]
+        if padding:
+            packed = np.concatenate([packed, np.zeros(packed.shape[:-1] + (padding,), dtype=np.uint8)], axis=-1)
+        return np.ascontiguousarray(packed).view('<u8')
+
+    def bitset(self, group, attack_type):
+        """Rows whose multiplier from ``attack_type`` is in ``group`` (a GROUPS key).
+
+        The bitset is a read-only view into the index.
+
+        Raises:
+            ValueError: Unknown group or type.
+        """
+        try:
+            planes = self.group_bits[group]
+        except KeyError:
+            raise ValueError(f'Unknown defensive class: {group!r}') from None
+        return planes[_type(attack_type)]
+
+    def any_of(self, group, attack_types):
+        """Rows in ``group`` for at least one of ``attack_types``."""
+        attack_types = list(attack_types)
+        if len(attack_types) == 1:
+            return self.bitset(group, attack_types[0])
+        words = np.zeros(self.words, dtype='<u8')
+        for t in attack_types:
+            words |= self.bitset(group, t)
+        return words
+
+    def invert(self, words):
+        """Complement of a bitset, within the dataset's rows."""
+        return ~words & self._all
+
+    def select(self, all_of=(), any_of=(), none_of=()):
+        """Bitset of the rows meeting every condition of ``all_of``, at least
+        one of ``any_of`` (if given) and none of ``none_of``.
+
+        Conditions are (group, attack type) pairs, e.g. ('resists', 'fire').
+        """
+        words = self._all.copy()
+        for group, t in all_of:
+            words &= self.bitset(group, t)
+        if any_of:
+            alternatives = np.zeros(self.words, dtype='<u8')
+            for group, t in any_of:
+                alternatives |= self.bitset(group, t)
+            words &= alternatives
+        for group, t in none_of:
+            words &= ~self.bitset(group, t)
+        return words
+
+    def mask(self, words):
+        """Boolean row mask of a bitset."""
+        return np.unpackbits(words.view(np.uint8), count=self.row_count, bitorder='little').view(bool)
+
+    def rows(self, words):
+        """Row positions in a bitset, ascending."""
+        return np.flatnonzero(self.mask(words))
+
+    def count(self, words):
+        return int(np.unpackbits(words.view(np.uint8)).sum())
+
+    def inconsistent_rows(self):
+        """Rows whose against_* multipliers disagree with type_chart for their types.
+
+        Returns:
+            (rows, attack type mask) with the mask of shape (len(rows), 18).
+        """
+        known = ~np.isnan(self.values) & ~np.isnan(self.expected)
+        wrong = known & ~np.isclose(self.values, self.expected)
+        rows = np.flatnonzero(wrong.any(axis=1))
+        return rows, wrong[rows]
+
+
+def get_defense_index(store):
+    """Return the DefenseIndex for the store's current dataset version."""
+    return store.derived('defense_index', DefenseIndex)
+
+
+def _multiplier_text(value):
+    return 'n/a' if np.isnan(value) else f'{value:g}x'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Defensive-profile queries over the against_* columns.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    query_cmd = sub.add_parser('query', help="rows meeting conditions such as resists:fire immune:electric")
+    query_cmd.add_argument('conditions',
+                           help=f"e.g. 'resists:fire,water -weak:ground': <class>:<type>[,<type>...] "
+                                f"conditions, a leading '-' negates one; classes: {', '.join(GROUPS)}")
+    query_cmd.add_argument('--limit', type=int, default=50, help='maximum names to print (0 for all)')
+    sub.add_parser('check', help='list rows whose against_* columns disagree with type_chart')
+    args = parser.parse_args(argv)
+
+    from data_store import get_store
+    store = get_store()
+    index = get_defense_index(store)
+    names = store.df['name'].to_numpy(dtype=object)
+
+    if args.command == 'query':
+        words = index.select()
+        try:
+            for condition in args.conditions.split():
+                negate = condition.startswith('-')
+                group, _, types = condition.lstrip('-').partition(':')
+                part = index.any_of(group.lower(), types.split(','))
+                words &= index.invert(part) if negate else part
+        except ValueError as e:
+            print(f'Query error: {e}', file=sys.stderr)
+            return 2
+        rows = index.rows(words)
+        shown = rows[:args.limit] if args.limit else rows
+        print(', '.join(str(names[r]) for r in shown) + (', ...' if len(shown) < len(rows) else ''))
+        print(f'{len(rows)} matching Pokémon')
+    elif args.command == 'check':
+        rows, wrong = index.inconsistent_rows()
+        types1 = store.df['type1'].to_numpy(dtype=object)
+        types2 = store.df['type2'].to_numpy(dtype=object)
+        for row, types in zip(rows, wrong):
+            details = ', '.join(f'{all_types[t]} {_multiplier_text(index.values[row, t])} '
+                                f'(chart {_multiplier_text(index.expected[row, t])})' for t in np.flatnonzero(types))
+            type2 = types2[row] if isinstance(types2[row], str) and types2[row] else '-'
+            print(f'{names[row]} ({types1[row]}/{type2}): {details}')
+        unclassified = int((index.classes == UNCLASSIFIED).sum())
+        print(f'{len(rows)} rows disagree with type_chart; {unclassified} cells are not one of '
+              f"{', '.join(f'{c:g}x' for c in CLASSES)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from radar_chart import STATS
+from search_index import split_abilities
+
+# Pokédex display records
+# Everything show_entry puts on screen, formatted once per dataset load. A
+# navigation step then only looks up a record and copies its strings into the
+# labels, without touching pandas.
+
+# Fields shown in the stats and extras grid, in label order
+STAT_FIELDS = ('hp', 'defense', 'sp_attack', 'attack', 'speed', 'sp_defense')
+EXTRA_FIELDS = ('base_egg_steps', 'base_happiness', 'capture_rate', 'generation', 'height_m', 'weight_kg')
+GRID_FIELDS = STAT_FIELDS + EXTRA_FIELDS
+
+
+class DisplayRecord:
+    """Pre-formatted display strings of one Pokémon."""
+
+    __slots__ = ('name', 'title', 'japanese_name', 'types', 'abilities', 'grid',
+                 'legend', 'image_content', 'radar')
+
+    def __init__(self, name, title, japanese_name, types, abilities, grid, legend, image_content, radar):
+        self.name = name
+        self.title = title
+        self.japanese_name = japanese_name
+        self.types = types                  # 1 or 2 type names
+        self.abilities = abilities
+        self.grid = grid                    # strings in GRID_FIELDS order
+        self.legend = legend
+        self.image_content = image_content  # '' if there is no image
+        self.radar = radar                  # (name, stats) series for radar_chart
+
+
+def _column(df, name, default=''):
+    if name in df.columns:
+        return df[name].to_numpy(dtype=object)
+    return np.full(len(df), default, dtype=object)
+
+
+def _text(value):
+    return value if isinstance(value, str) else ''
+
+
+def _stat_text(value):
+    return str(value) if value is not None and value != '' else ''
+
+
+def _extra_text(value):
+    if value is None or value == '' or (isinstance(value, float) and np.isnan(value)):
+        return 'N/A'
+    return str(value)
+
+
+def _stat_values(df):
+    # Radar values as floats, missing or non-numeric -> 0
+    columns = [pd.to_numeric(df[s], errors='coerce').to_numpy(dtype=float) if s in df.columns
+               else np.zeros(len(df)) for s in STATS]
+    return np.nan_to_num(np.column_stack(columns) if columns else np.zeros((len(df), 0)))
+
+
+class DisplayTable:
+    """Display records for every row of a dataset, by row position.
+
+    Args:
+        df: Dataset as loaded by dataset.py.
+    """
+
+    def __init__(self, df):
+        names = [_text(v) for v in _column(df, 'name')]
+        numbers = _column(df, 'pokedex_number')
+        japanese = _column(df, 'japanese_name')
+        types1 = _column(df, 'type1')
+        types2 = _column(df, 'type2')
+        abilities = _column(df, 'abilities')
+        legendary = _column(df, 'is_legendary', 0)
+        images = _column(df, 'image_content')
+        grid_columns = [[_stat_text(v) for v in _column(df, f)] for f in STAT_FIELDS]
+        grid_columns += [[_extra_text(v) for v in _column(df, f, None)] for f in EXTRA_FIELDS]
+        stats = _stat_values(df)
+
+        records = []
+        for i, name in enumerate(names):
+            records.append(DisplayRecord(
+                name=name,
+                title=f'{name} (#{numbers[i]})',
+                japanese_name=_text(japanese[i]),
+                types=tuple(t for t in (_text(types1[i]), _text(types2[i])) if t),
+                abilities=', '.join(split_abilities(_text(abilities[i]))),
+                grid=tuple(column[i] for column in grid_columns),
+                legend='This Pokémon is legendary.' if legendary[i] == 1 else 'This Pokémon is not legendary.',
+                image_content=_text(images[i]),
+                radar=(name, tuple(stats[i].tolist())),
+            ))
+        self.records = records
+        self.types = sorted({t for r in records for t in r.types})
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, position):
+        return self.records[position]
+
+
+def get_display_table(store):
+    """Return the DisplayTable for the store's current dataset version."""
+    return store.derived('display_table', DisplayTable)
@@ -0,0 +1,313 @@
+import os
+import sys
+import time
+import atexit
+import threading
+from collections import deque
+
+# Opt-in timing instrumentation
+# Hot paths are wrapped in named spans (``with span('pokedex.image'):`` or the
+# ``@timed`` decorator). While instrumentation is off, span() hands back one
+# shared object whose enter/exit do nothing, so the wrapped code pays for a
+# function call and no more. While it is on, each span adds its duration to a
+# log-linear histogram for its name (16 buckets per power of two, so
+# percentiles are within about 6%) and appends a complete event to a bounded
+# buffer that can be written in Chrome's trace format (chrome://tracing,
+# Perfetto).
+# Turn it on with POKEMON_TOOLS_PROFILE=<prefix> (or 1 for the default prefix)
+# or main.py --profile[=<prefix>]; <prefix>.stats.json and <prefix>.trace.json
+# are written on exit, and whenever dump() is called. Only the standard
+# library is imported, and little of it up front, so main.py can import this
+# before anything else.
+
+PROFILE_ENV = 'POKEMON_TOOLS_PROFILE'
+PROFILE_FLAG = '--profile'
+DEFAULT_PREFIX = 'pokemon_tools_profile'
+# Most recent spans kept for the trace
+TRACE_EVENTS = 200_000
+
+SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def _bucket(ns):
+    # Values below 16 ns get a bucket each; above that, 16 per power of two
+    if ns < _SUB_BUCKETS:
+        return max(ns, 0)
+    shift = ns.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * _SUB_BUCKETS + (ns >> shift) - _SUB_BUCKETS
+
+
+def _bucket_bounds(index):
+    if index < _SUB_BUCKETS:
+        return index, index + 1
+    shift = index // _SUB_BUCKETS - 1
+    mantissa = index % _SUB_BUCKETS + _SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class Histogram:
+    """Log-linear histogram of durations in nanoseconds.
+
+    Attributes:
+        count: Number of recorded durations.
+        total: Their sum.
+        low, high: Smallest and largest recorded duration.
+        buckets: Bucket index -> count.
+    """
+
+    __slots__ = ('count', 'total', 'low', 'high', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.low = None
+        self.high = 0
+        self.buckets = {}
+
+    def record(self, ns):
+        self.count += 1
+        self.total += ns
+        if self.low is None or ns < self.low:
+            self.low = ns
+        if ns > self.high:
+            self.high = ns
+        index = _bucket(ns)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, q):
+        """Approximate ``q``-th percentile (0-100) in nanoseconds."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                low, high = _bucket_bounds(index)
+                # Middle of the bucket, kept within what was actually seen
+                return float(min(max((low + high) / 2, self.low), self.high))
+        return float(self.high)
+
+    def summary(self):
+        """Count and mean/p50/p95/p99/max in microseconds."""
+        return {
+            'count': self.count,
+            'mean_us': self.total / self.count / 1e3 if self.count else 0.0,
+            'p50_us': self.percentile(50) / 1e3,
+            'p95_us': self.percentile(95) / 1e3,
+            'p99_us': self.percentile(99) / 1e3,
+            'max_us': self.high / 1e3,
+            'total_ms': self.total / 1e6,
+        }
+
+
+class Recorder:
+    """Histograms per span name plus the recent spans for the trace.
+
+    Thread-safe; spans from worker threads keep their thread id in the trace.
+
+    Args:
+        prefix: Path prefix of the files written by ``dump``.
+        trace_events: Number of recent spans kept for the trace.
+    """
+
+    def __init__(self, prefix=DEFAULT_PREFIX, trace_events=TRACE_EVENTS):
+        self.prefix = prefix
+        self.origin = time.perf_counter_ns()
+        self.histograms = {}
+        self.events = deque(maxlen=trace_events)
+        self._lock = threading.Lock()
+
+    def record(self, name, start_ns, end_ns):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(end_ns - start_ns)
+            self.events.append((name, start_ns, end_ns, threading.get_ident()))
+
+    def stats(self):
+        """Span name -> Histogram.summary(), names sorted."""
+        with self._lock:
+            return {name: self.histograms[name].summary() for name in sorted(self.histograms)}
+
+    def trace(self):
+        """The recent spans as a Chrome trace (JSON object format)."""
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+        threads = {}
+        trace = []
+        for name, start, end, ident in events:
+            tid = threads.setdefault(ident, len(threads))
+            trace.append({'name': name, 'cat': name.split('.', 1)[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                          'ts': (start - self.origin) / 1e3, 'dur': (end - start) / 1e3})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def dump(self, prefix=None):
+        """Write <prefix>.stats.json and <prefix>.trace.json.
+
+        Returns:
+            The two paths.
+        """
+        import json
+        prefix = prefix or self.prefix
+        paths = (prefix + '.stats.json', prefix + '.trace.json')
+        for path, data in zip(paths, (self.stats(), self.trace())):
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1 if path.endswith('.stats.json') else None)
+            os.replace(tmp_path, path)
+        return paths
+
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+_recorder = None
+
+
+def enabled():
+    return _recorder is not None
+
+
+def get_recorder():
+    """The active Recorder, or None while instrumentation is off."""
+    return _recorder
+
+
+def span(name):
+    """Context manager timing its block as ``name`` (a no-op while off)."""
+    recorder = _recorder
+    if recorder is None:
+        return _NO_SPAN
+    return _Span(recorder, name)
+
+
+def timed(name):
+    """Decorator timing every call of the function as ``name``."""
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            recorder = _recorder
+            if recorder is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                recorder.record(name, start, time.perf_counter_ns())
+        wrapper.__name__ = fn.__name__
+        wrapper.__qualname__ = fn.__qualname__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorate
+
+
+def enable(prefix=DEFAULT_PREFIX, dump_at_exit=True):
+    """Start recording; the files are written at exit unless told otherwise.
+
+    Returns:
+        The Recorder; an already active one is kept.
+    """
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder(prefix)
+        if dump_at_exit:
+            atexit.register(_dump_at_exit, _recorder)
+    return _recorder
+
+
+def disable():
+    """Stop recording. Nothing is written for the discarded recorder."""
+    global _recorder
+    _recorder = None
+
+
+def dump(prefix=None):
+    """Write the stats and trace files now; None while instrumentation is off."""
+    recorder = _recorder
+    return recorder.dump(prefix) if recorder is not None else None
+
+
+def _dump_at_exit(recorder):
+    if recorder is _recorder:
+        try:
+            paths = recorder.dump()
+        except OSError as e:
+            print(f'[profile] could not write the profile: {e}', file=sys.stderr)
+        else:
+            print(f"[profile] wrote {' and '.join(paths)}", file=sys.stderr)
+
+
+def configure(argv=None, environ=None):
+    """Enable instrumentation from ``--profile[=prefix]`` in ``argv`` or PROFILE_ENV.
+
+    Returns:
+        ``argv`` without the flag.
+    """
+    environ = os.environ if environ is None else environ
+    argv = list(sys.argv if argv is None else argv)
+    prefix = None
+    for arg in list(argv):
+        if arg == PROFILE_FLAG or arg.startswith(PROFILE_FLAG + '='):
+            argv.remove(arg)
+            prefix = arg.partition('=')[2] or DEFAULT_PREFIX
+    value = environ.get(PROFILE_ENV, '')
+    if prefix is None and value and value != '0':
+        prefix = DEFAULT_PREFIX if value == '1' else value
+    if prefix is not None:
+        enable(prefix)
+    return argv
+
+
+def main(argv=None):
+    import json
+    import argparse
+    parser = argparse.ArgumentParser(description='Print the span latencies of a profile written by --profile.')
+    parser.add_argument('stats', help='<prefix>.stats.json')
+    parser.add_argument('--sort', default='total_ms', choices=['count', 'mean_us', 'p50_us', 'p95_us', 'p99_us',
+                                                               'max_us', 'total_ms'])
+    args = parser.parse_args(argv)
+    with open(args.stats, 'r', encoding='utf-8') as f:
+        stats = json.load(f)
+    print(f"{'span':<32} {'count':>7} {'p50 µs':>10} {'p95 µs':>10} {'p99 µs':>10} {'max µs':>10} {'total ms':>10}")
+    for name, s in sorted(stats.items(), key=lambda item: -item[1][args.sort]):
+        print(f"{name:<32} {s['count']:>7} {s['p50_us']:>10.1f} {s['p95_us']:>10.1f} {s['p99_us']:>10.1f} "
+              f"{s['max_us']:>10.1f} {s['total_ms']:>10.1f}")
+    return 0
+
+
+# Other entry points than main.py (benchmarks, headless tools) are covered by
+# the environment variable alone
+if os.environ.get(PROFILE_ENV, '') not in ('', '0'):
+    configure([])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,24 +1,122 @@
 import sys
+import time
+_START = time.perf_counter()
 import os
-from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QGraphicsDropShadowEffect, QLabel
-from PySide6.QtGui import QPixmap, QPainter, QFontDatabase, QIcon
-from PySide6.QtCore import Qt
-from bsc_data import BscDataWindow
-from pokedex import PokedexWindow
-from damage_calculator import CalculatorWindow
+from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel
+from PySide6.QtGui import QImage, QPixmap, QPainter, QFontDatabase, QIcon, QColor, QKeySequence, QShortcut
+from PySide6.QtCore import Qt, QThread, QTimer, QSize, QRectF
+from raster_cache import add_shadow, get_raster_cache, load_background
+import instrumentation
+from instrumentation import timed
+
+# The tool windows and the dataset are imported when first needed, and warmed
+# up in the background once the main window is on screen, so that it appears
+# without waiting for pandas or the Pokédex to load.
+
+BASE_DIR = os.path.dirname(__file__)
+BACKGROUND = 'background.png'
+WINDOW_SIZE = QSize(1000, 600)
+LOGO_SIZE = QSize(525, 70)
+# Average colour of background.png, shown until the image has been decoded
+BACKGROUND_COLOR = '#7c7058'
+# Print the startup timeline to stderr when --timeline is passed or this is set
+TIMELINE_ENV = 'POKEMON_TOOLS_TIMELINE'
+# Writes the profile while instrumentation is on (--profile)
+PROFILE_SHORTCUT = 'Ctrl+Shift+P'
+
+
+class StartupTimeline:
+    """Milliseconds since main.py started loading, for each startup milestone."""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.events = []
+
+    def mark(self, event):
+        elapsed = (time.perf_counter() - _START) * 1e3
+        self.events.append((event, elapsed))
+        if self.enabled:
+            print(f'[startup] {elapsed:8.1f} ms  {event}', file=sys.stderr, flush=True)
+
+
+class ImageLoader(QThread):
+    """Decodes the background and rasterises the logo off the GUI thread."""
+
+    def __init__(self, dpr=1.0, parent=None):
+        super().__init__(parent)
+        self.dpr = dpr
+        self.background = QImage()
+        self.logo = QImage()
+
+    @timed('startup.images')
+    def run(self):
+        self.background = load_background(BACKGROUND, WINDOW_SIZE, self.dpr)
+        from PySide6.QtSvg import QSvgRenderer
+        renderer = QSvgRenderer(os.path.join(BASE_DIR, 'logo.svg'))
+        if renderer.isValid():
+            size = renderer.defaultSize().scaled(LOGO_SIZE, Qt.KeepAspectRatio)
+            logo = QImage(size, QImage.Format_ARGB32_Premultiplied)
+            logo.fill(Qt.transparent)
+            painter = QPainter(logo)
+            renderer.render(painter, QRectF(0, 0, size.width(), size.height()))
+            painter.end()
+            self.logo = logo
+
+
+class Preloader(QThread):
+    """Imports the tool windows and builds the dataset and its indexes.
+
+    ``error`` holds the exception if that failed; the windows then report it
+    themselves when opened.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.error = None
+
+    @timed('startup.preload')
+    def run(self):
+        try:
+            import pokedex
+            import damage_calculator
+            import bsc_data
+            import team_window
+            from data_store import get_store
+            from search_index import get_search_index
+            from query_engine import get_query_engine
+            from display_records import get_display_table
+            from similarity_index import get_similarity_index
+            from asset_pack import get_asset_pack
+            from report_engine import get_report_engine
+            store = get_store()
+            get_search_index(store)
+            get_query_engine(store)
+            get_display_table(store)
+            get_similarity_index(store)
+            get_report_engine(store).refresh()
+            get_asset_pack()
+        except Exception as e:
+            self.error = e
+
 
 class MainWindow(QWidget):
-    def __init__(self):
+    def __init__(self, timeline=None):
         super().__init__()
+        self.timeline = timeline or StartupTimeline(False)
         self.setWindowTitle("Pokémon Tools ver. 4.0 (Copyright 2025 Michael Hertz & DPW Group 6. All rights reserved. )")
-        self.setFixedSize(1000, 600)
-        base_dir = os.path.dirname(__file__)
+        self.setFixedSize(WINDOW_SIZE)
+        base_dir = BASE_DIR
 
         icon_path = os.path.join(base_dir, 'ptlogo.svg')
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(icon_path))
-        
-        self.bg_pixmap = QPixmap(os.path.join(base_dir, 'background.png'))
+
+        # Background and logo are decoded on a worker; until then the window
+        # is filled with the background's average colour
+        self.image_loader = ImageLoader(self.devicePixelRatioF(), self)
+        self.image_loader.finished.connect(self.on_images_loaded)
+        self.image_loader.start()
+        self.preloader = None
 
         # Load custom fonts
         font_id1 = QFontDatabase.addApplicationFont(os.path.join(base_dir, 'font', '汉仪文黑-65W.ttf'))
@@ -30,15 +128,14 @@ class MainWindow(QWidget):
 
         main_layout = QVBoxLayout(self)
         # Reduced top margin and layout spacing
-        main_layout.setContentsMargins(50, 175, 50, 180)
+        main_layout.setContentsMargins(50, 175, 50, 137)
         main_layout.setSpacing(5)
 
         # Title logo
-        title_label = QLabel(self)
-        title_pixmap = QPixmap(os.path.join(base_dir, 'logo.svg')).scaled(525, 70, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        title_label.setPixmap(title_pixmap)
-        title_label.setAlignment(Qt.AlignHCenter)
-        main_layout.addWidget(title_label)
+        self.title_label = QLabel(self)
+        self.title_label.setFixedHeight(LOGO_SIZE.height())
+        self.title_label.setAlignment(Qt.AlignHCenter)
+        main_layout.addWidget(self.title_label)
 
         # Buttons container with its own layout for tight spacing
         buttons_container = QWidget(self)
@@ -49,17 +146,15 @@ class MainWindow(QWidget):
         btn1 = QPushButton("Basic Data Reports")
         btn2 = QPushButton("Pokédex Search")
         btn3 = QPushButton("Damage Calculator")
+        btn4 = QPushButton("Team Builder")
 
-        for btn in (btn1, btn2, btn3):
+        for btn in (btn1, btn2, btn3, btn4):
             btn.setFixedSize(400, 40)
             btn.setStyleSheet(
                 f"QPushButton {{ background-color: #FEE6A3; color: #7E5249; font-family: '{self.main_font}'; font-size: 18px; font-weight: bold; border: none; border-radius: 20px; }}"
             )
-            effect = QGraphicsDropShadowEffect(self)
-            effect.setBlurRadius(12)
-            effect.setOffset(0, 3)
-            btn.setGraphicsEffect(effect)
             button_layout.addWidget(btn, alignment=Qt.AlignHCenter)
+        self.buttons = (btn1, btn2, btn3, btn4)
 
         # Override Pokédex button font only
         btn2.setStyleSheet(
@@ -71,25 +166,88 @@ class MainWindow(QWidget):
         btn1.clicked.connect(self.open_bsc)
         btn2.clicked.connect(self.open_pokedex)
         btn3.clicked.connect(self.open_calculator)
+        btn4.clicked.connect(self.open_team_builder)
 
+        if instrumentation.enabled():
+            shortcut = QShortcut(QKeySequence(PROFILE_SHORTCUT), self)
+            shortcut.setContext(Qt.ApplicationShortcut)
+            shortcut.activated.connect(self.dump_profile)
+
+    @timed('paint.main')
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.bg_pixmap)
+        background = get_raster_cache().cached_background(BACKGROUND, self.size(), self.devicePixelRatioF())
+        if background is None:
+            painter.fillRect(self.rect(), QColor(BACKGROUND_COLOR))
+        else:
+            painter.drawPixmap(0, 0, background)
+        if self.preloader is None:
+            self.timeline.mark('first paint')
+            # Warm up once this frame is on screen
+            self.preloader = Preloader(self)
+            self.preloader.finished.connect(self.on_preloaded)
+            QTimer.singleShot(0, self.preloader.start)
+
+    def on_images_loaded(self):
+        if not self.image_loader.background.isNull():
+            get_raster_cache().put_background(BACKGROUND, WINDOW_SIZE, self.image_loader.dpr,
+                                              self.image_loader.background)
+        # Shadows go on with the background; against the plain fill of the
+        # first frames they would only delay it
+        for btn in self.buttons:
+            add_shadow(btn, blur=12, offset=(0, 3), radius=20)
+        self.title_label.setPixmap(QPixmap.fromImage(self.image_loader.logo))
+        self.timeline.mark('background and logo loaded')
+        self.update()
+
+    def on_preloaded(self):
+        if self.preloader.error is not None:
+            self.timeline.mark(f'preload failed: {self.preloader.error!r}')
+            return
+        # Qt objects are made here, on the GUI thread: the shared image cache
+        # and the type icons, plus the first Pokédex entries in the background
+        from asset_cache import get_asset_cache
+        from display_records import get_display_table
+        from data_store import get_store
+        from pokedex import PREFETCH_RADIUS
+        records = get_display_table(get_store())
+        cache = get_asset_cache()
+        for type_name in records.types:
+            cache.icon(type_name)
+        cache.prefetch((r.name, r.image_content) for r in records.records[:PREFETCH_RADIUS + 1])
+        self.timeline.mark('ready')
+
+    def dump_profile(self):
+        paths = instrumentation.dump()
+        if paths:
+            print(f"[profile] wrote {' and '.join(paths)}", file=sys.stderr, flush=True)
 
     def open_bsc(self):
+        from bsc_data import BscDataWindow
         self.bsc_window = BscDataWindow()
         self.bsc_window.show()
 
     def open_pokedex(self):
+        from pokedex import PokedexWindow
         self.pokedex_window = PokedexWindow()
         self.pokedex_window.show()
 
     def open_calculator(self):
+        from damage_calculator import CalculatorWindow
         self.calculator_window = CalculatorWindow()
         self.calculator_window.show()
 
+    def open_team_builder(self):
+        from team_window import TeamBuilderWindow
+        self.team_window = TeamBuilderWindow()
+        self.team_window.show()
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    argv = instrumentation.configure(sys.argv)
+    timeline = StartupTimeline('--timeline' in argv or bool(os.environ.get(TIMELINE_ENV)))
+    timeline.mark('imports')
+    app = QApplication([arg for arg in argv if arg != '--timeline'])
+    window = MainWindow(timeline)
     window.show()
+    timeline.mark('window shown')
     sys.exit(app.exec())
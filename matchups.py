@@ -0,0 +1,292 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import numpy as np
+from damage import ATTACK_TABLE, NO_TYPE, STAB_MULTIPLIER, type_index
+from dataset import DEFAULT_CACHE_DIR
+
+# All-pairs attacker-vs-defender damage for the whole Pokédex
+# Every Pokémon is assumed to attack with a STAB move of fixed power in each of
+# its types, physical or special, whichever hurts the defender most. Damage
+# uses the standard level/power/attack/defense formula with STAB, type
+# effectiveness and the 0.85-1.00 random roll. Results are stored as uint16 HP
+# points in an (2, attackers, defenders) array: [0] minimum roll, [1] maximum.
+
+DEFAULT_LEVEL = 50
+DEFAULT_POWER = 80
+# Attackers and defenders per tile; a tile's float32 temporaries are 256 KiB each
+DEFAULT_BLOCK = 256
+# Individual values / effort values assumed for every stat
+DEFAULT_IV = 31
+DEFAULT_EV = 0
+MIN_ROLL = 0.85
+
+MATRIX_DTYPE = np.uint16
+MATRIX_PREFIX = 'matchups-'
+
+
+def hp_stat(base, level=DEFAULT_LEVEL, iv=DEFAULT_IV, ev=DEFAULT_EV):
+    """Actual HP at ``level`` from base HP (vectorized)."""
+    return np.floor((2 * np.asarray(base, dtype=np.float64) + iv + ev // 4) * level / 100) + level + 10
+
+
+def other_stat(base, level=DEFAULT_LEVEL, iv=DEFAULT_IV, ev=DEFAULT_EV):
+    """Actual non-HP stat at ``level`` from its base value, neutral nature."""
+    return np.floor((2 * np.asarray(base, dtype=np.float64) + iv + ev // 4) * level / 100) + 5
+
+
+def base_damage(level, power, attack, defense):
+    """Damage before random roll, STAB and type effectiveness (vectorized).
+
+    ``floor(floor(floor(2 * level / 5 + 2) * power * attack / defense) / 50) + 2``
+    """
+    return np.floor(np.floor(np.floor(2 * level / 5 + 2) * power * attack / defense) / 50) + 2
+
+
+def roll_damage(base, effectiveness, stab=True):
+    """(minimum, maximum) damage of ``base`` after roll, STAB and type multiplier."""
+    stab_mult = STAB_MULTIPLIER if stab else 1.0
+    low = np.floor(np.floor(np.floor(base * MIN_ROLL) * stab_mult) * effectiveness)
+    high = np.floor(np.floor(base * stab_mult) * effectiveness)
+    return low, high
+
+
+class Combatants:
+    """Level-adjusted stats and type indices for every row of the dataset.
+
+    Args:
+        df: The dataset (needs hp, attack, defense, sp_attack, sp_defense,
+            type1 and type2).
+        level: Level every Pokémon is assumed to be at.
+    """
+
+    def __init__(self, df, level=DEFAULT_LEVEL):
+        self.level = level
+        self.hp = hp_stat(df['hp'].to_numpy(), level)
+        self.attack = other_stat(df['attack'].to_numpy(), level)
+        self.defense = other_stat(df['defense'].to_numpy(), level)
+        self.sp_attack = other_stat(df['sp_attack'].to_numpy(), level)
+        self.sp_defense = other_stat(df['sp_defense'].to_numpy(), level)
+        self.speed = other_stat(df['speed'].to_numpy(), level) if 'speed' in df.columns else None
+        self.type1 = np.array([type_index(t) for t in df['type1']], dtype=np.intp)
+        self.type2 = np.array([type_index(t) for t in df['type2']], dtype=np.intp)
+        self.type2[self.type2 == self.type1] = NO_TYPE
+
+    def __len__(self):
+        return len(self.hp)
+
+    def fingerprint(self, *params):
+        """Short hash of everything a matchup matrix depends on."""
+        digest = hashlib.sha1()
+        for arr in (self.hp, self.attack, self.defense, self.sp_attack, self.sp_defense, self.type1, self.type2):
+            digest.update(np.ascontiguousarray(arr).tobytes())
+        digest.update(repr(params).encode())
+        return digest.hexdigest()[:16]
+
+
+def compute_block(combatants, attackers, defenders=slice(None), power=DEFAULT_POWER, effectiveness=None):
+    """Min/max damage of the ``attackers`` rows against the ``defenders`` rows.
+
+    Args:
+        combatants: Combatants of the dataset.
+        attackers: Row positions (or a slice) of the attacking Pokémon.
+        defenders: Row positions (or a slice) of the defending Pokémon.
+        power: Move power.
+        effectiveness: Optional precomputed per-type defender multipliers,
+            shape (19, N); see defender_effectiveness().
+
+    Returns:
+        (low, high) float32 arrays of shape (len(attackers), len(defenders)).
+    """
+    c = combatants
+    if effectiveness is None:
+        effectiveness = defender_effectiveness(c)
+    level = c.level
+    physical = base_damage(level, power, c.attack[attackers, None], c.defense[None, defenders]).astype(np.float32)
+    special = base_damage(level, power, c.sp_attack[attackers, None], c.sp_defense[None, defenders]).astype(np.float32)
+    best_low = best_high = None
+    for types in (c.type1[attackers], c.type2[attackers]):
+        eff = effectiveness[:, defenders][types]
+        for base in (physical, special):
+            low, high = roll_damage(base, eff)
+            if best_high is None:
+                best_low, best_high = low, high
+            else:
+                better = high > best_high
+                best_low = np.where(better, low, best_low)
+                best_high = np.where(better, high, best_high)
+    return best_low, best_high
+
+
+def defender_effectiveness(combatants):
+    """Multiplier of each attack type against each defender, shape (19, N).
+
+    Row NO_TYPE is all zeros: an attacker without a second type has no second
+    move, so it never wins the max.
+    """
+    c = combatants
+    eff = (ATTACK_TABLE[:, c.type1] * ATTACK_TABLE[:, c.type2]).astype(np.float32)
+    return np.vstack([eff, np.zeros((1, len(c)), dtype=np.float32)])
+
+
+class MatchupMatrix:
+    """Quantised all-pairs damage matrix with top-k queries.
+
+    Attributes:
+        damage: uint16 array (2, attackers, defenders); [0] min roll, [1] max roll.
+        defender_hp: HP of each defender at the matrix's level.
+        stats: Dict with build time and memory figures.
+    """
+
+    def __init__(self, damage, defender_hp, stats=None):
+        self.damage = damage
+        self.defender_hp = defender_hp
+        self.stats = stats or {}
+
+    @classmethod
+    def build(cls, df, path=None, level=DEFAULT_LEVEL, power=DEFAULT_POWER, block=DEFAULT_BLOCK):
+        """Compute the matrix tile by tile.
+
+        Args:
+            df: The dataset.
+            path: If given, the matrix is written to this .npy file through a
+                memory map instead of being held in RAM.
+            level: Level of every Pokémon.
+            power: Move power.
+            block: Tile edge length (attackers and defenders per tile).
+        """
+        start = time.perf_counter()
+        c = Combatants(df, level)
+        n = len(c)
+        shape = (2, n, n)
+        if path is not None:
+            tmp_path = path + '.tmp'
+            damage = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=MATRIX_DTYPE, shape=shape)
+        else:
+            damage = np.empty(shape, dtype=MATRIX_DTYPE)
+        limit = np.iinfo(MATRIX_DTYPE).max
+        effectiveness = defender_effectiveness(c)
+        # Square tiles keep every temporary of a tile inside the CPU cache
+        for first in range(0, n, block):
+            rows = slice(first, min(first + block, n))
+            for first_col in range(0, n, block):
+                cols = slice(first_col, min(first_col + block, n))
+                low, high = compute_block(c, rows, cols, power, effectiveness)
+                damage[0, rows, cols] = np.minimum(low, limit)
+                damage[1, rows, cols] = np.minimum(high, limit)
+        if path is not None:
+            damage.flush()
+            del damage
+            os.replace(tmp_path, path)
+            damage = np.load(path, mmap_mode='r')
+        stats = {
+            'pokemon': n,
+            'seconds': time.perf_counter() - start,
+            'matrix_bytes': int(np.prod(shape)) * np.dtype(MATRIX_DTYPE).itemsize,
+            'block_bytes': 2 * block * block * np.dtype(np.float32).itemsize,
+            'path': path,
+        }
+        return cls(damage, c.hp, stats)
+
+    @classmethod
+    def open(cls, df, cache_dir=DEFAULT_CACHE_DIR, level=DEFAULT_LEVEL, power=DEFAULT_POWER, block=DEFAULT_BLOCK):
+        """Memory-map a cached matrix for ``df``, building it if missing."""
+        c = Combatants(df, level)
+        path = os.path.join(cache_dir, f'{MATRIX_PREFIX}{c.fingerprint(level, power)}.npy')
+        if os.path.exists(path):
+            return cls(np.load(path, mmap_mode='r'), c.hp, {'pokemon': len(c), 'path': path})
+        os.makedirs(cache_dir, exist_ok=True)
+        matrix = cls.build(df, path, level, power, block)
+        # Drop matrices of other data
+        for entry in os.listdir(cache_dir):
+            if entry.startswith(MATRIX_PREFIX) and os.path.join(cache_dir, entry) != path:
+                try:
+                    os.remove(os.path.join(cache_dir, entry))
+                except OSError:
+                    pass
+        return matrix
+
+    def ko_fraction(self, roll=1):
+        """Damage as a fraction of defender HP; roll 0 = min, 1 = max."""
+        return self.damage[roll] / self.defender_hp[None, :]
+
+    def best_attackers(self, defender, k=10, roll=0):
+        """Rows dealing the most damage (relative to HP) to ``defender``.
+
+        Returns:
+            (rows, fractions) sorted best first.
+        """
+        column = np.asarray(self.damage[roll, :, defender], dtype=np.float64) / self.defender_hp[defender]
+        return _top_k(column, k)
+
+    def best_targets(self, attacker, k=10, roll=0):
+        """Defenders losing the largest share of their HP to ``attacker``."""
+        row = np.asarray(self.damage[roll, attacker], dtype=np.float64) / self.defender_hp
+        return _top_k(row, k)
+
+    def toughest_defenders(self, attacker, k=10, roll=1):
+        """Defenders that lose the smallest share of HP to ``attacker``."""
+        row = np.asarray(self.damage[roll, attacker], dtype=np.float64) / self.defender_hp
+        rows, values = _top_k(-row, k)
+        return rows, -values
+
+
+def _top_k(values, k):
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+    top = np.argpartition(-values, k - 1)[:k]
+    top = top[np.argsort(-values[top], kind='stable')]
+    return top, values[top]
+
+
+def get_matchup_matrix(store):
+    """Return the cached MatchupMatrix for the store's dataset at default settings."""
+    return store.derived('matchup_matrix', lambda df: MatchupMatrix.open(df))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and query the all-pairs matchup matrix.')
+    parser.add_argument('--level', type=int, default=DEFAULT_LEVEL)
+    parser.add_argument('--power', type=int, default=DEFAULT_POWER)
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help='build the matrix and report time and memory')
+    build_cmd.add_argument('--scale', type=int, default=1, help='synthetic dataset scale factor')
+    build_cmd.add_argument('--block', type=int, default=DEFAULT_BLOCK, help='tile edge length')
+    build_cmd.add_argument('--out', help='.npy path for the memory-mapped matrix (default: in memory)')
+    top_cmd = sub.add_parser('top', help='best attackers against a Pokémon')
+    top_cmd.add_argument('name', help='defender name')
+    top_cmd.add_argument('-k', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    from data_store import get_store
+    store = get_store()
+    if args.command == 'build':
+        from dataset import synthetic_dataset
+        df = synthetic_dataset(store.df, args.scale)
+        matrix = MatchupMatrix.build(df, args.out, args.level, args.power, args.block)
+        s = matrix.stats
+        print(f"{s['pokemon']} x {s['pokemon']} matchups in {s['seconds']:.3f} s "
+              f"({s['pokemon'] ** 2 / s['seconds'] / 1e6:.1f} M pairs/s)")
+        print(f"matrix {s['matrix_bytes'] / 2 ** 20:.1f} MiB ({MATRIX_DTYPE.__name__}), "
+              f"per-tile scratch {s['block_bytes'] / 2 ** 20:.2f} MiB"
+              + (f", written to {s['path']}" if s['path'] else ''))
+        return 0
+
+    row = store.name_index().get(args.name.lower())
+    if row is None:
+        print(f'Unknown Pokémon: {args.name}', file=sys.stderr)
+        return 2
+    matrix = MatchupMatrix.open(store.df, level=args.level, power=args.power)
+    rows, fractions = matrix.best_attackers(row, args.k)
+    names = store.df['name'].to_numpy()
+    print(f'Best attackers against {names[row]} (min roll, level {args.level}, power {args.power}):')
+    for r, f in zip(rows, fractions):
+        print(f'  {names[r]:<14} {f * 100:6.1f}% of HP')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
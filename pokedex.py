@@ -1,25 +1,48 @@
 import os
-import pandas as pd
+import numpy as np
 from PySide6.QtWidgets import (
     QWidget, QLabel, QPushButton, QLineEdit,
-    QVBoxLayout, QHBoxLayout, QGridLayout, QMessageBox, QSizePolicy, QFrame
+    QVBoxLayout, QHBoxLayout, QGridLayout, QMessageBox, QSizePolicy, QFrame,
+    QTableView, QHeaderView, QAbstractItemView
 )
-from PySide6.QtSvgWidgets import QSvgWidget
-from PySide6.QtGui import QPixmap, QPainter, QFont, QFontDatabase, QIcon
-from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont, QFontDatabase, QIcon
+from PySide6.QtCore import Qt, QTimer, QSize, QItemSelectionModel
+from data_store import get_store
+from search_index import IncrementalSearch, get_search_index
+from query_engine import QuerySyntaxError, get_query_engine
+from asset_cache import THUMBNAIL_SIZE, get_asset_cache
+from radar_chart import RadarChart
+from display_records import GRID_FIELDS, get_display_table
+from results_model import ROW_HEIGHT, ResultsModel
+from similarity_index import get_similarity_index
+from raster_cache import paint_background
+from instrumentation import span, timed
+
+# Delay between the last keystroke and the search-as-you-type update
+SEARCH_DEBOUNCE_MS = 150
+# Entries on each side of the current one whose images are loaded ahead
+PREFETCH_RADIUS = 3
+# Pokémon that can be pinned on the radar chart for comparison
+MAX_COMPARE = 3
+# Most similar Pokémon listed under the entry
+SIMILAR_COUNT = 4
+# Fixed, so that changing their names does not relayout the window
+SIMILAR_BUTTON_SIZE = (100, 30)
+# Results list: its width and the widths of its Name, No., Type, Total columns
+RESULTS_WIDTH = 330
+RESULTS_COLUMN_WIDTHS = (130, 45, 95, 45)
 
 class PokedexWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Pokédex (ver. 4.0)")
-        self.setFixedSize(1000, 600)
+        self.setFixedSize(1000 + RESULTS_WIDTH + 10, 600)
         base_dir = os.path.dirname(__file__)
 
-        # Load icon & background
+        # Load icon
         icon_path = os.path.join(base_dir, 'ptlogo.svg')
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(icon_path))
-        self.bg_pix = QPixmap(os.path.join(base_dir, 'background3.png'))
 
         # Load fonts
         seg_id = QFontDatabase.addApplicationFont(os.path.join(base_dir, 'font', 'segoeprb.ttf'))
@@ -35,7 +58,7 @@ class PokedexWindow(QWidget):
 
         # Search & Nav
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText('Search name/type1/type2/abilities...')
+        self.search_input.setPlaceholderText('Search name/type/ability, or e.g. type1:fire hp>=100 gen:1..3 sort:-speed')
         self.search_input.returnPressed.connect(self.run_search)
         self.search_input.setStyleSheet(
             'QLineEdit { border:1px solid black; padding:6px; background:white; border-radius:4px; font-size:14px; }'
@@ -43,7 +66,8 @@ class PokedexWindow(QWidget):
         self.btn_search = QPushButton('Search')
         self.btn_prev = QPushButton('Previous')
         self.btn_next = QPushButton('Next')
-        for btn in (self.btn_search, self.btn_prev, self.btn_next):
+        self.btn_compare = QPushButton('Compare')
+        for btn in (self.btn_search, self.btn_prev, self.btn_next, self.btn_compare):
             btn.setFont(QFont(seg_family, 10))
             btn.setStyleSheet(
                 'QPushButton { background:#FEE6A3; color:black; border:1px solid black; border-radius:8px; padding:6px 12px; }'
@@ -51,17 +75,51 @@ class PokedexWindow(QWidget):
                 'QPushButton:pressed { background:#FDD157; }'
             )
         self.btn_search.clicked.connect(self.run_search)
+        # Search as you type, once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.search_as_you_type)
+        self.search_input.textChanged.connect(lambda _text: self.search_timer.start())
         self.btn_prev.clicked.connect(self.show_previous)
         self.btn_next.clicked.connect(self.show_next)
+        self.btn_compare.setToolTip('Pin this Pokémon on the radar chart to compare it with others')
+        self.btn_compare.clicked.connect(self.toggle_compare)
+
+        # "Plays like" panel: nearest Pokémon by stats and resistances
+        self.similar_label = QLabel('Plays like:')
+        self.similar_label.setFont(QFont(seg_family, 10))
+        self.similar_label.setStyleSheet('color: white;')
+        self.similar_buttons = []
+        for i in range(SIMILAR_COUNT):
+            btn = QPushButton()
+            btn.setFont(QFont(seg_family, 9))
+            btn.setStyleSheet(
+                'QPushButton { background:white; color:black; border:1px solid black; border-radius:8px; padding:4px 8px; }'
+                'QPushButton:hover { background:#FEE6A3; }'
+            )
+            btn.setFixedSize(*SIMILAR_BUTTON_SIZE)
+            btn.clicked.connect(lambda _checked=False, i=i: self.show_similar(i))
+            self.similar_buttons.append(btn)
+        self.similar_rows = []
 
         # Load data
-        df_path = os.path.join(base_dir, 'pokemon.xlsx')
-        self.df = pd.read_excel(df_path, engine='openpyxl')
-        for col in ['name', 'type1', 'type2', 'abilities', 'japanese_name']:
-            if col in self.df.columns:
-                self.df[col] = self.df[col].fillna('').astype(str)
-        self.filtered = self.df
+        # Shared across windows; reopening the Pokédex does not reload it
+        self.store = get_store()
+        self.store.add_listener(self.on_dataset_reloaded)
+        self.df = self.store.df
+        self.query_engine = get_query_engine(self.store)
+        self.search_session = IncrementalSearch(get_search_index(self.store))
+        # Pre-formatted label text per row; navigation reads only this
+        self.records = get_display_table(self.store)
+        self.similarity = get_similarity_index(self.store)
+        # Row positions of the current search result
+        self.rows = np.arange(len(self.records))
         self.current_index = 0
+        # Scaled images, shared across windows
+        self.assets = get_asset_cache()
+        # (name, stats) series pinned on the radar chart
+        self.compared = []
 
         # Grid layout (12 rows x 5 cols)
         grid = QGridLayout()
@@ -97,6 +155,15 @@ class PokedexWindow(QWidget):
         grid.addWidget(lbl, 3, 0)
         self.type_box = QHBoxLayout()
         self.type_box.setAlignment(Qt.AlignLeft)
+        # Two icon labels, reused for every entry
+        self.type_labels = []
+        for _ in range(2):
+            type_lbl = QLabel()
+            type_lbl.setStyleSheet('border: none; background: transparent;')
+            type_lbl.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+            type_lbl.hide()
+            self.type_box.addWidget(type_lbl)
+            self.type_labels.append(type_lbl)
         type_widget = QWidget()
         type_widget.setLayout(self.type_box)
         grid.addWidget(type_widget, 3, 1, 1, 3)
@@ -162,6 +229,8 @@ class PokedexWindow(QWidget):
             grid.addWidget(r_val, row_idx, 3)
             setattr(self, f'{r_field}_lbl', r_val)
 
+        self.grid_labels = [getattr(self, f'{field}_lbl') for field in GRID_FIELDS]
+
         # 7) Legendary footer (row 11)
         self.lbl_legend = QLabel()
         self.lbl_legend.setFont(normal_font)
@@ -173,8 +242,8 @@ class PokedexWindow(QWidget):
         grid.addWidget(self.img_label, 0, 4, 6, 1)
 
         # 9) Radar chart (rows 6-11)
-        self.radar = QSvgWidget()
-        self.radar.setFixedSize(300, 300)
+        self.radar = RadarChart()
+        self.radar.setFixedSize(225, 195)
         radar_frame = QFrame()
         radar_frame.setFrameShape(QFrame.NoFrame)
         radar_frame.setStyleSheet('background: white;')
@@ -183,6 +252,35 @@ class PokedexWindow(QWidget):
         radar_layout.addWidget(self.radar)
         grid.addWidget(radar_frame, 6, 4, 6, 1)
 
+        # 10) Results list beside the entry; only its visible rows are read
+        self.results_model = ResultsModel(self.records, self.query_engine.columns, self.assets, self)
+        self.results_model.rows_sorted.connect(self.on_results_sorted)
+        self.results_view = QTableView()
+        self.results_view.setModel(self.results_model)
+        self.results_view.setFixedWidth(RESULTS_WIDTH)
+        self.results_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.results_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.results_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.results_view.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.results_view.setWordWrap(False)
+        self.results_view.setCornerButtonEnabled(False)
+        # Fixed sizes, so Qt never measures rows that are not on screen
+        rows_header = self.results_view.verticalHeader()
+        rows_header.hide()
+        rows_header.setSectionResizeMode(QHeaderView.Fixed)
+        rows_header.setDefaultSectionSize(ROW_HEIGHT)
+        columns_header = self.results_view.horizontalHeader()
+        columns_header.setSectionResizeMode(QHeaderView.Fixed)
+        for column, width in enumerate(RESULTS_COLUMN_WIDTHS):
+            columns_header.resizeSection(column, width)
+        columns_header.setSortIndicatorShown(True)
+        columns_header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.results_view.setSortingEnabled(True)
+        self.results_view.setStyleSheet('QTableView { background:white; border:1px solid black; }')
+        self.results_view.selectionModel().currentRowChanged.connect(self.on_result_selected)
+        self._syncing_results = False
+
         # Wrap with main frame and apply borders
         container = QFrame()
         container.setLayout(grid)
@@ -196,6 +294,12 @@ class PokedexWindow(QWidget):
         nav_layout = QHBoxLayout()
         nav_layout.addWidget(self.btn_prev)
         nav_layout.addStretch()
+        nav_layout.addWidget(self.btn_compare)
+        nav_layout.addSpacing(24)
+        nav_layout.addWidget(self.similar_label)
+        for btn in self.similar_buttons:
+            nav_layout.addWidget(btn)
+        nav_layout.addStretch()
         nav_layout.addWidget(self.btn_next)
 
         main_layout = QVBoxLayout(self)
@@ -204,37 +308,104 @@ class PokedexWindow(QWidget):
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(self.btn_search)
         main_layout.addLayout(search_layout)
-        main_layout.addWidget(container)
+        body_layout = QHBoxLayout()
+        body_layout.addWidget(self.results_view)
+        body_layout.addWidget(container)
+        main_layout.addLayout(body_layout)
         main_layout.addLayout(nav_layout)
         main_layout.setContentsMargins(20, 20, 20, 20)
 
         # Init display
         self.run_search()
-        self.show_entry()
 
+    @timed('paint.pokedex')
     def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.bg_pix)
+        paint_background(self, 'background3.png')
+
+    def on_dataset_reloaded(self, store):
+        self.df = store.df
+        self.query_engine = get_query_engine(store)
+        self.search_session = IncrementalSearch(get_search_index(store))
+        self.records = get_display_table(store)
+        self.similarity = get_similarity_index(store)
+        self.results_model.set_dataset(self.records, self.query_engine.columns)
+        self.run_search()
 
     def run_search(self):
-        keyword = self.search_input.text().lower().strip()
-        mask = self.df['name'].str.lower().str.contains(keyword) if keyword else pd.Series(True, index=self.df.index)
-        for col in ('type1', 'type2', 'abilities'):
-            if keyword:
-                mask |= self.df[col].str.lower().str.contains(keyword)
-        self.filtered = self.df[mask] if not self.df[mask].empty else self.df
+        try:
+            self.apply_query()
+        except QuerySyntaxError as e:
+            QMessageBox.warning(self, "Search Error", f"Could not understand the search: {e}")
+
+    def search_as_you_type(self):
+        # Half-typed field queries are expected; keep the last good result
+        try:
+            self.apply_query()
+        except QuerySyntaxError:
+            pass
+
+    @timed('pokedex.search')
+    def apply_query(self):
+        self.search_timer.stop()
+        # Free text is ranked best match first (exact, prefix, substring, typo),
+        # field predicates filter it and sort: overrides the order
+        self.rows = self.query_engine.run(self.search_input.text(), search=self.search_session)
         self.current_index = 0
+        self.show_results()
+        self.show_entry()
+
+    def show_results(self):
+        # A new result is listed in query order until a header is clicked
+        self.results_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.results_model.set_rows(self.rows)
+
+    def on_results_sorted(self):
+        row = self.rows[self.current_index] if len(self.rows) else None
+        self.rows = self.results_model.rows
+        if row is not None:
+            self.current_index = int(np.flatnonzero(self.rows == row)[0])
+            self.show_entry()
+
+    def on_result_selected(self, current, _previous):
+        if self._syncing_results or not current.isValid() or current.row() == self.current_index:
+            return
+        self.current_index = current.row()
+        self.show_entry()
 
+    def select_result(self):
+        # Follow Previous/Next and similar jumps in the list, without the
+        # selection change calling show_entry again
+        index = self.results_model.index(self.current_index, 0)
+        self._syncing_results = True
+        try:
+            self.results_view.selectionModel().setCurrentIndex(
+                index, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+        finally:
+            self._syncing_results = False
+        self.results_view.scrollTo(index)
+
+    def show_empty(self):
+        self.lbl_name.setText('No Pokémon found')
+        for lbl in [self.lbl_jp, self.lbl_abilities, self.lbl_legend] + self.grid_labels:
+            lbl.clear()
+        for lbl in self.type_labels:
+            lbl.hide()
+        self.img_label.setPixmap(self.assets.image(''))
+        self.radar.set_series(self.compared)
+        self.show_similar_panel(None)
+        self.btn_compare.setEnabled(False)
+        self.btn_prev.setEnabled(False)
+        self.btn_next.setEnabled(False)
+
+    @timed('pokedex.show_entry')
     def show_entry(self):
-        if self.filtered.empty:
+        if not len(self.rows):
+            self.show_empty()
             return
-        row = self.filtered.iloc[self.current_index]
-        base_dir = os.path.dirname(__file__)
+        record = self.records[self.rows[self.current_index]]
 
-        # Name & #
-        self.lbl_name.setText(row['name'] + f" (#{row.get('pokedex_number','')})")
-        # Japanese
-        self.lbl_jp.setText(row.get('japanese_name',''))
+        # Name, Japanese name, abilities, stats and extras, legendary footer
+        self.show_labels(record)
 
         '''
         # Types as strip icons
@@ -254,61 +425,99 @@ class PokedexWindow(QWidget):
                 self.type_box.addWidget(lbl)
         '''
 
-        # Types as strip icons
-        # clear
-        for i in reversed(range(self.type_box.count())):
-            widget = self.type_box.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        # add
-        for t in ['type1', 'type2']:
-            typ = row.get(t, '')
-            if typ:
-                icon_path = os.path.join(base_dir, 'icons', f'{typ}.svg')
-                lbl = QLabel()
-                lbl.setStyleSheet('border: none; background: transparent;')
-                pix = QPixmap(icon_path).scaledToHeight(24, Qt.SmoothTransformation)
-                lbl.setPixmap(pix)
-                lbl.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                self.type_box.addWidget(lbl)
+        # Types as strip icons, from the shared icon pool
+        with span('pokedex.icons'):
+            for lbl, typ in zip(self.type_labels, record.types + ('', '')):
+                if typ:
+                    lbl.setPixmap(self.assets.icon(typ))
+                lbl.setVisible(bool(typ))
 
+        # Image, from the cache when already loaded
+        with span('pokedex.image'):
+            self.img_label.setPixmap(self.assets.image(record.name, record.image_content))
+        with span('pokedex.prefetch'):
+            self.prefetch_neighbours()
 
-        # Abilities
-        abil_text = row['abilities'].strip("[]'").replace("', ", ", ")
-        self.lbl_abilities.setText(abil_text)
+        # Radar, drawn from the stats and overlaid on any pinned Pokémon
+        with span('pokedex.radar'):
+            self.show_radar(record.radar)
+        with span('pokedex.similar'):
+            self.show_similar_panel(self.rows[self.current_index])
 
-        # Stats
-        for stat in ['hp','defense','sp_attack','attack','speed','sp_defense']:
-            getattr(self, f'{stat}_lbl').setText(str(row.get(stat,'')))
+        with span('pokedex.results'):
+            self.select_result()
 
-        # Extras
-        for field in ['base_egg_steps','base_happiness','capture_rate','generation','height_m','weight_kg']:
-            val = row.get(field)
-            text = str(val) if val not in (None, '') else 'N/A'
-            getattr(self, f'{field}_lbl').setText(text)
+        # Nav enable/disable
+        self.btn_prev.setEnabled(self.current_index > 0)
+        self.btn_next.setEnabled(self.current_index < len(self.rows) - 1)
 
+    @timed('pokedex.labels')
+    def show_labels(self, record):
+        # Name & #
+        self.lbl_name.setText(record.title)
+        # Japanese
+        self.lbl_jp.setText(record.japanese_name)
+        # Abilities
+        self.lbl_abilities.setText(record.abilities)
+        # Stats and extras
+        for lbl, text in zip(self.grid_labels, record.grid):
+            lbl.setText(text)
         # Legendary footer
-        leg = 'is legendary.' if row.get('is_legendary') == 1 else 'is not legendary.'
-        self.lbl_legend.setText(f'This Pokémon {leg}')
-
-        # Image
-        name_lower = row['name'].lower().replace(' ', '_')
-        img_path = os.path.join(base_dir, 'pokemon_image', name_lower, str(row.get('image_content','')))
-        if not os.path.exists(img_path):
-            img_path = os.path.join(base_dir, 'nodata.svg')
-        pix = QPixmap(img_path).scaled(195, 195, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.img_label.setPixmap(pix)
-
-        # Radar
-        radar_path = os.path.join(base_dir, 'pokemon_radar_chart_trans', f'radar_{name_lower}.svg')
-        if not os.path.exists(radar_path):
-            radar_path = os.path.join(base_dir, 'nodata.svg')
-        self.radar.setFixedSize(225, 195)
-        self.radar.load(radar_path)
+        self.lbl_legend.setText(record.legend)
+
+    def prefetch_neighbours(self):
+        # Next entries first, since Next is the usual direction
+        order = []
+        for step in range(1, PREFETCH_RADIUS + 1):
+            order += [self.current_index + step, self.current_index - step]
+        records = [self.records[self.rows[i]] for i in order if 0 <= i < len(self.rows)]
+        self.assets.prefetch((r.name, r.image_content) for r in records)
+
+    def show_radar(self, current):
+        pinned = any(s[0] == current[0] for s in self.compared)
+        series = self.compared if pinned else self.compared + [current]
+        self.radar.set_series(series, current[0] if len(series) == 1 else None)
+        self.btn_compare.setText('Unpin' if pinned else 'Compare')
+        self.btn_compare.setEnabled(pinned or len(self.compared) < MAX_COMPARE)
+
+    def show_similar_panel(self, row):
+        if row is None:
+            self.similar_rows = []
+        else:
+            self.similar_rows, distances = self.similarity.similar(row, SIMILAR_COUNT)
+        self.similar_label.setVisible(len(self.similar_rows) > 0)
+        for i, btn in enumerate(self.similar_buttons):
+            if i < len(self.similar_rows):
+                record = self.records[self.similar_rows[i]]
+                btn.setText(record.name)
+                btn.setToolTip(f'{record.title}  (distance {distances[i]:.2f})')
+            btn.setVisible(i < len(self.similar_rows))
+
+    def show_similar(self, i):
+        if i >= len(self.similar_rows):
+            return
+        row = self.similar_rows[i]
+        positions = np.flatnonzero(self.rows == row)
+        if not len(positions):
+            # Not in the current result: go back to the full list
+            self.search_input.blockSignals(True)
+            self.search_input.clear()
+            self.search_input.blockSignals(False)
+            self.rows = self.query_engine.run('', search=self.search_session)
+            self.show_results()
+            positions = np.flatnonzero(self.rows == row)
+        self.current_index = int(positions[0])
+        self.show_entry()
 
-        # Nav enable/disable
-        self.btn_prev.setEnabled(self.current_index > 0)
-        self.btn_next.setEnabled(self.current_index < len(self.filtered) - 1)
+    def toggle_compare(self):
+        if not len(self.rows):
+            return
+        current = self.records[self.rows[self.current_index]].radar
+        if any(s[0] == current[0] for s in self.compared):
+            self.compared = [s for s in self.compared if s[0] != current[0]]
+        elif len(self.compared) < MAX_COMPARE:
+            self.compared.append(current)
+        self.show_radar(current)
 
     def show_previous(self):
         if self.current_index > 0:
@@ -316,6 +525,6 @@ class PokedexWindow(QWidget):
             self.show_entry()
 
     def show_next(self):
-        if self.current_index < len(self.filtered) - 1:
+        if self.current_index < len(self.rows) - 1:
             self.current_index += 1
             self.show_entry()
@@ -0,0 +1,412 @@
+import re
+import sys
+import argparse
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from search_index import split_abilities, get_search_index
+from defense_index import GROUPS as DEFENSE_FIELDS, DefenseIndex, get_defense_index
+from damage import type_index
+from instrumentation import timed
+
+# Structured field queries for the Pokédex
+# A query such as
+#     type1:fire hp>=100 gen:1..3 legendary:no ability:"flash fire" sort:-speed
+# is parsed once into a Plan (cached by query text), and each predicate of the
+# plan evaluates to a NumPy boolean mask over pre-extracted column arrays.
+# Defensive conditions (resists:fire,water weak:ground -immune:electric; a
+# comma means any of the types) are answered from the DefenseIndex bitsets,
+# ANDed as words and unpacked into a mask once. Words without a field go to
+# the free-text SearchIndex, and so does a ``field:`` with nothing after it,
+# so that names such as "Type: Null" can still be searched for.
+
+# Friendly names -> dataset columns
+FIELD_ALIASES = {
+    'gen': 'generation',
+    'legendary': 'is_legendary',
+    'ability': 'abilities',
+    'atk': 'attack',
+    'def': 'defense',
+    'spa': 'sp_attack',
+    'spatk': 'sp_attack',
+    'spd': 'sp_defense',
+    'spdef': 'sp_defense',
+    'spe': 'speed',
+    'bst': 'base_total',
+    'total': 'base_total',
+    'capture': 'capture_rate',
+    'weight': 'weight_kg',
+    'height': 'height_m',
+    'no': 'pokedex_number',
+    'number': 'pokedex_number',
+    'jp': 'japanese_name',
+    'class': 'classfication',
+    'classification': 'classfication',
+    'resist': 'resists',
+    'immunity': 'immune',
+}
+
+# Text fields compared for equality; the rest of the text fields match substrings
+EQUALITY_TEXT_FIELDS = ('type1', 'type2')
+SUBSTRING_TEXT_FIELDS = ('name', 'japanese_name', 'classfication')
+BOOLEAN_FIELDS = ('is_legendary',)
+NUMERIC_FIELDS = (
+    'attack', 'base_egg_steps', 'base_happiness', 'base_total', 'capture_rate', 'defense',
+    'experience_growth', 'height_m', 'hp', 'percentage_male', 'percentage_female',
+    'percentage_nosex', 'pokedex_number', 'sp_attack', 'sp_defense', 'speed', 'weight_kg',
+    'generation', 'against_bug', 'against_dark', 'against_dragon', 'against_electric',
+    'against_fairy', 'against_fight', 'against_fire', 'against_flying', 'against_ghost',
+    'against_grass', 'against_ground', 'against_ice', 'against_normal', 'against_poison',
+    'against_psychic', 'against_rock', 'against_steel', 'against_water',
+)
+
+TRUE_WORDS = ('yes', 'y', 'true', '1')
+FALSE_WORDS = ('no', 'n', 'false', '0')
+
+_TOKEN = re.compile(r'''(-?)([A-Za-z_][A-Za-z0-9_]*)(>=|<=|!=|:|>|<|=)("[^"]*"|\S*)|"([^"]*)"|(\S+)''')
+_LEADING_NUMBER = re.compile(r'^\s*(-?\d+(?:\.\d+)?)')
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for queries that cannot be parsed or refer to unknown fields."""
+
+
+def _resolve_field(name):
+    name = name.lower()
+    return FIELD_ALIASES.get(name, name)
+
+
+def _number(text, field):
+    try:
+        return float(text)
+    except ValueError:
+        raise QuerySyntaxError(f'{field} expects a number, got {text!r}') from None
+
+
+class Predicate:
+    """One ``field op value`` condition of a plan.
+
+    Attributes:
+        field: Dataset column (or 'type' for type1 or type2).
+        op: One of '=', '!=', '<', '<=', '>', '>=', 'range', 'contains', 'any'.
+        value: Number, (low, high) tuple, lower-cased string or, for 'any',
+            a tuple of attack type indices.
+        negate: Invert the mask.
+    """
+
+    __slots__ = ('field', 'op', 'value', 'negate')
+
+    def __init__(self, field, op, value, negate=False):
+        self.field = field
+        self.op = op
+        self.value = value
+        self.negate = negate
+
+    def mask(self, columns):
+        mask = columns.mask(self.field, self.op, self.value)
+        return ~mask if self.negate else mask
+
+    def __repr__(self):
+        return f"Predicate({'-' if self.negate else ''}{self.field} {self.op} {self.value!r})"
+
+
+class Plan:
+    """A parsed query: predicates to AND together, free text and sort keys.
+
+    Attributes:
+        predicates: Tuple of Predicate.
+        text: Free-text part of the query ('' if none).
+        sort: Tuple of (column, descending) pairs, most significant first.
+    """
+
+    __slots__ = ('predicates', 'text', 'sort')
+
+    def __init__(self, predicates, text, sort):
+        self.predicates = predicates
+        self.text = text
+        self.sort = sort
+
+
+@lru_cache(maxsize=256)
+def compile_query(query):
+    """Parse ``query`` into a Plan. Results are cached by query text.
+
+    Raises:
+        QuerySyntaxError: If a predicate is malformed.
+    """
+    predicates = []
+    words = []
+    sort = []
+    for match in _TOKEN.finditer(query):
+        negate, field, op, value, phrase, word = match.groups()
+        if field is None:
+            words.append(phrase if phrase is not None else word)
+            continue
+        if not value:
+            # 'Type: Null' is a name, not a type query
+            words.append(match.group(0))
+            continue
+        value = value[1:-1] if value.startswith('"') and value.endswith('"') and len(value) >= 2 else value
+        field = _resolve_field(field)
+        if not value:
+            raise QuerySyntaxError(f'missing value for {field}')
+        if field == 'sort':
+            if op != ':':
+                raise QuerySyntaxError('use sort:<field> or sort:-<field>')
+            for key in value.split(','):
+                descending = key.startswith('-')
+                sort.append((_resolve_field(key.lstrip('-+')), descending))
+            continue
+        predicates.append(_predicate(field, op, value, bool(negate)))
+    return Plan(tuple(predicates), ' '.join(words), tuple(sort))
+
+
+def _predicate(field, op, value, negate):
+    text = value.lower()
+    if field in BOOLEAN_FIELDS:
+        if op not in (':', '=', '!='):
+            raise QuerySyntaxError(f'{field} only supports yes/no')
+        if text in TRUE_WORDS:
+            flag = 1.0
+        elif text in FALSE_WORDS:
+            flag = 0.0
+        else:
+            raise QuerySyntaxError(f'{field} expects yes or no, got {value!r}')
+        return Predicate(field, '!=' if op == '!=' else '=', flag, negate)
+    if field in DEFENSE_FIELDS:
+        if op not in (':', '=', '!='):
+            raise QuerySyntaxError(f'{field} expects types, e.g. {field}:fire,water')
+        try:
+            types = tuple(type_index(t) for t in text.split(',') if t)
+        except ValueError as e:
+            raise QuerySyntaxError(f'{field}: {e}') from None
+        return Predicate(field, 'any', types, negate != (op == '!='))
+    if field in ('type', 'abilities') + EQUALITY_TEXT_FIELDS + SUBSTRING_TEXT_FIELDS:
+        if op not in (':', '=', '!='):
+            raise QuerySyntaxError(f'{field} only supports : and !=')
+        if field in SUBSTRING_TEXT_FIELDS and op == ':':
+            return Predicate(field, 'contains', text, negate)
+        return Predicate(field, '!=' if op == '!=' else '=', text, negate)
+    if field not in NUMERIC_FIELDS:
+        raise QuerySyntaxError(f'unknown field {field!r}')
+    if op == ':' and '..' in value:
+        low, _, high = value.partition('..')
+        low = _number(low, field) if low else -np.inf
+        high = _number(high, field) if high else np.inf
+        return Predicate(field, 'range', (low, high), negate)
+    return Predicate(field, '=' if op == ':' else op, _number(value, field), negate)
+
+
+def _clean_numeric(series):
+    # Numbers stay numbers; text cells such as '30 (Meteorite)255 (Core)'
+    # contribute their leading number, anything else becomes NaN
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().any():
+        lead = series.astype(str).str.extract(_LEADING_NUMBER, expand=False)
+        values = values.fillna(pd.to_numeric(lead, errors='coerce'))
+    return values.to_numpy(dtype=np.float64)
+
+
+class QueryColumns:
+    """Column arrays of one dataset version, prepared for mask evaluation.
+
+    Args:
+        df: The dataset.
+        defense: DefenseIndex of the same dataset; built if not given.
+    """
+
+    def __init__(self, df, defense=None):
+        self.row_count = len(df)
+        self.defense = defense if defense is not None else DefenseIndex(df)
+        self.numeric = {}
+        self.codes = {}
+        self.code_of = {}
+        self.text = {}
+        self.text_rank = {}
+        for col in df.columns:
+            series = df[col]
+            if col in EQUALITY_TEXT_FIELDS:
+                # Sorted, so codes are in alphabetical order and sort like the text
+                codes, uniques = pd.factorize(series.fillna('').astype(str).str.lower(), sort=True)
+                self.codes[col] = codes
+                self.code_of[col] = {u: i for i, u in enumerate(uniques)}
+            elif col in SUBSTRING_TEXT_FIELDS:
+                self.text[col] = series.fillna('').astype(str).str.lower().to_numpy(dtype=str)
+                # Alphabetical rank, so text sorts are integer sorts
+                self.text_rank[col] = np.argsort(np.argsort(self.text[col], kind='stable'), kind='stable')
+            elif col != 'abilities':
+                values = _clean_numeric(series)
+                # Keep columns that are numbers apart from a few odd cells
+                if np.isfinite(values).sum() * 2 >= self.row_count:
+                    self.numeric[col] = values
+        self.ability_rows = {}
+        if 'abilities' in df.columns:
+            rows = {}
+            for row, value in enumerate(df['abilities'].fillna('').astype(str)):
+                for ability in split_abilities(value):
+                    rows.setdefault(ability.lower(), []).append(row)
+            self.ability_rows = {a: np.array(r, dtype=np.intp) for a, r in rows.items()}
+
+    def _equals_code(self, field, text):
+        code = self.code_of[field].get(text)
+        if code is None:
+            return np.zeros(self.row_count, dtype=bool)
+        return self.codes[field] == code
+
+    def mask(self, field, op, value):
+        if field in DEFENSE_FIELDS:
+            return self.defense.mask(self.defense.any_of(field, value))
+        if field == 'type':
+            mask = self._equals_code('type1', value) | self._equals_code('type2', value)
+            return ~mask if op == '!=' else mask
+        if field in self.codes:
+            mask = self._equals_code(field, value)
+            return ~mask if op == '!=' else mask
+        if field == 'abilities':
+            mask = np.zeros(self.row_count, dtype=bool)
+            mask[self.ability_rows.get(value, np.empty(0, dtype=np.intp))] = True
+            return ~mask if op == '!=' else mask
+        if field in self.text:
+            column = self.text[field]
+            if op == 'contains':
+                return np.char.find(column, value) >= 0
+            mask = column == value
+            return ~mask if op == '!=' else mask
+        column = self.numeric.get(field)
+        if column is None:
+            raise QuerySyntaxError(f'unknown field {field!r}')
+        if op == 'range':
+            return (column >= value[0]) & (column <= value[1])
+        if op == '=':
+            return column == value
+        if op == '!=':
+            return column != value
+        if op == '<':
+            return column < value
+        if op == '<=':
+            return column <= value
+        if op == '>':
+            return column > value
+        return column >= value
+
+    def sort_key(self, field):
+        if field in self.numeric:
+            return self.numeric[field]
+        if field in self.codes:
+            return self.codes[field]
+        if field in self.text_rank:
+            return self.text_rank[field]
+        raise QuerySyntaxError(f'cannot sort by {field!r}')
+
+
+class QueryEngine:
+    """Runs structured queries against one dataset version.
+
+    Args:
+        df: The dataset.
+        index: SearchIndex used for the free-text part of queries.
+        defense: DefenseIndex for defensive conditions; built if not given.
+    """
+
+    def __init__(self, df, index, defense=None):
+        self.columns = QueryColumns(df, defense)
+        self.index = index
+
+    @timed('search.query')
+    def run(self, query, search=None):
+        """Return the row positions matching ``query``, in result order.
+
+        Args:
+            query: Query text; see the module comment for the syntax.
+            search: Object with a ``search(text)`` method used for free text,
+                e.g. a per-window IncrementalSearch. Defaults to the index.
+
+        Raises:
+            QuerySyntaxError: If the query is malformed.
+        """
+        plan = compile_query(query.strip())
+        columns = self.columns
+        mask = None
+        words = None
+        for predicate in plan.predicates:
+            if predicate.op == 'any':
+                part = columns.defense.any_of(predicate.field, predicate.value)
+                if predicate.negate:
+                    part = columns.defense.invert(part)
+                words = part if words is None else words & part
+                continue
+            part = predicate.mask(columns)
+            mask = part if mask is None else mask & part
+        if words is not None:
+            part = columns.defense.mask(words)
+            mask = part if mask is None else mask & part
+
+        if plan.text:
+            # Keep the search ranking unless an explicit sort overrides it
+            rows = (search or self.index).search(plan.text).rows
+            if mask is not None:
+                rows = rows[mask[rows]]
+        elif mask is not None:
+            rows = np.flatnonzero(mask)
+        else:
+            rows = np.arange(columns.row_count)
+
+        if plan.sort:
+            keys = []
+            for field, descending in reversed(plan.sort):
+                key = columns.sort_key(field)[rows]
+                if descending:
+                    key = -key
+                keys.append(key)
+            rows = rows[np.lexsort(keys)]
+        return rows
+
+
+def get_query_engine(store):
+    """Return the QueryEngine for the store's current dataset version."""
+    return store.derived('query_engine',
+                         lambda df: QueryEngine(df, get_search_index(store), get_defense_index(store)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a Pokédex query without the GUI.')
+    parser.add_argument('query', nargs='?', default='',
+                        help='e.g. \'type1:fire hp>=100 gen:1..3 legendary:no sort:-speed\'')
+    parser.add_argument('--columns', default='pokedex_number,name,type1,type2,hp,attack,defense,speed',
+                        help='comma-separated columns to print')
+    parser.add_argument('--limit', type=int, default=50, help='maximum rows to print (0 for all)')
+    parser.add_argument('--check-names', action='store_true',
+                        help='search for every name in the dataset and list those that do not find themselves')
+    args = parser.parse_args(argv)
+
+    from data_store import get_store
+    store = get_store()
+    if args.check_names:
+        # Names may look like queries ('Type: Null'); each must still find its own row
+        engine = get_query_engine(store)
+        failed = []
+        for row, name in enumerate(store.df['name']):
+            try:
+                found = row in engine.run(name)
+            except QuerySyntaxError as e:
+                found = False
+                name = f'{name} ({e})'
+            if not found:
+                failed.append(name)
+                print(f'not found: {name}')
+        print(f"{len(store.df) - len(failed)} of {len(store.df)} names find their own entry")
+        return 1 if failed else 0
+    try:
+        rows = get_query_engine(store).run(args.query)
+    except QuerySyntaxError as e:
+        print(f'Query error: {e}', file=sys.stderr)
+        return 2
+    shown = rows[:args.limit] if args.limit else rows
+    columns = [c for c in args.columns.split(',') if c in store.df.columns]
+    print(store.df.iloc[shown][columns].to_string(index=False))
+    print(f'{len(rows)} matching Pokémon')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import math
+from collections import OrderedDict
+from PySide6.QtWidgets import QWidget
+from PySide6.QtGui import QPixmap, QPainter, QColor, QPen, QFont, QFontMetricsF, QPolygonF
+from PySide6.QtCore import Qt, QPointF, QRectF
+from instrumentation import timed
+
+# Base-stat radar charts
+# Drawn with QPainter straight from the base stats, so every Pokémon has a
+# chart without any pre-rendered SVG. The layout follows the old matplotlib
+# charts: hp on the right, then counter-clockwise attack, defense, sp_attack,
+# sp_defense and speed. Rendered pixmaps are cached per series, size and
+# device pixel ratio.
+
+STATS = ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed')
+# matplotlib's default colour cycle, which the old charts used
+COLORS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b')
+GRID_COLOR = '#b0b0b0'
+FILL_ALPHA = 64
+MAX_CACHED = 256          # pixmaps
+# Candidate distances between grid rings, smallest first
+RING_STEPS = (20, 25, 50, 100)
+MAX_RINGS = 5
+
+
+def chart_scale(series):
+    """Ring step and outer value for a set of series.
+
+    Overlaid charts share one scale so their shapes compare directly.
+    """
+    top = max((max(values) for _, values in series), default=0) or 1
+    for step in RING_STEPS:
+        if top <= step * MAX_RINGS:
+            break
+    else:
+        step = math.ceil(top / MAX_RINGS / RING_STEPS[-1]) * RING_STEPS[-1]
+    return step, math.ceil(top / step) * step
+
+
+def _point(center, radius, i):
+    angle = 2 * math.pi * i / len(STATS)
+    return QPointF(center.x() + radius * math.cos(angle), center.y() - radius * math.sin(angle))
+
+
+def paint_radar(painter, rect, series, title=None):
+    """Draw a radar chart of ``series`` into ``rect``.
+
+    Args:
+        painter: Active QPainter.
+        rect: QRectF to fill.
+        series: List of (label, values) pairs, values ordered as ``STATS``.
+        title: Text above the chart. With several series a legend is drawn
+            instead.
+    """
+    painter.save()
+    painter.setRenderHint(QPainter.Antialiasing)
+    font = QFont(painter.font())
+    font.setPixelSize(max(7, round(min(rect.width(), rect.height()) / 22)))
+    painter.setFont(font)
+    metrics = QFontMetricsF(font)
+    line = metrics.height()
+
+    top = rect.top()
+    if len(series) > 1:
+        top += line * math.ceil(len(series) / 2)
+    elif title:
+        painter.setPen(QColor('black'))
+        painter.drawText(QRectF(rect.left(), top, rect.width(), line), Qt.AlignCenter, title)
+        top += line
+    label_width = max(metrics.horizontalAdvance(stat) for stat in STATS)
+    radius = max(1.0, min((rect.width() - 2 * label_width) / 2 - 4,
+                          (rect.bottom() - top - 2 * line) / 2 - 2))
+    center = QPointF(rect.center().x(), (top + rect.bottom()) / 2)
+    step, outer = chart_scale(series)
+
+    # Grid: rings, spokes and axis labels
+    grid_pen = QPen(QColor(GRID_COLOR), 0.8)
+    painter.setPen(grid_pen)
+    painter.setBrush(Qt.NoBrush)
+    for value in range(step, outer, step):
+        r = radius * value / outer
+        painter.drawEllipse(center, r, r)
+    for i in range(len(STATS)):
+        painter.drawLine(center, _point(center, radius, i))
+    painter.setPen(QPen(QColor('black'), 1))
+    painter.drawEllipse(center, radius, radius)
+    for i, stat in enumerate(STATS):
+        pos = _point(center, radius + 4, i)
+        dx, dy = pos.x() - center.x(), pos.y() - center.y()
+        align = (Qt.AlignLeft if dx > 1 else Qt.AlignRight if dx < -1 else Qt.AlignHCenter)
+        align |= (Qt.AlignTop if dy > 1 else Qt.AlignBottom if dy < -1 else Qt.AlignVCenter)
+        x = pos.x() if dx > 1 else pos.x() - label_width if dx < -1 else pos.x() - label_width / 2
+        y = pos.y() if dy > 1 else pos.y() - line if dy < -1 else pos.y() - line / 2
+        painter.drawText(QRectF(x, y, label_width, line), align, stat)
+
+    # Series, each a filled polygon with markers on the vertices
+    for n, (label, values) in enumerate(series):
+        color = QColor(COLORS[n % len(COLORS)])
+        points = [_point(center, radius * min(v, outer) / outer, i) for i, v in enumerate(values)]
+        fill = QColor(color)
+        fill.setAlpha(FILL_ALPHA)
+        painter.setPen(QPen(color, 1.5))
+        painter.setBrush(fill)
+        painter.drawPolygon(QPolygonF(points))
+        painter.setBrush(color)
+        for point in points:
+            painter.drawEllipse(point, 2.5, 2.5)
+
+    # Ring values go on top of the series so they stay readable
+    painter.setPen(QColor('black'))
+    for value in range(step, outer, step):
+        pos = _point(center, radius * value / outer, 0.5)
+        painter.drawText(QRectF(pos.x(), pos.y() - line, label_width, line), Qt.AlignLeft | Qt.AlignBottom, str(value))
+
+    if len(series) > 1:
+        half = rect.width() / 2
+        for n, (label, _) in enumerate(series):
+            x = rect.left() + (n % 2) * half
+            y = rect.top() + (n // 2) * line
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(COLORS[n % len(COLORS)]))
+            painter.drawRect(QRectF(x + 4, y + line / 4, line / 2, line / 2))
+            painter.setPen(QColor('black'))
+            painter.drawText(QRectF(x + 8 + line / 2, y, half - 8 - line / 2, line),
+                             Qt.AlignLeft | Qt.AlignVCenter, metrics.elidedText(label, Qt.ElideRight, half - 8 - line / 2))
+    painter.restore()
+
+
+_cache = OrderedDict()
+
+
+def radar_pixmap(series, width, height, dpr=1.0, title=None):
+    """Transparent QPixmap of a radar chart, from the cache when possible.
+
+    Must be called on the GUI thread.
+
+    Args:
+        series: List of (label, values) pairs, see ``paint_radar``.
+        width, height: Size in device-independent pixels.
+        dpr: Device pixel ratio of the screen it is shown on.
+        title: See ``paint_radar``.
+    """
+    key = (tuple(series), width, height, dpr, title)
+    pixmap = _cache.get(key)
+    if pixmap is not None:
+        _cache.move_to_end(key)
+        return pixmap
+    pixmap = QPixmap(round(width * dpr), round(height * dpr))
+    pixmap.setDevicePixelRatio(dpr)
+    pixmap.fill(Qt.transparent)
+    painter = QPainter(pixmap)
+    paint_radar(painter, QRectF(0, 0, width, height), series, title)
+    painter.end()
+    _cache[key] = pixmap
+    if len(_cache) > MAX_CACHED:
+        _cache.popitem(last=False)
+    return pixmap
+
+
+def clear_cache():
+    _cache.clear()
+
+
+class RadarChart(QWidget):
+    """Shows the radar chart of one or more Pokémon."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._series = []
+        self._title = None
+
+    def set_series(self, series, title=None):
+        """Show ``series`` (list of (label, values)); an empty list clears the chart."""
+        self._series = list(series)
+        self._title = title
+        self.update()
+
+    @timed('paint.radar')
+    def paintEvent(self, event):
+        if self._series:
+            painter = QPainter(self)
+            painter.drawPixmap(0, 0, radar_pixmap(self._series, self.width(), self.height(),
+                                                  self.devicePixelRatioF(), self._title))
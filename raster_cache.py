@@ -0,0 +1,216 @@
+import os
+from PySide6.QtWidgets import QWidget, QGraphicsScene, QGraphicsBlurEffect
+from PySide6.QtGui import QImage, QPixmap, QPainter, QColor
+from PySide6.QtCore import Qt, QObject, QEvent, QRect, QRectF
+
+# Shared window rasters
+# Window backgrounds are decoded once and kept scaled to each window size, so
+# a repaint is a plain blit instead of a rescale of the full-resolution PNG,
+# and windows that use the same image share one copy. Drop shadows are baked
+# into pixmaps once per (size, shape) and drawn by a sibling layer under the
+# widget, which replaces QGraphicsDropShadowEffect: the effect re-renders the
+# widget offscreen and blurs it again on every update.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# QGraphicsDropShadowEffect's default colour
+SHADOW_COLOR = QColor(63, 63, 63, 180)
+
+
+def load_background(name, size, dpr=1.0):
+    """Decode an image from the repository root and scale it to ``size``.
+
+    Safe to call off the GUI thread.
+
+    Args:
+        name: File name relative to the repository root.
+        size: QSize in device-independent pixels.
+        dpr: Device pixel ratio the result is meant for.
+    """
+    image = QImage(os.path.join(BASE_DIR, name))
+    if image.isNull():
+        return image
+    image = image.scaled(round(size.width() * dpr), round(size.height() * dpr),
+                         Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    image.setDevicePixelRatio(dpr)
+    return image
+
+
+def bake_shadow(size, blur, radius=0, color=SHADOW_COLOR, dpr=1.0):
+    """Blurred silhouette of a rounded rectangle, as a QImage.
+
+    The image is ``size`` grown by ``blur`` on every side; the rectangle sits
+    at (blur, blur). Qt's own blur is used, run once through an offscreen
+    scene. Must be called on the GUI thread.
+
+    Args:
+        size: QSize of the widget casting the shadow.
+        blur: Blur radius, as in QGraphicsDropShadowEffect.setBlurRadius.
+        radius: Corner radius of the widget's rounded border.
+        color: Shadow colour; its alpha scales the whole shadow.
+        dpr: Device pixel ratio the result is meant for.
+    """
+    margin = round(blur * dpr)
+    width, height = round(size.width() * dpr), round(size.height() * dpr)
+    silhouette = QPixmap(width + 2 * margin, height + 2 * margin)
+    silhouette.fill(Qt.transparent)
+    painter = QPainter(silhouette)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setPen(Qt.NoPen)
+    painter.setBrush(color)
+    painter.drawRoundedRect(margin, margin, width, height, radius * dpr, radius * dpr)
+    painter.end()
+
+    scene = QGraphicsScene()
+    item = scene.addPixmap(silhouette)
+    effect = QGraphicsBlurEffect()
+    # Half the radius matches the drop shadow effect's falloff, which then
+    # also fits inside the margin
+    effect.setBlurRadius(margin / 2)
+    effect.setBlurHints(QGraphicsBlurEffect.PerformanceHint)
+    item.setGraphicsEffect(effect)
+    image = QImage(silhouette.size(), QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    area = QRectF(silhouette.rect())
+    scene.render(painter, area, area)
+    painter.end()
+    image.setDevicePixelRatio(dpr)
+    return image
+
+
+class RasterCache:
+    """Backgrounds scaled per window size and baked shadows, shared by all windows.
+
+    All methods must be called on the GUI thread.
+    """
+
+    def __init__(self):
+        self._backgrounds = {}   # (name, width, height, dpr) -> QPixmap
+        self._shadows = {}       # (width, height, blur, radius, rgba, dpr) -> QPixmap
+
+    def background(self, name, size, dpr=1.0):
+        """``name`` scaled to ``size``, decoded and scaled on first use."""
+        key = (name, size.width(), size.height(), dpr)
+        pixmap = self._backgrounds.get(key)
+        if pixmap is None:
+            pixmap = self._backgrounds[key] = QPixmap.fromImage(load_background(name, size, dpr))
+        return pixmap
+
+    def cached_background(self, name, size, dpr=1.0):
+        """Like ``background`` but None instead of loading."""
+        return self._backgrounds.get((name, size.width(), size.height(), dpr))
+
+    def put_background(self, name, size, dpr, image):
+        """Store a background loaded elsewhere, e.g. by ``load_background`` on a worker."""
+        self._backgrounds[(name, size.width(), size.height(), dpr)] = QPixmap.fromImage(image)
+
+    def shadow(self, size, blur, radius=0, color=SHADOW_COLOR, dpr=1.0):
+        """Baked shadow of a widget of ``size``; see ``bake_shadow``."""
+        key = (size.width(), size.height(), blur, radius, color.rgba(), dpr)
+        pixmap = self._shadows.get(key)
+        if pixmap is None:
+            pixmap = self._shadows[key] = QPixmap.fromImage(bake_shadow(size, blur, radius, color, dpr))
+        return pixmap
+
+    def stats(self):
+        """Number and total size in bytes of the cached rasters."""
+        pixmaps = list(self._backgrounds.values()) + list(self._shadows.values())
+        return {
+            'backgrounds': len(self._backgrounds),
+            'shadows': len(self._shadows),
+            'bytes': sum(p.width() * p.height() * p.depth() // 8 for p in pixmaps),
+        }
+
+    def clear(self):
+        self._backgrounds.clear()
+        self._shadows.clear()
+
+
+_cache = None
+
+
+def get_raster_cache():
+    """Return the application-wide RasterCache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = RasterCache()
+    return _cache
+
+
+def paint_background(widget, name):
+    """Fill ``widget`` with the shared, pre-scaled background ``name``.
+
+    Call from the widget's paintEvent.
+    """
+    pixmap = get_raster_cache().background(name, widget.size(), widget.devicePixelRatioF())
+    painter = QPainter(widget)
+    painter.drawPixmap(0, 0, pixmap)
+
+
+class _ShadowLayer(QWidget):
+    # Sibling stacked under the target; it only paints the baked shadow
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        # Keeps parents' "QWidget { ... }" rules from styling the layer
+        self.setStyleSheet('background: transparent; border: none;')
+        self.pixmap = None
+
+    def paintEvent(self, event):
+        if self.pixmap is not None:
+            QPainter(self).drawPixmap(0, 0, self.pixmap)
+
+
+class DropShadow(QObject):
+    """Baked replacement for QGraphicsDropShadowEffect.
+
+    Follows the target widget's parent, geometry and visibility; the shadow is
+    drawn by a sibling stacked just under it.
+
+    Args:
+        widget: Widget casting the shadow.
+        blur: Blur radius in pixels.
+        offset: (dx, dy) of the shadow.
+        radius: Corner radius of the widget's rounded border.
+        color: Shadow colour.
+    """
+
+    def __init__(self, widget, blur=12, offset=(0, 3), radius=0, color=SHADOW_COLOR):
+        super().__init__(widget)
+        self.widget = widget
+        self.blur = blur
+        self.offset = offset
+        self.radius = radius
+        self.color = QColor(color)
+        self.layer = None
+        widget.installEventFilter(self)
+        self._sync()
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.ParentChange, QEvent.Move, QEvent.Resize, QEvent.Show, QEvent.Hide):
+            self._sync()
+        return False
+
+    def _sync(self):
+        widget = self.widget
+        parent = widget.parentWidget()
+        if parent is None:
+            return
+        if self.layer is None or self.layer.parentWidget() is not parent:
+            if self.layer is not None:
+                self.layer.deleteLater()
+            self.layer = _ShadowLayer(parent)
+        self.layer.stackUnder(widget)
+        size = widget.size()
+        self.layer.pixmap = get_raster_cache().shadow(size, self.blur, self.radius, self.color,
+                                                      widget.devicePixelRatioF())
+        geometry = QRect(widget.pos(), size).adjusted(-self.blur, -self.blur, self.blur, self.blur)
+        self.layer.setGeometry(geometry.translated(*self.offset))
+        self.layer.setVisible(widget.isVisibleTo(parent))
+        self.layer.update()
+
+
+def add_shadow(widget, blur=12, offset=(0, 3), radius=0, color=SHADOW_COLOR):
+    """Give ``widget`` a baked drop shadow; see DropShadow."""
+    return DropShadow(widget, blur, offset, radius, color)
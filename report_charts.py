@@ -0,0 +1,467 @@
+import math
+from collections import OrderedDict
+import numpy as np
+from PySide6.QtWidgets import QWidget
+from PySide6.QtGui import QImage, QPixmap, QPainter, QColor, QPen, QFont, QFontMetricsF, QPolygonF
+from PySide6.QtCore import Qt, QPointF, QRectF
+from report_engine import COLORS
+from instrumentation import timed
+
+# Report chart drawing
+# Paints the Chart objects of report_engine.py with QPainter, in the style of
+# the matplotlib exports they replace: framed axes with outward ticks, the
+# tab10 colours, a coolwarm heatmap. Rendered pixmaps are cached per report,
+# dataset version, size and device pixel ratio, so switching back to a report
+# is a blit.
+
+FRAME_COLOR = QColor('black')
+TEXT_COLOR = QColor('black')
+BACKGROUND = QColor('white')
+MAX_CACHED = 64           # pixmaps
+TICK_LENGTH = 4
+MARKER_RADIUS = 3.5
+# matplotlib's 'coolwarm', sampled
+COOLWARM = ((0.0, (59, 76, 192)), (0.25, (141, 176, 254)), (0.5, (221, 221, 221)),
+            (0.75, (244, 154, 123)), (1.0, (180, 4, 38)))
+
+
+def nice_ticks(low, high, count=6):
+    """Round tick values covering [low, high], about ``count`` of them."""
+    if not (math.isfinite(low) and math.isfinite(high)) or high <= low:
+        return [low] if math.isfinite(low) else []
+    raw = (high - low) / max(count - 1, 1)
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    first = math.ceil(low / step - 1e-9) * step
+    return [first + i * step for i in range(int((high - first) / step + 1e-9) + 1)]
+
+
+def _tick_text(value, ticks):
+    step = ticks[1] - ticks[0] if len(ticks) > 1 else 1
+    decimals = max(0, -math.floor(math.log10(step) + 1e-9)) if step > 0 else 0
+    if step > 0 and decimals == 0 and abs(step - round(step)) > 1e-9:
+        decimals = 1
+    return f'{value:.{decimals}f}'
+
+
+def _padded(values, margin=0.05):
+    # matplotlib's default data margins
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return 0.0, 1.0
+    low, high = float(values.min()), float(values.max())
+    span = high - low or abs(high) or 1.0
+    return low - span * margin, high + span * margin
+
+
+def coolwarm(value):
+    """QColor of ``value`` in [-1, 1] on the coolwarm colour map."""
+    t = min(max((value + 1) / 2, 0.0), 1.0) if math.isfinite(value) else 0.5
+    for (t0, c0), (t1, c1) in zip(COOLWARM, COOLWARM[1:]):
+        if t <= t1:
+            f = (t - t0) / (t1 - t0)
+            return QColor(*(round(a + (b - a) * f) for a, b in zip(c0, c1)))
+    return QColor(*COOLWARM[-1][1])
+
+
+class _Axes:
+    # Data -> pixel mapping of a plot rectangle
+    def __init__(self, plot, x_range, y_range):
+        self.plot = plot
+        self.x0, self.x1 = x_range
+        self.y0, self.y1 = y_range
+
+    def x(self, value):
+        return self.plot.left() + (value - self.x0) / (self.x1 - self.x0) * self.plot.width()
+
+    def y(self, value):
+        return self.plot.bottom() - (value - self.y0) / (self.y1 - self.y0) * self.plot.height()
+
+
+def _text(painter, rect, text, align=Qt.AlignCenter):
+    painter.drawText(rect, align, text)
+
+
+def _layout(painter, rect, chart, x_labels, y_labels, line, bottom_extra=0.0):
+    # Plot rectangle inside ``rect`` leaving room for title, labels and ticks
+    metrics = QFontMetricsF(painter.font())
+    left = rect.left() + (line * 1.5 if chart.ylabel else line * 0.5) \
+        + max((metrics.horizontalAdvance(t) for t in y_labels), default=0) + TICK_LENGTH + 4
+    top = rect.top() + line * 1.8
+    bottom = rect.bottom() - (line * 1.4 if chart.xlabel else line * 0.4) - line - TICK_LENGTH - bottom_extra
+    right = rect.right() - max(line, metrics.horizontalAdvance(x_labels[-1]) / 2 if x_labels else 0)
+    return QRectF(left, top, max(1.0, right - left), max(1.0, bottom - top))
+
+
+def _paint_axes(painter, rect, chart, axes, x_ticks, y_ticks, line, x_labels=None, bottom_extra=0.0):
+    plot = axes.plot
+    painter.setPen(QPen(FRAME_COLOR, 1))
+    painter.setBrush(Qt.NoBrush)
+    for value in x_ticks:
+        x = axes.x(value)
+        painter.drawLine(QPointF(x, plot.bottom()), QPointF(x, plot.bottom() + TICK_LENGTH))
+    for value in y_ticks:
+        y = axes.y(value)
+        painter.drawLine(QPointF(plot.left() - TICK_LENGTH, y), QPointF(plot.left(), y))
+    painter.drawRect(plot)
+
+    painter.setPen(TEXT_COLOR)
+    labels = x_labels or [_tick_text(v, x_ticks) for v in x_ticks]
+    if x_labels is None:
+        for value, text in zip(x_ticks, labels):
+            _text(painter, QRectF(axes.x(value) - 40, plot.bottom() + TICK_LENGTH + 1, 80, line),
+                  text, Qt.AlignHCenter | Qt.AlignTop)
+    for value in y_ticks:
+        _text(painter, QRectF(rect.left(), axes.y(value) - line / 2, plot.left() - TICK_LENGTH - 3 - rect.left(), line),
+              _tick_text(value, y_ticks), Qt.AlignRight | Qt.AlignVCenter)
+
+    title_font = QFont(painter.font())
+    title_font.setPixelSize(round(title_font.pixelSize() * 1.2))
+    painter.save()
+    painter.setFont(title_font)
+    _text(painter, QRectF(rect.left(), rect.top(), rect.width(), line * 1.6), chart.title)
+    painter.restore()
+    if chart.xlabel:
+        _text(painter, QRectF(plot.left(), rect.bottom() - line * 1.3, plot.width(), line * 1.3), chart.xlabel)
+    if chart.ylabel:
+        painter.save()
+        painter.translate(rect.left() + line * 0.7, plot.center().y())
+        painter.rotate(-90)
+        _text(painter, QRectF(-plot.height() / 2, -line * 0.7, plot.height(), line * 1.4), chart.ylabel)
+        painter.restore()
+
+
+def _marker(painter, point, marker, radius=MARKER_RADIUS):
+    if marker == 's':
+        painter.drawRect(QRectF(point.x() - radius, point.y() - radius, 2 * radius, 2 * radius))
+    elif marker == 'o':
+        painter.drawEllipse(point, radius, radius)
+
+
+def _xy_ranges(chart):
+    xs = np.concatenate([s.x for s in chart.series]) if chart.series else np.zeros(0)
+    ys = np.concatenate([s.y for s in chart.series]) if chart.series else np.zeros(0)
+    return _padded(xs), _padded(ys)
+
+
+def _paint_xy(painter, rect, chart, line):
+    (x0, x1), (y0, y1) = _xy_ranges(chart)
+    x_ticks = [t for t in nice_ticks(x0, x1, 8) if x0 <= t <= x1]
+    if chart.kind == 'line' and all(np.allclose(s.x, np.round(s.x)) for s in chart.series):
+        # Generations and other integer x values get one tick each
+        x_ticks = [t for t in x_ticks if float(t).is_integer()] or x_ticks
+    y_ticks = [t for t in nice_ticks(y0, y1, 8) if y0 <= t <= y1]
+    y_labels = [_tick_text(v, y_ticks) for v in y_ticks]
+    annotations = max((QFontMetricsF(painter.font()).horizontalAdvance(s.label)
+                       for s in chart.series if s.annotate), default=0)
+    plot = _layout(painter, rect, chart, [_tick_text(v, x_ticks) for v in x_ticks], y_labels, line)
+    plot.setRight(plot.right() - annotations * 0.9)
+    axes = _Axes(plot, (x0, x1), (y0, y1))
+    _paint_axes(painter, rect, chart, axes, x_ticks, y_ticks, line)
+
+    painter.save()
+    painter.setClipRect(plot.adjusted(-MARKER_RADIUS, -MARKER_RADIUS, MARKER_RADIUS, MARKER_RADIUS))
+    for series in chart.series:
+        color = QColor(series.color)
+        valid = np.isfinite(series.x) & np.isfinite(series.y)
+        points = [QPointF(axes.x(x), axes.y(y)) for x, y in zip(series.x[valid], series.y[valid])]
+        if series.line and len(points) > 1:
+            pen = QPen(color, 1.6)
+            if series.line == 'dashed':
+                pen.setStyle(Qt.DashLine)
+            painter.setPen(pen)
+            painter.setBrush(Qt.NoBrush)
+            painter.drawPolyline(QPolygonF(points))
+        if series.marker:
+            fill = QColor(color)
+            fill.setAlphaF(series.alpha)
+            painter.setPen(QPen(color if series.alpha >= 1 else fill, 1))
+            painter.setBrush(fill)
+            for point in points:
+                _marker(painter, point, series.marker)
+    painter.restore()
+
+    painter.setPen(TEXT_COLOR)
+    small = QFont(painter.font())
+    small.setPixelSize(max(6, round(small.pixelSize() * 0.85)))
+    painter.save()
+    painter.setFont(small)
+    for series in chart.series:
+        valid = np.flatnonzero(np.isfinite(series.x) & np.isfinite(series.y))
+        if series.annotate and len(valid):
+            last = valid[-1]
+            _text(painter, QRectF(axes.x(series.x[last]) + 2, axes.y(series.y[last]) - line / 2, annotations + 4, line),
+                  series.label, Qt.AlignLeft | Qt.AlignVCenter)
+    painter.restore()
+    if chart.legend:
+        _paint_legend(painter, plot, chart.series, line)
+
+
+def _paint_legend(painter, plot, series, line):
+    metrics = QFontMetricsF(painter.font())
+    width = max(metrics.horizontalAdvance(s.label) for s in series) + line * 2.2
+    box = QRectF(plot.right() - width - 4, plot.top() + 4, width, line * len(series) + 6)
+    painter.setPen(QPen(QColor('#cccccc'), 1))
+    painter.setBrush(QColor(255, 255, 255, 220))
+    painter.drawRoundedRect(box, 3, 3)
+    for n, s in enumerate(series):
+        y = box.top() + 3 + n * line
+        color = QColor(s.color)
+        fill = QColor(color)
+        fill.setAlphaF(s.alpha)
+        painter.setPen(QPen(color, 1))
+        painter.setBrush(fill)
+        _marker(painter, QPointF(box.left() + line * 0.8, y + line / 2), s.marker or 'o')
+        painter.setPen(TEXT_COLOR)
+        _text(painter, QRectF(box.left() + line * 1.6, y, width - line * 1.6, line), s.label,
+              Qt.AlignLeft | Qt.AlignVCenter)
+
+
+def _paint_bar(painter, rect, chart, line):
+    series = chart.series[0]
+    values = series.y
+    y1 = _padded(np.append(values, 0.0))[1]
+    y_ticks = [t for t in nice_ticks(0.0, y1, 8) if t <= y1]
+    y_labels = [_tick_text(v, y_ticks) for v in y_ticks]
+    metrics = QFontMetricsF(painter.font())
+    label_height = max((metrics.horizontalAdvance(c) for c in chart.categories), default=0) + 2
+    plot = _layout(painter, rect, chart, [], y_labels, line, bottom_extra=label_height - line)
+    count = len(values)
+    axes = _Axes(plot, (-0.75, count - 0.25), (0.0, y1))
+    _paint_axes(painter, rect, chart, axes, list(range(count)), y_ticks, line, x_labels=chart.categories,
+                bottom_extra=label_height)
+    painter.setPen(Qt.NoPen)
+    painter.setBrush(QColor(series.color))
+    half = plot.width() / (count + 0.5) * 0.25
+    for i, value in enumerate(values):
+        if math.isfinite(value):
+            top = axes.y(max(value, 0.0))
+            painter.drawRect(QRectF(axes.x(i) - half, top, 2 * half, axes.y(0.0) - top))
+    painter.setPen(TEXT_COLOR)
+    for i, label in enumerate(chart.categories):
+        painter.save()
+        painter.translate(axes.x(i), plot.bottom() + TICK_LENGTH + 2)
+        painter.rotate(-90)
+        _text(painter, QRectF(-label_height, -line / 2, label_height, line), label, Qt.AlignRight | Qt.AlignVCenter)
+        painter.restore()
+
+
+def _paint_pie(painter, rect, chart, line):
+    title_font = QFont(painter.font())
+    title_font.setPixelSize(round(title_font.pixelSize() * 1.2))
+    painter.save()
+    painter.setFont(title_font)
+    _text(painter, QRectF(rect.left(), rect.top(), rect.width(), line * 1.6), chart.title)
+    painter.restore()
+    values = np.nan_to_num(np.asarray(chart.values, dtype=float))
+    total = values.sum()
+    if total <= 0:
+        return
+    metrics = QFontMetricsF(painter.font())
+    label_width = max(metrics.horizontalAdvance(c) for c in chart.categories)
+    area = QRectF(rect.left(), rect.top() + line * 1.8, rect.width(), rect.height() - line * 1.8)
+    radius = max(1.0, min(area.width() / 2 - label_width - line, (area.height() / 2 - line) / 1.1))
+    center = area.center()
+    pie = QRectF(center.x() - radius, center.y() - radius, 2 * radius, 2 * radius)
+    # Counter-clockwise from 3 o'clock, largest first, as pandas draws them
+    start = 0.0
+    painter.setPen(Qt.NoPen)
+    for n, value in enumerate(values):
+        span = value / total * 360
+        painter.setBrush(QColor(COLORS[n % len(COLORS)]))
+        painter.drawPie(pie, round(start * 16), round(span * 16))
+        start += span
+    painter.setPen(TEXT_COLOR)
+    start = 0.0
+    for label, value in zip(chart.categories, values):
+        span = value / total * 360
+        angle = math.radians(start + span / 2)
+        start += span
+        x = center.x() + radius * 1.1 * math.cos(angle)
+        y = center.y() - radius * 1.1 * math.sin(angle)
+        width = metrics.horizontalAdvance(label) + 2
+        left = x if math.cos(angle) >= 0 else x - width
+        _text(painter, QRectF(left, y - line / 2, width, line), label,
+              (Qt.AlignLeft if math.cos(angle) >= 0 else Qt.AlignRight) | Qt.AlignVCenter)
+
+
+def _paint_heatmap(painter, rect, chart, line):
+    matrix = np.asarray(chart.values, dtype=float)
+    labels = chart.categories
+    count = len(labels)
+    metrics = QFontMetricsF(painter.font())
+    label_width = max((metrics.horizontalAdvance(c) for c in labels), default=0) + TICK_LENGTH + 4
+    bar_width = line * 4.5
+    top = rect.top() + line * 2
+    # Column labels are drawn at 45 degrees under the matrix
+    size = max(1.0, min(rect.width() - label_width - bar_width - line,
+                        rect.bottom() - top - (label_width + line) * 0.72 - TICK_LENGTH))
+    cell = size / max(count, 1)
+    left = rect.left() + label_width + (rect.width() - label_width - bar_width - line - size) / 2
+    grid = QRectF(left, top, size, size)
+
+    title_font = QFont(painter.font())
+    title_font.setPixelSize(round(title_font.pixelSize() * 1.2))
+    painter.save()
+    painter.setFont(title_font)
+    _text(painter, QRectF(rect.left(), rect.top(), rect.width(), line * 1.6), chart.title)
+    painter.restore()
+
+    value_font = QFont(painter.font())
+    value_font.setPixelSize(max(6, min(round(cell / 3.2), painter.font().pixelSize())))
+    for i in range(count):
+        for j in range(count):
+            value = matrix[i, j]
+            cell_rect = QRectF(grid.left() + j * cell, grid.top() + i * cell, cell, cell)
+            painter.fillRect(cell_rect, coolwarm(value))
+            painter.save()
+            painter.setFont(value_font)
+            painter.setPen(QColor('white') if math.isfinite(value) and abs(value) > 0.5 else TEXT_COLOR)
+            _text(painter, cell_rect, f'{value:.2f}' if math.isfinite(value) else '')
+            painter.restore()
+    painter.setPen(QPen(FRAME_COLOR, 1))
+    painter.setBrush(Qt.NoBrush)
+    painter.drawRect(grid)
+    painter.setPen(TEXT_COLOR)
+    for i, label in enumerate(labels):
+        center = grid.top() + (i + 0.5) * cell
+        painter.drawLine(QPointF(grid.left() - TICK_LENGTH, center), QPointF(grid.left(), center))
+        _text(painter, QRectF(rect.left(), center - line / 2, grid.left() - TICK_LENGTH - 3 - rect.left(), line),
+              label, Qt.AlignRight | Qt.AlignVCenter)
+        x = grid.left() + (i + 0.5) * cell
+        painter.drawLine(QPointF(x, grid.bottom()), QPointF(x, grid.bottom() + TICK_LENGTH))
+        painter.save()
+        painter.translate(x, grid.bottom() + TICK_LENGTH + 2)
+        painter.rotate(-45)
+        width = metrics.horizontalAdvance(label) + 2
+        _text(painter, QRectF(-width, -line / 2, width, line), label, Qt.AlignRight | Qt.AlignVCenter)
+        painter.restore()
+
+    # Colour bar
+    bar = QRectF(grid.right() + line, grid.top(), line, grid.height())
+    steps = max(2, int(bar.height()))
+    for k in range(steps):
+        value = 1 - 2 * k / (steps - 1)
+        painter.fillRect(QRectF(bar.left(), bar.top() + k * bar.height() / steps, bar.width(),
+                                bar.height() / steps + 1), coolwarm(value))
+    painter.setPen(QPen(FRAME_COLOR, 1))
+    painter.drawRect(bar)
+    for value in (-1.0, -0.5, 0.0, 0.5, 1.0):
+        y = bar.bottom() - (value + 1) / 2 * bar.height()
+        painter.drawLine(QPointF(bar.right(), y), QPointF(bar.right() + TICK_LENGTH, y))
+        _text(painter, QRectF(bar.right() + TICK_LENGTH + 2, y - line / 2, line * 2.5, line),
+              f'{value:.2f}', Qt.AlignLeft | Qt.AlignVCenter)
+    if chart.ylabel:
+        painter.save()
+        painter.translate(bar.right() + line * 3.8, bar.center().y())
+        painter.rotate(-90)
+        _text(painter, QRectF(-bar.height() / 2, -line / 2, bar.height(), line), chart.ylabel)
+        painter.restore()
+
+
+def paint_chart(painter, rect, chart):
+    """Draw ``chart`` (a report_engine.Chart) into ``rect``.
+
+    Args:
+        painter: Active QPainter.
+        rect: QRectF to fill.
+        chart: Chart to draw.
+    """
+    painter.save()
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    painter.fillRect(rect, BACKGROUND)
+    font = QFont(painter.font())
+    font.setPixelSize(max(7, round(min(rect.width(), rect.height() * 1.4) / 52)))
+    painter.setFont(font)
+    line = QFontMetricsF(font).height()
+    inner = rect.adjusted(line * 0.5, line * 0.3, -line * 0.5, -line * 0.3)
+    if chart.kind in ('line', 'scatter'):
+        _paint_xy(painter, inner, chart, line)
+    elif chart.kind == 'bar':
+        _paint_bar(painter, inner, chart, line)
+    elif chart.kind == 'pie':
+        _paint_pie(painter, inner, chart, line)
+    elif chart.kind == 'heatmap':
+        _paint_heatmap(painter, inner, chart, line)
+    painter.restore()
+
+
+@timed('reports.render')
+def render_chart(chart, width, height, dpr=1.0):
+    """QImage of ``chart``. Safe to call off the GUI thread.
+
+    Args:
+        chart: Chart to draw.
+        width, height: Size in device-independent pixels.
+        dpr: Device pixel ratio of the screen it is shown on.
+    """
+    image = QImage(round(width * dpr), round(height * dpr), QImage.Format_ARGB32_Premultiplied)
+    image.setDevicePixelRatio(dpr)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    paint_chart(painter, QRectF(0, 0, width, height), chart)
+    painter.end()
+    return image
+
+
+_cache = OrderedDict()
+
+
+def chart_pixmap(chart, width, height, dpr=1.0):
+    """QPixmap of ``chart``, from the cache when possible.
+
+    Must be called on the GUI thread.
+    """
+    key = (chart.name, chart.version, width, height, dpr)
+    pixmap = _cache.get(key)
+    if pixmap is not None:
+        _cache.move_to_end(key)
+        return pixmap
+    pixmap = _cache[key] = QPixmap.fromImage(render_chart(chart, width, height, dpr))
+    if len(_cache) > MAX_CACHED:
+        _cache.popitem(last=False)
+    return pixmap
+
+
+def put_image(chart, width, height, dpr, image):
+    """Cache ``image`` as ``chart`` at that size, e.g. one rendered on a worker.
+
+    Must be called on the GUI thread.
+    """
+    key = (chart.name, chart.version, width, height, dpr)
+    _cache[key] = QPixmap.fromImage(image)
+    _cache.move_to_end(key)
+    if len(_cache) > MAX_CACHED:
+        _cache.popitem(last=False)
+
+
+def is_cached(chart, width, height, dpr=1.0):
+    return (chart.name, chart.version, width, height, dpr) in _cache
+
+
+def clear_cache():
+    _cache.clear()
+
+
+class ReportChart(QWidget):
+    """Shows one report chart, scaled to the widget."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._chart = None
+
+    def chart(self):
+        return self._chart
+
+    def set_chart(self, chart):
+        """Show ``chart``; None clears the widget."""
+        self._chart = chart
+        self.update()
+
+    @timed('paint.report_chart')
+    def paintEvent(self, event):
+        if self._chart is not None:
+            painter = QPainter(self)
+            painter.drawPixmap(0, 0, chart_pixmap(self._chart, self.width(), self.height(),
+                                                  self.devicePixelRatioF()))
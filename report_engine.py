@@ -0,0 +1,538 @@
+import sys
+import hashlib
+import argparse
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from instrumentation import span, timed
+
+# Basic data reports
+# The charts of the Basic Data Reports window, computed from the dataset
+# instead of read from the SVGs a notebook once exported to
+# pokemon_total_data/. Every aggregate is kept as running sums (per-group sums
+# and counts, pairwise correlation moments), so when the dataset is reloaded
+# only the rows that differ are subtracted and added again. Charts are plain
+# data (see Chart); report_charts.py draws them. Memoised per dataset version.
+#
+# The reports keep the names of the old SVGs:
+#     attack_vs_defense_legendary   scatter, coloured by is_legendary
+#     average_*_by_generation       mean of a stat per generation
+#     average_resistance_comparison mean of each against_* column
+#     category_trends_annotated     mean attack per generation for each
+#                                   low/mid/high tertile combination of
+#                                   base_total, defense and hp
+#     corr_matrix_top10_gradient    Pearson r of the 10 columns most
+#                                   correlated with attack
+#     hp_vs_speed_scatter, weight_vs_height_scatter
+#     type1_distribution            Pokémon per primary type
+
+# report name -> (stat, title, y label)
+GENERATION_REPORTS = {
+    'average_attack_by_generation': ('attack', 'Average Attack by Generation', 'Avg Attack'),
+    'average_hp_by_generation': ('hp', 'Average HP by Generation', 'Avg HP'),
+    'average_speed_by_generation': ('speed', 'Average Speed by Generation', 'Avg Speed'),
+}
+# report name -> (x, y, title, x label, y label)
+SCATTER_REPORTS = {
+    'hp_vs_speed_scatter': ('hp', 'speed', 'HP vs Speed Scatter', 'HP', 'Speed'),
+    'weight_vs_height_scatter': ('weight_kg', 'height_m', 'Weight vs Height Scatter', 'Weight (kg)', 'Height (m)'),
+}
+REPORT_NAMES = tuple(sorted(list(GENERATION_REPORTS) + list(SCATTER_REPORTS) + [
+    'attack_vs_defense_legendary', 'average_resistance_comparison', 'category_trends_annotated',
+    'corr_matrix_top10_gradient', 'type1_distribution',
+]))
+
+# Tertiles of these columns, in this order, name the trend categories
+CATEGORY_FIELDS = ('base_total', 'defense', 'hp')
+CATEGORY_LEVELS = ('low', 'mid', 'high')
+CORRELATION_TARGET = 'attack'
+CORRELATION_TOP = 10
+# Numeric but meaningless to correlate
+CORRELATION_EXCLUDE = ('pokedex_number',)
+# Above this fraction of changed rows a full rebuild is cheaper than deltas
+REBUILD_FRACTION = 0.5
+
+# matplotlib's tab10 cycle, which the exported charts used
+COLORS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+          '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf')
+
+
+class Series:
+    """One data series of a chart.
+
+    Attributes:
+        label: Legend or annotation text ('' for none).
+        x, y: Float arrays; ``x`` holds category positions for bar charts.
+        color: '#rrggbb'.
+        line: Draw connecting lines ('solid', 'dashed' or None for points only).
+        marker: 'o', 's' or None.
+        alpha: Opacity of markers and fills, 0..1.
+        annotate: Write ``label`` next to the last point.
+    """
+
+    __slots__ = ('label', 'x', 'y', 'color', 'line', 'marker', 'alpha', 'annotate')
+
+    def __init__(self, label, x, y, color=COLORS[0], line='solid', marker='o', alpha=1.0, annotate=False):
+        self.label = label
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.color = color
+        self.line = line
+        self.marker = marker
+        self.alpha = alpha
+        self.annotate = annotate
+
+
+class Chart:
+    """Everything needed to draw one report.
+
+    Attributes:
+        name: Report name.
+        kind: 'line', 'scatter', 'bar', 'pie' or 'heatmap'.
+        title, xlabel, ylabel: Text around the plot.
+        series: Tuple of Series (line, scatter and bar charts).
+        categories: Bar, pie slice or heatmap row/column labels.
+        values: Pie slice sizes, or the square heatmap matrix.
+        legend: Draw a legend of the series labels.
+        version: Dataset version the chart was computed from.
+    """
+
+    __slots__ = ('name', 'kind', 'title', 'xlabel', 'ylabel', 'series', 'categories', 'values', 'legend',
+                 'version')
+
+    def __init__(self, kind, title, xlabel='', ylabel='', series=(), categories=(), values=None,
+                 legend=False, version=0):
+        self.name = ''
+        self.kind = kind
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.series = tuple(series)
+        self.categories = tuple(categories)
+        self.values = values
+        self.legend = legend
+        self.version = version
+
+    def __repr__(self):
+        return f'Chart({self.kind!r}, {self.title!r})'
+
+
+def _numeric(df, column):
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    series = df[column]
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _row_hashes(frame):
+    # 64-bit hash of each row's values: a random multilinear hash of the
+    # float bit patterns (wrapping uint64 arithmetic) plus the type1 text
+    values = frame['values']
+    multipliers = np.random.default_rng(0).integers(1, 2 ** 63, values.shape[1], dtype=np.uint64)
+    multipliers |= np.uint64(1)
+    with np.errstate(over='ignore'):
+        hashes = values.view(np.uint64) @ multipliers
+        hashes += pd.util.hash_array(frame['type1']) * np.uint64(0x9E3779B97F4A7C15)
+    return hashes
+
+
+def _changed_rows(old_hashes, new_hashes):
+    """Positions of the rows removed from the old and added to the new data.
+
+    Same-length data is compared row by row, so an edited row is one removal
+    and one addition. Otherwise the rows are matched as multisets of hashes,
+    which handles inserted and deleted rows.
+    """
+    if len(old_hashes) == len(new_hashes):
+        changed = np.flatnonzero(old_hashes != new_hashes)
+        return changed, changed
+    old_keys, new_keys = _occurrence_keys(old_hashes), _occurrence_keys(new_hashes)
+    return np.flatnonzero(~np.isin(old_keys, new_keys)), np.flatnonzero(~np.isin(new_keys, old_keys))
+
+
+def _occurrence_keys(hashes):
+    # Repeats of one hash get distinct keys, so identical rows pair up one to one
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy().astype(np.uint64)
+    with np.errstate(over='ignore'):
+        return hashes ^ (occurrence * np.uint64(0xBF58476D1CE4E5B9))
+
+
+class GroupSums:
+    """Per-group row counts and NaN-skipping sums of some value columns.
+
+    Rows are added with ``update(keys, values)`` and removed with ``sign=-1``;
+    the means are then those of the rows currently in.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.rows = {}      # key -> number of rows
+        self.sums = {}      # key -> float array of the column sums
+        self.counts = {}    # key -> int array of the non-NaN counts
+
+    def update(self, keys, values, sign=1):
+        """Add (``sign=1``) or remove (``sign=-1``) rows.
+
+        Args:
+            keys: Group key of each row, an array or a list of arrays for
+                tuple keys. Rows whose key contains None are skipped.
+            values: (rows, width) float array, NaN for missing.
+        """
+        length = len(keys[0]) if isinstance(keys, list) else len(keys)
+        frame = pd.DataFrame(np.asarray(values, dtype=np.float64).reshape(length, self.width))
+        grouped = frame.groupby(keys, sort=False, dropna=True)
+        sizes = grouped.size()
+        sums = grouped.sum().reindex(sizes.index).to_numpy()
+        counts = grouped.count().reindex(sizes.index).to_numpy()
+        for key, row_sum, row_count, size in zip(sizes.index, sums, counts, sizes.to_numpy()):
+            rows = self.rows.get(key, 0) + sign * int(size)
+            if rows <= 0:
+                self.rows.pop(key, None)
+                self.sums.pop(key, None)
+                self.counts.pop(key, None)
+                continue
+            self.rows[key] = rows
+            self.sums[key] = self.sums.get(key, 0.0) + sign * row_sum
+            self.counts[key] = self.counts.get(key, 0) + sign * row_count
+
+    def keys(self):
+        return sorted(self.rows)
+
+    def means(self, key):
+        """Column means of a group (NaN where the group has no values)."""
+        counts = self.counts[key]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, self.sums[key] / np.maximum(counts, 1), np.nan)
+
+
+class PairwiseMoments:
+    """Sums for pairwise-complete Pearson correlation, as DataFrame.corr does.
+
+    For each pair of columns (i, j) only rows where both are present count.
+    All sums are additive over rows, so rows can be removed again.
+    """
+
+    def __init__(self, width):
+        self.n = np.zeros((width, width))
+        self.sx = np.zeros((width, width))     # sum of x_i over rows where j is present
+        self.sxx = np.zeros((width, width))
+        self.sxy = np.zeros((width, width))
+
+    def update(self, values, sign=1):
+        present = ~np.isnan(values)
+        mask = present.astype(np.float64)
+        x = np.where(present, values, 0.0)
+        self.n += sign * (mask.T @ mask)
+        self.sx += sign * (x.T @ mask)
+        self.sxx += sign * ((x * x).T @ mask)
+        self.sxy += sign * (x.T @ x)
+
+    def corr(self):
+        n, sx, sxx = self.n, self.sx, self.sxx
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = n * self.sxy - sx * sx.T
+            var_i = n * sxx - sx * sx
+            r = cov / np.sqrt(var_i * var_i.T)
+        np.fill_diagonal(r, 1.0)
+        return np.clip(r, -1.0, 1.0)
+
+
+def _tertile_edges(values):
+    # Inner edges of pd.qcut(values, 3)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return (np.nan, np.nan)
+    return tuple(np.quantile(values, [1 / 3, 2 / 3]))
+
+
+def _tertile(values, edges):
+    # 0/1/2 as pd.qcut assigns them (right-closed bins), -1 for NaN
+    level = np.searchsorted(np.asarray(edges), values, side='left')
+    return np.where(np.isnan(values), -1, level)
+
+
+class ReportEngine:
+    """Computes the report charts of one DataStore and keeps them current.
+
+    Thread-safe. ``chart(name)`` refreshes from the store first, so after a
+    reload the next call returns charts of the new data.
+
+    Args:
+        store: DataStore the dataset comes from.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self.version = None
+        self._row_keys = None
+        self._frame = None
+        self._charts = {}
+        # How the aggregates were last brought up to date, for benchmarks
+        self.last_refresh = {'mode': None, 'rows_added': 0, 'rows_removed': 0}
+
+    # -- aggregates --------------------------------------------------------
+
+    def _columns(self, df):
+        # against_* columns, correlated columns and other stats read by the reports
+        against = sorted(c for c in df.columns if c.startswith('against_'))
+        numeric = [c for c in df.columns if c not in CORRELATION_EXCLUDE and not c.startswith('against_')
+                   and pd.api.types.is_numeric_dtype(df[c])]
+        stats = sorted({s for s, _, _ in GENERATION_REPORTS.values()} | set(CATEGORY_FIELDS)
+                       | {c for x, y, _, _, _ in SCATTER_REPORTS.values() for c in (x, y)}
+                       | {'attack', 'defense', 'generation', 'is_legendary'})
+        return against, numeric, stats
+
+    def _extract(self, df):
+        # Row-aligned inputs of the aggregates. All numbers sit in one matrix,
+        # against_* first, then the correlated columns, then any other stats;
+        # the other entries are views into it.
+        extra = [c for c in self._stat_columns if c not in self._numeric]
+        columns = self._against + self._numeric + extra
+        # Filled column by column, so stored column-major
+        values = np.empty((len(columns), len(df))).T
+        for j, column in enumerate(columns):
+            values[:, j] = _numeric(df, column)
+        frame = {'values': values,
+                 'type1': df['type1'].to_numpy(dtype=object) if 'type1' in df.columns
+                 else np.full(len(df), '', dtype=object)}
+        a, c = len(self._against), len(self._numeric)
+        frame['against'] = values[:, :a]
+        frame['correlated'] = values[:, a:a + c]
+        for column in self._stat_columns:
+            frame[column] = values[:, columns.index(column, a)]
+        return frame
+
+    def _category_keys(self, frame, rows=slice(None)):
+        levels = [_tertile(frame[f][rows], edges) for f, edges in zip(CATEGORY_FIELDS, self._category_edges)]
+        valid = np.all([level >= 0 for level in levels], axis=0) & ~np.isnan(frame['generation'][rows])
+        names = np.full(len(valid), None, dtype=object)
+        if valid.any():
+            words = np.asarray(CATEGORY_LEVELS, dtype=object)
+            joined = words[levels[0][valid]]
+            for level in levels[1:]:
+                joined = joined + '_' + words[level[valid]]
+            names[valid] = joined
+        return [names, frame['generation'][rows]]
+
+    def _apply(self, frame, rows, sign):
+        # Add or remove ``rows`` of ``frame`` from every aggregate
+        generation = frame['generation'][rows]
+        stats = np.column_stack([frame[c][rows] for c in self._stat_columns])
+        self._by_generation.update(generation, stats, sign)
+        self._by_type.update(frame['type1'][rows], np.zeros((len(generation), 0)), sign)
+        self._resistance.update(np.zeros(len(generation)), frame['against'][rows], sign)
+        self._moments.update(frame['correlated'][rows], sign)
+        self._by_category.update(self._category_keys(frame, rows), frame['attack'][rows], sign)
+
+    def _rebuild(self, df, frame):
+        self._against, self._numeric, self._stat_columns = self._columns(df)
+        frame.update(self._extract(df))
+        self._by_generation = GroupSums(len(self._stat_columns))
+        self._by_type = GroupSums(0)
+        self._resistance = GroupSums(len(self._against))
+        self._moments = PairwiseMoments(len(self._numeric))
+        self._by_category = GroupSums(1)
+        self._category_edges = [_tertile_edges(frame[f]) for f in CATEGORY_FIELDS]
+        self._apply(frame, slice(None), 1)
+
+    def refresh(self):
+        """Bring the aggregates up to the store's current dataset version.
+
+        Returns:
+            True if anything changed.
+        """
+        df = self.store.df
+        with self._lock:
+            version = self.store.version
+            if version == self.version:
+                return False
+            with span('reports.refresh'):
+                self._update(df)
+            self.version = version
+            self._charts = {}
+            return True
+
+    def _update(self, df):
+        old_keys, old_frame = self._row_keys, self._frame
+        frame = {}
+        if old_frame is None or self._columns(df) != (self._against, self._numeric, self._stat_columns):
+            self._rebuild(df, frame)
+            row_keys = _row_hashes(frame)
+            self.last_refresh = {'mode': 'full', 'rows_added': len(df), 'rows_removed': 0}
+        else:
+            frame.update(self._extract(df))
+            row_keys = _row_hashes(frame)
+            removed, added = _changed_rows(old_keys, row_keys)
+            if len(added) + len(removed) > REBUILD_FRACTION * max(len(df), 1):
+                self._rebuild(df, frame)
+                self.last_refresh = {'mode': 'full', 'rows_added': len(df), 'rows_removed': 0}
+            else:
+                self._apply(old_frame, removed, -1)
+                self._apply(frame, added, 1)
+                self._refresh_categories(frame)
+                self.last_refresh = {'mode': 'incremental', 'rows_added': len(added),
+                                     'rows_removed': len(removed)}
+        self._row_keys, self._frame = row_keys, frame
+
+    def fingerprint(self):
+        """Hex digest of the rows and columns the reports are computed from.
+
+        Equal for equal data, whatever the dataset version; used to key caches
+        that outlive the process, such as the gallery thumbnails.
+        """
+        with self._lock:
+            self.refresh()
+            digest = hashlib.sha256(repr((self._against, self._numeric, self._stat_columns)).encode())
+            digest.update(self._row_keys.tobytes())
+            return digest.hexdigest()[:16]
+
+    def _refresh_categories(self, frame):
+        # The tertile edges move with the data; if they did, every row may
+        # have changed category and that aggregate is rebuilt
+        edges = [_tertile_edges(frame[f]) for f in CATEGORY_FIELDS]
+        if np.allclose(edges, self._category_edges, equal_nan=True):
+            return
+        self._category_edges = edges
+        self._by_category = GroupSums(1)
+        self._by_category.update(self._category_keys(frame), frame['attack'], 1)
+
+    # -- charts ------------------------------------------------------------
+
+    def chart(self, name):
+        """The Chart of report ``name`` for the current dataset.
+
+        Raises:
+            KeyError: If there is no such report.
+        """
+        if name not in REPORT_NAMES:
+            raise KeyError(name)
+        with self._lock:
+            self.refresh()
+            chart = self._charts.get(name)
+            if chart is None:
+                chart = self._charts[name] = self._build(name)
+                chart.name = name
+                chart.version = self.version
+            return chart
+
+    @timed('reports.build')
+    def _build(self, name):
+        if name in GENERATION_REPORTS:
+            stat, title, ylabel = GENERATION_REPORTS[name]
+            column = self._stat_columns.index(stat)
+            keys = self._by_generation.keys()
+            y = [self._by_generation.means(k)[column] for k in keys]
+            return Chart('line', title, 'Generation', ylabel, [Series('', keys, y)])
+        if name in SCATTER_REPORTS:
+            x, y, title, xlabel, ylabel = SCATTER_REPORTS[name]
+            return Chart('scatter', title, xlabel, ylabel,
+                         [Series('', self._frame[x], self._frame[y], line=None, alpha=0.6)])
+        return getattr(self, '_build_' + name)()
+
+    def _build_attack_vs_defense_legendary(self):
+        legendary = self._frame['is_legendary']
+        series = []
+        for n, flag in enumerate(sorted(set(legendary[~np.isnan(legendary)]))):
+            rows = legendary == flag
+            series.append(Series(f'Legendary={flag:g}', self._frame['attack'][rows], self._frame['defense'][rows],
+                                 color=COLORS[n % len(COLORS)], line=None, alpha=0.6))
+        return Chart('scatter', 'Attack vs Defense (Legendary)', 'Attack', 'Defense', series, legend=True)
+
+    def _build_average_resistance_comparison(self):
+        means = self._resistance.means(0.0) if self._resistance.rows else np.full(len(self._against), np.nan)
+        order = np.argsort(-np.nan_to_num(means, nan=-np.inf), kind='stable')
+        return Chart('bar', 'Average Resistance Comparison', 'Resistance Type', 'Avg Multiplier',
+                     [Series('', np.arange(len(order)), means[order], line=None, marker=None)],
+                     categories=[self._against[i] for i in order])
+
+    def _build_category_trends_annotated(self):
+        groups = {}
+        for category, generation in self._by_category.keys():
+            groups.setdefault(category, []).append((generation, self._by_category.means((category, generation))[0]))
+        series = []
+        for n, category in enumerate(sorted(groups)):
+            points = sorted(groups[category])
+            series.append(Series(category, [g for g, _ in points], [v for _, v in points],
+                                 color=COLORS[n % len(COLORS)], line='dashed' if n % 2 else 'solid',
+                                 marker='o' if n % 2 else 's', annotate=len(points) > 1))
+        return Chart('line', 'Category-wise Attack Trend (Annotated)', 'Generation', 'Avg Attack', series)
+
+    def _build_corr_matrix_top10_gradient(self):
+        r = self._moments.corr()
+        columns = self._numeric
+        if CORRELATION_TARGET in columns:
+            target = columns.index(CORRELATION_TARGET)
+            strength = np.nan_to_num(np.abs(r[target]), nan=-1.0)
+            strength[target] = -np.inf
+            order = np.argsort(-strength, kind='stable')[:CORRELATION_TOP]
+        else:
+            order = np.arange(min(CORRELATION_TOP, len(columns)))
+        return Chart('heatmap', f'Correlation Matrix (Top{CORRELATION_TOP})', values=r[np.ix_(order, order)],
+                     categories=[columns[i] for i in order], ylabel='Pearson r')
+
+    def _build_type1_distribution(self):
+        counts = [(self._by_type.rows[t], t) for t in self._by_type.keys() if t]
+        counts.sort(key=lambda item: -item[0])
+        return Chart('pie', 'Type1 Distribution', categories=[t for _, t in counts],
+                     values=np.array([c for c, _ in counts], dtype=float))
+
+
+_engines = weakref.WeakKeyDictionary()
+_engines_lock = threading.Lock()
+
+
+def get_report_engine(store):
+    """Return the ReportEngine of ``store``, creating it on first use.
+
+    Unlike store.derived tables the engine outlives a reload, which is what
+    lets it update its aggregates instead of recomputing them.
+    """
+    with _engines_lock:
+        engine = _engines.get(store)
+        if engine is None:
+            engine = _engines[store] = ReportEngine(store)
+    return engine
+
+
+def _describe(chart):
+    # Plain-text dump of a chart's data for the command line
+    lines = [chart.title]
+    if chart.kind in ('pie', 'bar'):
+        values = chart.values if chart.kind == 'pie' else chart.series[0].y
+        lines += [f'  {label:<24} {value:10.3f}' for label, value in zip(chart.categories, values)]
+    elif chart.kind == 'heatmap':
+        width = max(len(c) for c in chart.categories)
+        lines += [f"  {label:<{width}} " + ' '.join(f'{v:6.2f}' for v in row)
+                  for label, row in zip(chart.categories, chart.values)]
+    else:
+        for series in chart.series:
+            if chart.kind == 'scatter':
+                lines.append(f'  {series.label or "points"}: {len(series.x)} points')
+            else:
+                points = ', '.join(f'{x:g}: {y:.2f}' for x, y in zip(series.x, series.y))
+                lines.append(f'  {series.label + ": " if series.label else ""}{points}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print the data behind the Basic Data Reports.')
+    parser.add_argument('reports', nargs='*', help=f"reports to print, of: {' '.join(REPORT_NAMES)} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.reports if name not in REPORT_NAMES]
+    if unknown:
+        parser.error(f"unknown report: {', '.join(unknown)}")
+
+    from data_store import get_store
+    engine = get_report_engine(get_store())
+    for name in args.reports or REPORT_NAMES:
+        print(_describe(engine.chart(name)))
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import os
+import shutil
+from PySide6.QtWidgets import QListWidget, QListWidgetItem, QListView, QAbstractItemView
+from PySide6.QtGui import QImage, QPixmap, QIcon
+from PySide6.QtCore import Qt, QSize, QThread, Signal
+from report_engine import REPORT_NAMES
+from report_charts import render_chart
+
+# Report prerendering and thumbnail gallery
+# When the reports window opens, a worker renders every report at the size it
+# is shown at, so switching reports only blits a cached pixmap, and scales each
+# render down to a thumbnail for the gallery strip. Thumbnails are also saved
+# as PNGs under .report_cache/<fingerprint>/, the fingerprint being a digest
+# of the data the reports are computed from, so later sessions show the strip
+# before anything has been rendered.
+
+FORMAT_VERSION = 1      # bump when the charts are drawn differently
+CACHE_DIR_NAME = '.report_cache'
+THUMBNAIL_SIZE = QSize(112, 64)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, CACHE_DIR_NAME)
+
+
+class ThumbnailStore:
+    """Report thumbnails on disk, one directory per dataset fingerprint.
+
+    Args:
+        cache_dir: Directory holding the thumbnails.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, fingerprint, name, size, dpr):
+        return os.path.join(self.cache_dir, f'{FORMAT_VERSION}-{fingerprint}',
+                            f'{name}_{size.width()}x{size.height()}@{dpr:g}.png')
+
+    def load(self, fingerprint, name, size, dpr=1.0):
+        """The saved thumbnail, or a null QImage if there is none."""
+        image = QImage(self._path(fingerprint, name, size, dpr))
+        if not image.isNull():
+            image.setDevicePixelRatio(dpr)
+        return image
+
+    def save(self, fingerprint, name, size, dpr, image):
+        """Save ``image``; failures are ignored, the cache is only an optimisation."""
+        path = self._path(fingerprint, name, size, dpr)
+        tmp_path = path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if image.save(tmp_path, 'PNG'):
+                os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def prune(self, fingerprint):
+        """Delete the thumbnails of every other dataset."""
+        keep = f'{FORMAT_VERSION}-{fingerprint}'
+        try:
+            entries = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for entry in entries:
+            if entry != keep:
+                shutil.rmtree(os.path.join(self.cache_dir, entry), ignore_errors=True)
+
+
+class ReportPrerenderer(QThread):
+    """Renders reports and their thumbnails off the GUI thread.
+
+    Saved thumbnails are emitted first, then each report is rendered, in the
+    order given, and ``rendered`` is emitted with the Chart and the QImage; a
+    ``thumbnail`` follows for every thumbnail that was not on disk. The GUI
+    thread turns the images into pixmaps. requestInterruption() stops it.
+
+    Args:
+        engine: ReportEngine the charts come from.
+        names: Reports to render.
+        size: Size the reports are shown at.
+        dpr: Device pixel ratio of the screen.
+        store: ThumbnailStore, or None to keep nothing on disk.
+    """
+
+    rendered = Signal(object, QImage)
+    thumbnail = Signal(str, QImage)
+
+    def __init__(self, engine, names, size, dpr=1.0, store=None, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.names = list(names)
+        self.size = size
+        self.dpr = dpr
+        self.store = store
+
+    def run(self):
+        fingerprint = self.engine.fingerprint() if self.store is not None else None
+        missing = []
+        for name in self.names:
+            image = self.store.load(fingerprint, name, THUMBNAIL_SIZE, self.dpr) if fingerprint else QImage()
+            if image.isNull():
+                missing.append(name)
+            else:
+                self.thumbnail.emit(name, image)
+        for name in self.names:
+            if self.isInterruptionRequested():
+                return
+            chart = self.engine.chart(name)
+            image = render_chart(chart, self.size.width(), self.size.height(), self.dpr)
+            self.rendered.emit(chart, image)
+            if name in missing:
+                thumbnail = image.scaled(THUMBNAIL_SIZE * self.dpr, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                thumbnail.setDevicePixelRatio(self.dpr)
+                if fingerprint:
+                    self.store.save(fingerprint, name, THUMBNAIL_SIZE, self.dpr, thumbnail)
+                self.thumbnail.emit(name, thumbnail)
+        if fingerprint:
+            self.store.prune(fingerprint)
+
+
+class ReportGallery(QListWidget):
+    """Horizontal strip with one thumbnail per report.
+
+    Items show the report name until their thumbnail arrives through
+    ``set_thumbnail``; ``currentTextChanged`` reports the selected report.
+    """
+
+    def __init__(self, names=REPORT_NAMES, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(False)
+        self.setMovement(QListView.Static)
+        self.setIconSize(THUMBNAIL_SIZE)
+        self.setGridSize(THUMBNAIL_SIZE + QSize(8, 8))
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self._items = {}
+        for name in names:
+            item = QListWidgetItem(name.replace('_', ' '))
+            item.setToolTip(name)
+            item.setData(Qt.UserRole, name)
+            item.setTextAlignment(Qt.AlignCenter)
+            item.setSizeHint(THUMBNAIL_SIZE + QSize(4, 4))
+            self.addItem(item)
+            self._items[name] = item
+
+    def set_thumbnail(self, name, image):
+        item = self._items.get(name)
+        if item is not None:
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+            item.setText('')
+
+    def select(self, name):
+        """Select ``name`` without emitting a selection change."""
+        item = self._items.get(name)
+        if item is not None and item is not self.currentItem():
+            self.blockSignals(True)
+            self.setCurrentItem(item)
+            self.blockSignals(False)
+            self.scrollToItem(item)
+
+    def name_at(self, row):
+        item = self.item(row)
+        return item.data(Qt.UserRole) if item is not None else None
@@ -0,0 +1,147 @@
+import numpy as np
+from PySide6.QtGui import QPixmap
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, Signal
+from asset_cache import THUMBNAIL, THUMBNAIL_SIZE
+from instrumentation import timed
+
+# Pokédex search results as a Qt table model
+# The model wraps the row-position array a query returns and nothing else:
+# cells are read from the DisplayTable records and the QueryColumns arrays
+# when the view asks for them, which it only does for the rows on screen, so
+# a result of any size costs one index array. Thumbnails are requested the
+# same way. A painted row whose thumbnail is not cached gets a blank one, and
+# the rows missing it during one paint are sent to the asset cache's pool as
+# a single batch; rows scrolled away before a worker reaches them are
+# skipped. Sorting permutes the index array with the precomputed sort keys.
+# Views should use fixed row heights and column widths: sizing to contents
+# makes Qt measure every row.
+
+# (header, QueryColumns field used for sorting)
+COLUMNS = (('Name', 'name'), ('No.', 'pokedex_number'), ('Type', 'type1'), ('Total', 'base_total'))
+ROW_HEIGHT = THUMBNAIL_SIZE + 4
+
+# data() runs for every role of every painted cell; looking the roles up on Qt
+# each time would cost more than the lookups they guard
+_DISPLAY = int(Qt.DisplayRole)
+_DECORATION = int(Qt.DecorationRole)
+_ALIGNMENT = int(Qt.TextAlignmentRole)
+_TOOLTIP = int(Qt.ToolTipRole)
+_RIGHT = int(Qt.AlignRight | Qt.AlignVCenter)
+
+
+def _number_text(value):
+    return str(int(value)) if np.isfinite(value) else ''
+
+
+class ResultsModel(QAbstractTableModel):
+    """Table model over the row positions of a search result.
+
+    Attributes:
+        rows: Row positions in display order; replaced, never modified.
+
+    Args:
+        records: DisplayTable of the dataset.
+        columns: QueryColumns of the same dataset version.
+        assets: AssetCache the thumbnails come from.
+        parent: Optional QObject parent.
+    """
+
+    # Emitted after sort() has reordered ``rows``
+    rows_sorted = Signal()
+
+    def __init__(self, records, columns, assets, parent=None):
+        super().__init__(parent)
+        self.records = records
+        self.columns = columns
+        self.assets = assets
+        self.rows = np.empty(0, dtype=np.intp)
+        self._blank = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        self._blank.fill(Qt.transparent)
+        # Entries painted without a thumbnail, sent to the pool after the paint
+        self._requested = []
+        self._request_timer = QTimer(self)
+        self._request_timer.setSingleShot(True)
+        self._request_timer.setInterval(0)
+        self._request_timer.timeout.connect(self._request_thumbnails)
+        assets.thumbnails_loaded.connect(self._thumbnails_loaded)
+
+    def set_dataset(self, records, columns):
+        """Switch to a reloaded dataset; clears the rows."""
+        self.beginResetModel()
+        self.records = records
+        self.columns = columns
+        self.rows = np.empty(0, dtype=np.intp)
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        """Show a new result, in the order given."""
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=_DISPLAY):
+        if role == _DISPLAY and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=_DISPLAY):
+        if role == _DISPLAY:
+            column = index.column()
+            row = self.rows[index.row()]
+            if column == 0:
+                return self.records[row].name
+            if column == 2:
+                return ' / '.join(self.records[row].types)
+            values = self.columns.numeric.get(COLUMNS[column][1])
+            return _number_text(values[row]) if values is not None else ''
+        if role == _DECORATION:
+            if index.column() != 0:
+                return None
+            record = self.records[self.rows[index.row()]]
+            pixmap = self.assets.thumbnail(record.name, record.image_content)
+            if pixmap is None:
+                self._requested.append((record.name, record.image_content))
+                if not self._request_timer.isActive():
+                    self._request_timer.start()
+                return self._blank
+            return pixmap
+        if role == _ALIGNMENT:
+            return _RIGHT if index.column() in (1, 3) else None
+        if role == _TOOLTIP:
+            return self.records[self.rows[index.row()]].title
+        return None
+
+    @timed('results.sort')
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Reorder ``rows`` by a column; ties keep their current order."""
+        if not 0 <= column < len(COLUMNS) or not len(self.rows):
+            return
+        key = self.columns.sort_key(COLUMNS[column][1])[self.rows]
+        if order == Qt.DescendingOrder:
+            key = -key
+        # NaN keys (missing numbers) sort last either way
+        permutation = np.argsort(key, kind='stable')
+        position = np.empty_like(permutation)
+        position[permutation] = np.arange(len(permutation))
+        self.layoutAboutToBeChanged.emit()
+        self.rows = self.rows[permutation]
+        # Keep the selection and current index on the same Pokémon
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(int(position[i.row()]), i.column()) for i in persistent])
+        self.layoutChanged.emit()
+        self.rows_sorted.emit()
+
+    def _request_thumbnails(self):
+        requested, self._requested = self._requested, []
+        self.assets.prefetch(requested, THUMBNAIL)
+
+    def _thumbnails_loaded(self):
+        if len(self.rows):
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.rows) - 1, 0), [Qt.DecorationRole])
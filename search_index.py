@@ -0,0 +1,352 @@
+import ast
+from collections import OrderedDict
+import numpy as np
+from instrumentation import timed
+
+# Inverted n-gram index for the Pokédex search box
+# Every distinct field value ("pikachu", "electric", "lightning rod", ...) is a
+# term. Terms are indexed by their 1-3 character grams, and each term maps to
+# the rows containing it, so a query touches only the terms that can match
+# instead of scanning whole columns.
+
+SEARCH_FIELDS = ('name', 'type1', 'type2', 'abilities', 'japanese_name')
+
+# Match classes, best first
+EXACT, PREFIX, SUBSTRING, FUZZY = 0, 1, 2, 3
+NO_MATCH = 255
+
+MAX_GRAM = 3
+# Narrow the previous result instead of hitting the index when it matched at
+# most this many terms
+NARROW_LIMIT = 512
+# Fuzzy matching is only tried for queries at least this long that match fewer
+# than FUZZY_BELOW terms outright, and only on this many of the best bigram
+# candidates
+FUZZY_MIN_LENGTH = 4
+FUZZY_BELOW = 8
+FUZZY_CANDIDATES = 64
+# Recent results kept per index; results are immutable so they can be shared
+RESULT_CACHE_SIZE = 128
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+def split_abilities(value):
+    """Turn the stringified list stored in the abilities column into a list."""
+    value = value.strip()
+    if not value:
+        return []
+    if value.startswith('['):
+        try:
+            return [str(a) for a in ast.literal_eval(value)]
+        except (ValueError, SyntaxError):
+            value = value.strip("[]")
+    return [a.strip(" '\"") for a in value.split(',') if a.strip(" '\"")]
+
+
+def _edit_distance(a, b):
+    # Levenshtein distance with Hyyrö's bit-parallel algorithm: one pass over
+    # ``b`` with a handful of integer operations per character.
+    m = len(a)
+    if not m:
+        return len(b)
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for c in b:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh = mh << 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+
+def _sorted_unique(values):
+    # np.unique without the overhead it carries on recent NumPy versions
+    values = np.sort(values)
+    if len(values) < 2:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+class SearchResult:
+    """Rows matching a query, best match first.
+
+    Attributes:
+        query: The normalised query string.
+        rows: Row positions into the indexed DataFrame.
+        ranks: Match class (EXACT, PREFIX, SUBSTRING, FUZZY) of each row.
+        terms: Ids of the non-fuzzy terms that matched, used for narrowing.
+    """
+
+    __slots__ = ('query', 'rows', 'ranks', 'terms')
+
+    def __init__(self, query, rows, ranks, terms):
+        self.query = query
+        self.rows = rows
+        self.ranks = ranks
+        self.terms = terms
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class SearchIndex:
+    """Inverted index over the searchable text fields of the dataset.
+
+    Args:
+        df: The dataset.
+        fields: Columns to index. ``abilities`` is split into single abilities.
+    """
+
+    def __init__(self, df, fields=SEARCH_FIELDS):
+        self.row_count = len(df)
+        term_ids = {}
+        term_rows = []
+        # row -> term ids, one list per field slot (abilities take several)
+        row_terms = []
+        for field in fields:
+            if field not in df.columns:
+                continue
+            per_row = []
+            for row, value in enumerate(df[field].tolist()):
+                ids = []
+                values = split_abilities(value) if field == 'abilities' else [value]
+                for term in values if isinstance(value, str) else ():
+                    term = term.lower().strip()
+                    if not term:
+                        continue
+                    tid = term_ids.get(term)
+                    if tid is None:
+                        tid = term_ids[term] = len(term_rows)
+                        term_rows.append([])
+                    if not term_rows[tid] or term_rows[tid][-1] != row:
+                        term_rows[tid].append(row)
+                    ids.append(tid)
+                per_row.append(ids)
+            width = max((len(ids) for ids in per_row), default=0)
+            for slot in range(width):
+                row_terms.append([ids[slot] if slot < len(ids) else -1 for ids in per_row])
+
+        self.terms = list(term_ids)
+        self.term_ids = term_ids
+        self.term_lengths = np.array([len(t) for t in self.terms], dtype=np.int32)
+
+        # term -> rows as CSR arrays, for selective queries
+        self.term_freq = np.array([len(r) for r in term_rows], dtype=np.int64)
+        self.row_indptr = np.zeros(len(term_rows) + 1, dtype=np.int64)
+        np.cumsum(self.term_freq, out=self.row_indptr[1:])
+        self.row_data = np.fromiter((r for rows in term_rows for r in rows), dtype=np.int32,
+                                    count=int(self.term_freq.sum()))
+
+        # row -> terms, one column per field slot, for broad queries. Gaps
+        # point at an extra sentinel term that never matches; mostly empty
+        # slots (a fourth ability, say) keep only their filled rows instead.
+        sentinel = len(self.terms)
+        self.row_term_columns = []
+        for col in row_terms:
+            col = np.array(col, dtype=np.intp)
+            filled = col >= 0
+            if filled.sum() * 4 >= len(col):
+                self.row_term_columns.append((None, np.where(filled, col, sentinel)))
+            else:
+                self.row_term_columns.append((np.flatnonzero(filled), col[filled]))
+        self.row_term_columns.sort(key=lambda c: c[0] is not None)
+        self._cache = OrderedDict()
+
+        # gram -> terms containing it, prefix -> terms starting with it
+        grams = {}
+        prefixes = {}
+        for tid, term in enumerate(self.terms):
+            seen = set()
+            for n in range(1, MAX_GRAM + 1):
+                for i in range(len(term) - n + 1):
+                    seen.add(term[i:i + n])
+                if len(term) >= n:
+                    prefixes.setdefault(term[:n], []).append(tid)
+            for gram in seen:
+                grams.setdefault(gram, []).append(tid)
+        self.grams = {g: np.array(t, dtype=np.intp) for g, t in grams.items()}
+        self.prefixes = {p: np.array(t, dtype=np.intp) for p, t in prefixes.items()}
+
+    def _substring_terms(self, query):
+        # Terms containing ``query``; exact for short queries, verified otherwise
+        if len(query) <= MAX_GRAM:
+            return self.grams.get(query, _EMPTY)
+        postings = sorted((self.grams.get(query[i:i + MAX_GRAM], _EMPTY)
+                           for i in range(len(query) - MAX_GRAM + 1)), key=len)
+        candidates = postings[0]
+        for other in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, other, assume_unique=True)
+        terms = self.terms
+        return np.array([t for t in candidates.tolist() if query in terms[t]], dtype=np.intp)
+
+    def _classify(self, query, term_ids):
+        # Pick the exact and prefix matches out of the substring matches
+        terms = self.terms
+        exact = self.term_ids.get(query)
+        exact_ids = np.array([exact], dtype=np.intp) if exact is not None else _EMPTY
+        if len(query) <= MAX_GRAM:
+            prefix_ids = self.prefixes.get(query, _EMPTY)
+        else:
+            prefix_ids = np.array([t for t in term_ids.tolist() if terms[t].startswith(query)], dtype=np.intp)
+        return exact_ids, prefix_ids
+
+    def _fuzzy_terms(self, query):
+        # Terms within one edit (two for long queries) of ``query``. Candidates
+        # must share enough bigrams with the query: one edit destroys at most two.
+        if len(query) < FUZZY_MIN_LENGTH:
+            return _EMPTY
+        max_edits = 1 if len(query) < 8 else 2
+        hits = [self.grams[g] for g in {query[i:i + 2] for i in range(len(query) - 1)} if g in self.grams]
+        if not hits:
+            return _EMPTY
+        need = max(1, len(query) - 1 - 2 * max_edits)
+        hits = np.concatenate(hits)
+        if len(hits) * 8 < len(self.terms):
+            hits = np.sort(hits)
+            starts = np.flatnonzero(np.concatenate(([True], hits[1:] != hits[:-1])))
+            candidates = hits[starts]
+            counts = np.diff(np.append(starts, len(hits)))
+        else:
+            counts = np.bincount(hits, minlength=len(self.terms))
+            candidates = np.flatnonzero(counts >= need)
+            counts = counts[candidates]
+        keep = (counts >= need) & (np.abs(self.term_lengths[candidates] - len(query)) <= max_edits)
+        candidates, counts = candidates[keep], counts[keep]
+        if len(candidates) > FUZZY_CANDIDATES:
+            candidates = candidates[np.argsort(-counts, kind='stable')[:FUZZY_CANDIDATES]]
+        terms = self.terms
+        return np.array([t for t in candidates.tolist()
+                         if query not in terms[t] and _edit_distance(query, terms[t]) <= max_edits],
+                        dtype=np.intp)
+
+    def _rows_of(self, term_ids):
+        # Gather the CSR row lists of several terms in one vectorized step
+        if not len(term_ids):
+            return _EMPTY
+        starts = self.row_indptr[term_ids]
+        lengths = self.term_freq[term_ids]
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.row_data[offsets + np.arange(len(offsets))]
+
+    def _rank_sparse(self, by_class):
+        # Few matching rows: gather them class by class, best first, skipping
+        # rows an earlier class already claimed
+        claimed = np.zeros(self.row_count, dtype=bool)
+        rows, ranks = [], []
+        for cls, ids in enumerate(by_class):
+            found = _sorted_unique(self._rows_of(ids))
+            found = found[~claimed[found]]
+            claimed[found] = True
+            rows.append(found)
+            ranks.append(np.full(len(found), cls, dtype=np.uint8))
+        return np.concatenate(rows).astype(np.int32, copy=False), np.concatenate(ranks)
+
+    def _rank_dense(self, by_class):
+        # Many matching rows: classify terms, then take the best class per row
+        term_class = np.full(len(self.terms) + 1, NO_MATCH, dtype=np.uint8)
+        for cls in (FUZZY, SUBSTRING, PREFIX, EXACT):
+            term_class[by_class[cls]] = cls
+        best = np.full(self.row_count, NO_MATCH, dtype=np.uint8)
+        for rows, column in self.row_term_columns:
+            if rows is None:
+                np.minimum(best, np.take(term_class, column), out=best)
+            else:
+                best[rows] = np.minimum(best[rows], np.take(term_class, column))
+        order = np.argsort(best, kind='stable')
+        ranks = best[order]
+        matched = int(np.searchsorted(ranks, NO_MATCH))
+        return order[:matched].astype(np.int32, copy=False), ranks[:matched]
+
+    @timed('search.text')
+    def search(self, query, previous=None):
+        """Find rows whose indexed fields match ``query``.
+
+        Args:
+            query: Free text; case and surrounding whitespace are ignored.
+            previous: Result of an earlier query that ``query`` extends. Its
+                matched terms are filtered instead of consulting the index.
+
+        Returns:
+            SearchResult ranked exact > prefix > substring > fuzzy, table order
+            within a class. An empty query matches every row in table order.
+        """
+        query = query.lower().strip()
+        cached = self._cache.get(query)
+        if cached is not None:
+            self._cache.move_to_end(query)
+            return cached
+        if not query:
+            rows = np.arange(self.row_count, dtype=np.int32)
+            result = SearchResult(query, rows, np.full(self.row_count, EXACT, dtype=np.uint8), None)
+        else:
+            result = self._search(query, previous)
+        self._cache[query] = result
+        if len(self._cache) > RESULT_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+    def clear_cache(self):
+        """Forget memoised results (the benchmarks use this to time cold queries)."""
+        self._cache.clear()
+
+    def _search(self, query, previous):
+        if (previous is not None and previous.terms is not None and previous.query
+                and query.startswith(previous.query) and len(previous.terms) <= NARROW_LIMIT):
+            terms = self.terms
+            substring_ids = np.array([t for t in previous.terms.tolist() if query in terms[t]], dtype=np.intp)
+        else:
+            substring_ids = self._substring_terms(query)
+        exact_ids, prefix_ids = self._classify(query, substring_ids)
+        # Typo tolerance is only worth its cost when few terms match outright
+        fuzzy_ids = self._fuzzy_terms(query) if len(substring_ids) < FUZZY_BELOW else _EMPTY
+        by_class = (exact_ids, prefix_ids, substring_ids, fuzzy_ids)
+
+        # Every term has at least one row, so many terms already means many rows
+        broad = ((len(substring_ids) + len(by_class[FUZZY])) * 8 >= self.row_count
+                 or sum(int(self.term_freq[ids].sum()) for ids in by_class[2:]) * 8 >= self.row_count)
+        rows, ranks = self._rank_dense(by_class) if broad else self._rank_sparse(by_class)
+        return SearchResult(query, rows, ranks, substring_ids)
+
+
+class IncrementalSearch:
+    """Search-as-you-type front end that reuses the previous result.
+
+    Args:
+        index: The SearchIndex to query.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.last = None
+
+    def search(self, query):
+        result = self.index.search(query, previous=self.last)
+        self.last = result
+        return result
+
+    def reset(self):
+        self.last = None
+
+
+def get_search_index(store):
+    """Return the SearchIndex for the store's current dataset version."""
+    return store.derived('search_index', SearchIndex)
@@ -0,0 +1,326 @@
+import os
+import sys
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+
+# "Similar Pokémon" nearest-neighbour index
+# Each row becomes a vector of its six base stats and its against_* resistance
+# multipliers, z-scored per column; each of the two blocks is scaled by
+# 1/sqrt(width) so the stats and the 18 resistances weigh the same. Neighbours
+# are the rows at the smallest Euclidean distance.
+# At the dataset's own size an exact search is one matrix-vector product. For
+# large (synthetic) datasets an inverted-file partition is added: rows are
+# clustered with k-means and a query only scans the rows of the ``probes``
+# clusters nearest to it. The partition is the expensive part to build, so it
+# is saved next to the compiled dataset cache, keyed by a digest of the vectors.
+
+FORMAT_VERSION = 1
+BASE_STATS = ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed')
+DEFAULT_K = 5
+
+# Datasets with at least this many rows get the approximate partition
+APPROXIMATE_MIN_ROWS = 20000
+# Rows sampled per cluster to train k-means, and its iterations
+TRAIN_PER_CELL = 40
+KMEANS_ITERATIONS = 12
+# Clusters scanned per approximate query unless the caller says otherwise
+DEFAULT_PROBES = 4
+# Rows per block when assigning every row to its cluster
+ASSIGN_CHUNK = 4096
+# Up to this many rows the TABLE_K nearest neighbours of every row are computed
+# once, so ``similar`` is a table lookup instead of a scan of every vector
+TABLE_MAX_ROWS = 4096
+TABLE_K = 16
+
+
+def feature_columns(df):
+    """Columns the similarity vectors are made of, in order."""
+    return [c for c in BASE_STATS if c in df.columns] + sorted(c for c in df.columns if c.startswith('against_'))
+
+
+def feature_matrix(df, columns=None):
+    """Normalised similarity vectors, one float32 row per Pokémon.
+
+    Missing values count as the column mean; constant columns contribute
+    nothing.
+    """
+    columns = feature_columns(df) if columns is None else columns
+    values = np.empty((len(df), len(columns)))
+    for j, column in enumerate(columns):
+        values[:, j] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        mean = np.nanmean(values, axis=0) if len(values) else np.zeros(len(columns))
+    mean = np.nan_to_num(mean)
+    values = np.where(np.isnan(values), mean, values) - mean
+    std = np.sqrt((values ** 2).mean(axis=0)) if len(values) else np.ones(len(columns))
+    values /= np.where(std > 0, std, 1.0)
+    stats = sum(c in BASE_STATS for c in columns)
+    if stats:
+        values[:, :stats] /= np.sqrt(stats)
+    if len(columns) > stats:
+        values[:, stats:] /= np.sqrt(len(columns) - stats)
+    return np.ascontiguousarray(values, dtype=np.float32)
+
+
+def _digest(vectors, columns):
+    digest = hashlib.sha256(f'{FORMAT_VERSION} {columns!r} {vectors.shape!r}'.encode())
+    digest.update(vectors.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _nearest(vectors, centroids):
+    # Index of the nearest centroid of every row, a block of rows at a time
+    norms = (centroids ** 2).sum(axis=1)
+    nearest = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        block = vectors[start:start + ASSIGN_CHUNK]
+        nearest[start:start + len(block)] = np.argmin(norms - 2 * block @ centroids.T, axis=1)
+    return nearest
+
+
+def kmeans(vectors, cells, iterations=KMEANS_ITERATIONS, seed=0):
+    """Lloyd's k-means on a sample of ``vectors``.
+
+    Returns:
+        (cells, d) float32 array of centroids.
+    """
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > cells * TRAIN_PER_CELL:
+        sample = vectors[rng.choice(len(vectors), cells * TRAIN_PER_CELL, replace=False)]
+    centroids = sample[rng.choice(len(sample), cells, replace=False)].copy()
+    for _ in range(iterations):
+        assigned = _nearest(sample, centroids)
+        counts = np.bincount(assigned, minlength=cells)
+        for j in range(sample.shape[1]):
+            centroids[:, j] = np.bincount(assigned, sample[:, j], minlength=cells)
+        empty = counts == 0
+        centroids[~empty] /= counts[~empty, None]
+        # Reseed empty clusters on random sample rows
+        centroids[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+    return centroids
+
+
+class Partition:
+    """Inverted-file partition of the vectors for approximate queries.
+
+    Attributes:
+        centroids: (cells, d) cluster centres.
+        centroid_norms: Their squared norms.
+        assigned: Cluster of every row.
+        order: Row positions sorted by cluster.
+        offsets: Cluster ``c`` holds ``order[offsets[c]:offsets[c + 1]]``.
+        vectors: The vectors in ``order``, so a cluster is a contiguous block.
+        norms: Squared norms of ``vectors``.
+    """
+
+    __slots__ = ('centroids', 'centroid_norms', 'assigned', 'order', 'offsets', 'vectors', 'norms')
+
+    def __init__(self, vectors, centroids, assigned):
+        self.centroids = centroids
+        self.centroid_norms = (centroids ** 2).sum(axis=1)
+        self.assigned = assigned
+        self.order = np.argsort(assigned, kind='stable')
+        self.offsets = np.zeros(len(centroids) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(assigned, minlength=len(centroids)), out=self.offsets[1:])
+        self.vectors = vectors[self.order]
+        self.norms = (self.vectors ** 2).sum(axis=1)
+
+    @classmethod
+    def build(cls, vectors, cells=None):
+        """Cluster ``vectors`` into ``cells`` clusters (default sqrt of the row count)."""
+        cells = cells or max(1, int(np.sqrt(len(vectors))))
+        centroids = kmeans(vectors, min(cells, len(vectors)))
+        return cls(vectors, centroids, _nearest(vectors, centroids))
+
+    def candidates(self, query, probes):
+        """Positions into ``vectors`` of the rows in the ``probes`` nearest clusters."""
+        distances = self.centroid_norms - 2 * self.centroids @ query
+        probes = min(probes, len(distances))
+        nearest = np.argpartition(distances, probes - 1)[:probes]
+        return np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in nearest])
+
+
+def _top(distances, k):
+    # Positions of the k smallest distances, nearest first
+    if k < len(distances):
+        top = np.argpartition(distances, k - 1)[:k]
+    else:
+        top = np.arange(len(distances))
+    return top[np.argsort(distances[top], kind='stable')]
+
+
+class SimilarityIndex:
+    """Nearest neighbours over the stat and resistance vectors of the dataset.
+
+    Args:
+        df: The dataset.
+        approximate: Build the inverted-file partition; by default only for
+            datasets of at least APPROXIMATE_MIN_ROWS rows.
+        partition: A Partition of these vectors to reuse instead of building one.
+    """
+
+    def __init__(self, df, approximate=None, partition=None):
+        self.columns = feature_columns(df)
+        self.vectors = feature_matrix(df, self.columns)
+        self.norms = (self.vectors ** 2).sum(axis=1)
+        self.row_count = len(df)
+        if approximate is None:
+            approximate = self.row_count >= APPROXIMATE_MIN_ROWS
+        if partition is None and approximate and self.row_count:
+            partition = Partition.build(self.vectors)
+        self.partition = partition
+        self._table = None
+
+    def digest(self):
+        """Hex digest of the vectors, used to key the saved partition."""
+        return _digest(self.vectors, self.columns)
+
+    def query(self, vector, k=DEFAULT_K, exclude=None, exact=None, probes=DEFAULT_PROBES):
+        """The ``k`` rows nearest to ``vector``.
+
+        Args:
+            vector: Normalised query vector (see ``feature_matrix``).
+            k: Number of neighbours.
+            exclude: Row position to leave out, e.g. the query's own row.
+            exact: Scan every row; by default only when there is no partition.
+            probes: Clusters scanned by an approximate query.
+
+        Returns:
+            (rows, distances), nearest first.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        if exact is None:
+            exact = self.partition is None
+        if not exact and self.partition is not None:
+            part = self.partition
+            positions = part.candidates(vector, probes)
+            rows = part.order[positions]
+            distances = part.norms[positions] - 2 * part.vectors[positions] @ vector
+            if exclude is not None:
+                distances[rows == exclude] = np.inf
+            if len(rows) - (exclude is not None) >= k:
+                top = _top(distances, k)
+                return rows[top], np.sqrt(np.maximum(distances[top] + vector @ vector, 0))
+        distances = self.norms - 2 * self.vectors @ vector
+        if exclude is not None:
+            distances[exclude] = np.inf
+        top = _top(distances, min(k, self.row_count - (exclude is not None)))
+        return top, np.sqrt(np.maximum(distances[top] + vector @ vector, 0))
+
+    def similar(self, row, k=DEFAULT_K, **options):
+        """The ``k`` rows most similar to ``row``, itself excluded; see ``query``."""
+        if not options and k <= TABLE_K and self.row_count <= TABLE_MAX_ROWS:
+            rows, distances = self.neighbour_table()
+            return rows[row, :k], distances[row, :k]
+        return self.query(self.vectors[row], k, exclude=row, **options)
+
+    def neighbour_table(self):
+        """The TABLE_K nearest neighbours of every row, computed on first use.
+
+        Returns:
+            (rows, distances) arrays of shape (row_count, min(TABLE_K, row_count - 1)).
+        """
+        table = self._table
+        if table is None:
+            k = min(TABLE_K, self.row_count - 1)
+            rows = np.empty((self.row_count, max(k, 0)), dtype=np.intp)
+            distances = np.empty(rows.shape, dtype=np.float32)
+            for start in range(0, self.row_count if k > 0 else 0, ASSIGN_CHUNK):
+                block = self.vectors[start:start + ASSIGN_CHUNK]
+                squared = self.norms - 2 * block @ self.vectors.T + self.norms[start:start + len(block), None]
+                squared[np.arange(len(block)), np.arange(start, start + len(block))] = np.inf
+                top = np.argpartition(squared, k - 1, axis=1)[:, :k] if k < self.row_count else \
+                    np.argsort(squared, axis=1)[:, :k]
+                nearest = np.take_along_axis(squared, top, axis=1)
+                order = np.argsort(nearest, axis=1, kind='stable')
+                rows[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+                distances[start:start + len(block)] = np.sqrt(np.maximum(np.take_along_axis(nearest, order, axis=1), 0))
+            table = self._table = (rows, distances)
+        return table
+
+    def save(self, path):
+        """Write the partition to ``path`` (.npz), if there is one."""
+        if self.partition is None:
+            return
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, digest=self.digest(), centroids=self.partition.centroids,
+                 assigned=self.partition.assigned)
+        os.replace(tmp_path, path)
+
+    def load_partition(self, path):
+        """Use the partition saved at ``path``.
+
+        Returns:
+            False if the file is missing or was saved for other data.
+        """
+        try:
+            with np.load(path) as saved:
+                if str(saved['digest']) != self.digest():
+                    return False
+                self.partition = Partition(self.vectors, saved['centroids'], saved['assigned'])
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, f'similarity-{digest}.npz')
+
+
+def load_or_build(df, cache_dir=None):
+    """SimilarityIndex of ``df``, reusing or saving its partition in ``cache_dir``.
+
+    Datasets below APPROXIMATE_MIN_ROWS have no partition, so nothing is read
+    or written for them.
+    """
+    index = SimilarityIndex(df, approximate=False)
+    if len(df) < APPROXIMATE_MIN_ROWS:
+        if len(df) <= TABLE_MAX_ROWS:
+            index.neighbour_table()
+        return index
+    path = _cache_path(cache_dir, index.digest()) if cache_dir else None
+    if path and index.load_partition(path):
+        return index
+    index.partition = Partition.build(index.vectors)
+    if path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            index.save(path)
+            # Drop partitions of other data
+            for entry in os.listdir(cache_dir):
+                if entry.startswith('similarity-') and os.path.join(cache_dir, entry) != path:
+                    os.remove(os.path.join(cache_dir, entry))
+        except OSError:
+            pass
+    return index
+
+
+def get_similarity_index(store):
+    """Return the SimilarityIndex for the store's current dataset version."""
+    return store.derived('similarity_index', lambda df: load_or_build(df, store.cache_dir))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List the Pokémon most similar to one, by stats and resistances.')
+    parser.add_argument('name', help='Pokémon name, e.g. Garchomp')
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help='number of similar Pokémon')
+    args = parser.parse_args(argv)
+
+    from data_store import get_store
+    store = get_store()
+    row = store.name_index().get(args.name.lower())
+    if row is None:
+        print(f'No Pokémon named {args.name!r}', file=sys.stderr)
+        return 2
+    rows, distances = get_similarity_index(store).similar(row, args.k)
+    names = store.df['name'].to_numpy()
+    for r, d in zip(rows, distances):
+        print(f'{names[r]:<20} {d:6.3f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
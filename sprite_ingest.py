@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import textwrap
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PySide6.QtGui import QImage
+from PySide6.QtCore import Qt
+from asset_pack import BASE_DIR, NODATA, asset_name, collect_sources, get_asset_pack, image_key
+
+# Pre-sized sprite variants
+# Entry images are contributed at whatever size they come in (the crawled
+# ones are 1200x1200), and scaling one down took longer than everything else
+# show_entry does. ``python sprite_ingest.py build`` decodes every image
+# under pokemon_image/ (and nodata.svg) once, in a process pool, and writes
+# it scaled to each size the app shows, at 1x and 2x for HiDPI screens:
+#     .sprite_cache/<pixels>/<digest>.png
+# where <digest> hashes the source file. manifest.json maps each source to
+# its digest, its size, its modification time and its variants; a source
+# whose digest is in the previous manifest with all its files present is not
+# decoded again. Files that are no image, or too small or too large to be
+# one, are listed as invalid and the Pokédex shows nodata.svg for them
+# instead.
+# load_image() in asset_cache.py reads a variant when the manifest has one
+# for the source as it is now (same byte size and, for a loose file, same
+# mtime) and scales the source itself otherwise, so images added or replaced
+# since the last build still show up.
+# ``python sprite_ingest.py missing`` lists the dataset rows without an image.
+
+FORMAT_VERSION = 2
+SPRITE_DIR_NAME = '.sprite_cache'
+DEFAULT_SPRITE_DIR = os.path.join(BASE_DIR, SPRITE_DIR_NAME)
+MANIFEST_NAME = 'manifest.json'
+
+DETAIL_SIZE = 195                 # entry image, fitted into this square
+THUMBNAIL_SIZE = 32               # results list
+SIZES = (DETAIL_SIZE, THUMBNAIL_SIZE)
+DPRS = (1, 2)
+# Sources outside these bounds are rejected
+MAX_SOURCE_BYTES = 16 * 1024 * 1024
+MIN_SIDE = 16
+MAX_SIDE = 8192
+
+SOURCE_DIR = 'pokemon_image'
+
+
+def variant_pixels(sizes=SIZES, dprs=DPRS):
+    """Side lengths of the variants written per source, largest first."""
+    return sorted({round(size * dpr) for size in sizes for dpr in dprs}, reverse=True)
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _variant_name(pixels, digest):
+    return asset_name(SPRITE_DIR_NAME, str(pixels), f'{digest}.png')
+
+
+def _image_format(name):
+    return os.path.splitext(name)[1][1:].upper() or None
+
+
+def _render(job):
+    # Runs in a pool process: decode, check and write every variant of one source
+    name, path, digest, base_dir, pixel_sizes = job
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return name, digest, None, f'cannot be read ({e.strerror})'
+    image = QImage.fromData(data, _image_format(name))
+    if image.isNull():
+        return name, digest, None, 'not a decodable image'
+    width, height = image.width(), image.height()
+    if min(width, height) < MIN_SIDE or max(width, height) > MAX_SIDE:
+        return name, digest, None, f'{width}x{height} pixels is outside {MIN_SIDE}..{MAX_SIDE}'
+    variants = {}
+    for pixels in pixel_sizes:
+        # Scaled from the source each time rather than from the previous
+        # variant, which would blur the small ones
+        scaled = image.scaled(pixels, pixels, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        variant = _variant_name(pixels, digest)
+        out_path = os.path.join(base_dir, variant)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        tmp_path = out_path + '.tmp'
+        if not scaled.save(tmp_path, 'PNG'):
+            return name, digest, None, f'could not write {variant}'
+        os.replace(tmp_path, out_path)
+        variants[str(pixels)] = variant
+    return name, digest, {'width': width, 'height': height, 'variants': variants}, None
+
+
+def read_manifest(sprite_dir=DEFAULT_SPRITE_DIR):
+    """The manifest written by ``ingest``, or None if there is no usable one."""
+    try:
+        with open(os.path.join(sprite_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == FORMAT_VERSION else None
+
+
+def _write_manifest(sprite_dir, manifest):
+    os.makedirs(sprite_dir, exist_ok=True)
+    path = os.path.join(sprite_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _prune(base_dir, sprite_dir, keep):
+    # Variants no source refers to any more
+    removed = 0
+    for dirpath, _dirnames, filenames in os.walk(sprite_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = asset_name(os.path.relpath(path, base_dir))
+            if filename != MANIFEST_NAME and name not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def ingest(base_dir=BASE_DIR, workers=None, force=False):
+    """Write the sprite variants of every source image that changed.
+
+    Args:
+        base_dir: Repository root; sources are read from and variants written
+            under it.
+        workers: Pool processes; defaults to the CPU count.
+        force: Decode every source, even those the manifest already covers.
+
+    Returns:
+        Dict with the numbers of sources, rendered and reused sources,
+        invalid sources and removed files, and the elapsed seconds.
+    """
+    start = time.perf_counter()
+    sprite_dir = os.path.join(base_dir, SPRITE_DIR_NAME)
+    sources = {name: path for name, path in collect_sources(base_dir).items()
+               if name.startswith(SOURCE_DIR + '/') or name == NODATA}
+    previous = None if force else read_manifest(sprite_dir)
+    done = {}
+    if previous is not None:
+        # Reusable work by digest, so renamed and duplicated images count too
+        for entry in previous['sources'].values():
+            if all(os.path.exists(os.path.join(base_dir, v)) for v in entry['variants'].values()):
+                done[entry['digest']] = entry
+        for entry in previous.get('invalid', {}).values():
+            done.setdefault(entry['digest'], entry)
+
+    pixel_sizes = variant_pixels()
+    wanted = {str(p) for p in pixel_sizes}
+    entries = {}
+    invalid = {}
+    jobs = {}
+    reused_count = 0
+    for name, path in sorted(sources.items()):
+        with open(path, 'rb') as f:
+            data = f.read()
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        digest = _digest(data)
+        if len(data) > MAX_SOURCE_BYTES:
+            invalid[name] = {'digest': digest, 'bytes': len(data), 'mtime_ns': mtime_ns,
+                             'reason': f'larger than {MAX_SOURCE_BYTES // (1024 * 1024)} MB'}
+            continue
+        reused = done.get(digest)
+        if reused is not None and ('reason' in reused or set(reused['variants']) == wanted):
+            target = invalid if 'reason' in reused else entries
+            target[name] = dict(reused, bytes=len(data), mtime_ns=mtime_ns)
+            reused_count += target is entries
+            continue
+        entries[name] = {'digest': digest, 'bytes': len(data), 'mtime_ns': mtime_ns}
+        jobs.setdefault(digest, (name, path, digest, base_dir, pixel_sizes))
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    if len(jobs) > 1 and workers > 1:
+        with ProcessPoolExecutor(min(workers, len(jobs)), mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(_render, jobs.values(), chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        results = [_render(job) for job in jobs.values()]
+    rendered = {digest: (info, reason) for _name, digest, info, reason in results}
+
+    for name in [n for n, e in entries.items() if e['digest'] in rendered]:
+        info, reason = rendered[entries[name]['digest']]
+        if reason is not None:
+            invalid[name] = dict(entries.pop(name), reason=reason)
+        else:
+            entries[name].update(info)
+
+    keep = {v for entry in entries.values() for v in entry['variants'].values()}
+    removed = _prune(base_dir, sprite_dir, keep) if os.path.isdir(sprite_dir) else 0
+    _write_manifest(sprite_dir, {'format': FORMAT_VERSION, 'sizes': list(SIZES), 'dprs': list(DPRS),
+                                 'sources': entries, 'invalid': invalid})
+    return {'sources': len(sources), 'rendered': len(jobs), 'reused': reused_count, 'invalid': invalid,
+            'removed': removed, 'workers': workers, 'seconds': time.perf_counter() - start}
+
+
+class SpriteIndex:
+    """Lookup of the pre-sized variants listed in the manifest.
+
+    Args:
+        sprite_dir: Directory the manifest is in.
+        pack: AssetPack the sources and variants are read through.
+    """
+
+    def __init__(self, sprite_dir=DEFAULT_SPRITE_DIR, pack=None):
+        self.pack = pack if pack is not None else get_asset_pack()
+        manifest = read_manifest(sprite_dir) or {'sources': {}, 'invalid': {}}
+        self.sources = manifest['sources']
+        self.invalid = manifest['invalid']
+
+    def __len__(self):
+        return len(self.sources)
+
+    def variant(self, key, size, dpr=1):
+        """Asset name of ``key`` scaled to fit ``size`` at ``dpr``, or None.
+
+        None means the source has to be scaled by the caller: there is no
+        such variant, or the source changed since the manifest was written.
+        A loose source counts as changed if its size or mtime differs; a
+        packed one, which has no mtime, only if its size does, as the pack
+        is built from the same files after ingest. Rejected sources get the
+        nodata.svg variant.
+        """
+        entry = self.sources.get(key)
+        if entry is None:
+            rejected = self.invalid.get(key)
+            if rejected is None or not self._current(key, rejected):
+                return None
+            entry = self.sources.get(NODATA)
+            if entry is None:
+                return None
+        elif not self._current(key, entry):
+            return None
+        return entry['variants'].get(str(round(size * dpr)))
+
+    def _current(self, key, entry):
+        if self.pack.size(key) != entry.get('bytes'):
+            return False
+        mtime_ns = self.pack.mtime_ns(key)
+        return mtime_ns is None or mtime_ns == entry.get('mtime_ns')
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_sprite_index():
+    """Return the process-wide SpriteIndex, reading the manifest on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SpriteIndex()
+    return _index
+
+
+def missing_images(df, pack=None):
+    """Rows that show nodata.svg, by reason.
+
+    Returns:
+        Dict of reason -> list of names: no image_content in the dataset, no
+        file at the path it points to, or a file that ingest rejected.
+    """
+    pack = pack if pack is not None else get_asset_pack()
+    manifest = read_manifest() or {'invalid': {}}
+    reasons = {'no image in the dataset': [], 'image file not found': [], 'image file rejected': []}
+    for name, content in zip(df['name'], df['image_content'] if 'image_content' in df.columns else [''] * len(df)):
+        name = name if isinstance(name, str) else ''
+        content = content if isinstance(content, str) else ''
+        key = image_key(name, content, pack)
+        if not content:
+            reasons['no image in the dataset'].append(name)
+        elif key == NODATA:
+            reasons['image file not found'].append(name)
+        elif key in manifest['invalid']:
+            reasons['image file rejected'].append(name)
+    return reasons
+
+
+def _print_missing(limit):
+    from data_store import get_store
+    reasons = missing_images(get_store().df)
+    total = sum(len(names) for names in reasons.values())
+    print(f'{total} rows have no image')
+    for reason, names in reasons.items():
+        if names:
+            shown = names if not limit else names[:limit]
+            more = f', ... ({len(names) - len(shown)} more)' if len(shown) < len(names) else ''
+            print(f'  {reason}: {len(names)}')
+            print(textwrap.fill(', '.join(shown) + more, width=100, initial_indent='    ',
+                                subsequent_indent='    '))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write pre-sized entry image variants, or list missing images.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help='decode new or changed images and write their variants')
+    build_cmd.add_argument('--base-dir', default=BASE_DIR, help='repository root')
+    build_cmd.add_argument('--workers', type=int, default=None, help='pool processes (default: CPU count)')
+    build_cmd.add_argument('--force', action='store_true', help='decode every image again')
+    missing_cmd = sub.add_parser('missing', help='list dataset rows without an image')
+    missing_cmd.add_argument('--limit', type=int, default=20, help='names shown per reason (0 for all)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        stats = ingest(args.base_dir, args.workers, args.force)
+        print(f"{stats['sources']} images: {stats['rendered']} decoded with {stats['workers']} workers, "
+              f"{stats['reused']} unchanged, {len(stats['invalid'])} rejected, "
+              f"{stats['removed']} stale files removed, in {stats['seconds']:.1f} s")
+        for name, entry in sorted(stats['invalid'].items()):
+            print(f"  rejected {name}: {entry['reason']}")
+    elif args.command == 'missing':
+        _print_missing(args.limit)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,416 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from queue import Empty
+import numpy as np
+from damage import TYPE_MATRIX, against_columns, all_types, type_index
+
+# Team builder: search for the 6-member team with the best type coverage
+# Each Pokémon becomes four 18-bit masks over all_types:
+#   offense - types its STAB moves hit super-effectively (from type_chart)
+#   resist  - attack types it takes <= 0.5x from (its against_* columns)
+#   immune  - attack types it takes 0x from
+#   weak    - attack types it takes >= 2x from
+# A team is scored from the OR of its members' masks plus "two or more" masks
+# for resists and weaknesses. Pokémon with identical masks are interchangeable,
+# so the search runs over distinct profiles: branch and bound with an
+# optimistic bound (the best possible gains of the remaining picks), fanned out
+# over a process pool, streaming each better team as soon as it is found.
+
+TEAM_SIZE = 6
+
+# Score weights
+OFFENSE_WEIGHT = 3      # per type the team hits super-effectively
+RESIST_WEIGHT = 2       # per attack type at least one member resists
+DEPTH_WEIGHT = 1        # per attack type two or more members resist
+IMMUNE_WEIGHT = 1       # per attack type some member is immune to
+STACKED_WEAKNESS = 3    # per type two or more members are weak to and nobody resists
+OPEN_WEAKNESS = 1       # per type some member is weak to and nobody resists
+
+# Search nodes between checks of the shared best score, stop flag and clock
+CHECK_INTERVAL = 256
+
+# Popcount of every 18-bit mask
+_POPCOUNT = np.zeros(1 << len(all_types), dtype=np.int64)
+for _bit in range(len(all_types)):
+    _POPCOUNT[1 << _bit:2 << _bit] = _POPCOUNT[:1 << _bit] + 1
+
+
+def _popcount(x):
+    return int(_POPCOUNT[x])
+
+
+def encode_profiles(df):
+    """Return an (N, 4) int64 array of offense, resist, immune and weak masks."""
+    bits = 1 << np.arange(len(all_types), dtype=np.int64)
+    masks = np.zeros((len(df), 4), dtype=np.int64)
+    for t, col in against_columns(df).items():
+        values = df[col].to_numpy(dtype=np.float64)
+        masks[values <= 0.5, 1] |= bits[t]
+        masks[values == 0, 2] |= bits[t]
+        masks[values >= 2, 3] |= bits[t]
+    # Offense: OR of the super-effective rows of both types; NO_TYPE hits nothing
+    super_effective = np.append((TYPE_MATRIX >= 2).astype(np.int64) @ bits, 0)
+    type1 = np.array([type_index(t) for t in df['type1']], dtype=np.intp)
+    type2 = np.array([type_index(t) for t in df['type2']], dtype=np.intp)
+    masks[:, 0] = super_effective[type1] | super_effective[type2]
+    return masks
+
+
+# A team state is (offense, resist, resist2, immune, weak, weak2), where the
+# "2" masks hold types covered by two or more members
+EMPTY_STATE = (0, 0, 0, 0, 0, 0)
+
+
+def add_member(state, offense, resist, immune, weak):
+    o, r1, r2, i, w1, w2 = state
+    return o | offense, r1 | resist, r2 | (r1 & resist), i | immune, w1 | weak, w2 | (w1 & weak)
+
+
+def team_score(state):
+    o, r1, r2, i, w1, w2 = state
+    open_ = ~r1
+    return (OFFENSE_WEIGHT * _popcount(o) + RESIST_WEIGHT * _popcount(r1) + DEPTH_WEIGHT * _popcount(r2)
+            + IMMUNE_WEIGHT * _popcount(i) - STACKED_WEAKNESS * _popcount(w2 & open_)
+            - OPEN_WEAKNESS * _popcount(w1 & open_))
+
+
+def _scores_with(state, o, r, i, w):
+    # team_score(add_member(state, ...)) for arrays of candidate masks
+    so, r1, r2, si, w1, w2 = state
+    n_r1 = r1 | r
+    open_ = ~n_r1
+    return (OFFENSE_WEIGHT * _POPCOUNT[so | o] + RESIST_WEIGHT * _POPCOUNT[n_r1]
+            + DEPTH_WEIGHT * _POPCOUNT[r2 | (r1 & r)] + IMMUNE_WEIGHT * _POPCOUNT[si | i]
+            - STACKED_WEAKNESS * _POPCOUNT[(w2 | (w1 & w)) & open_] - OPEN_WEAKNESS * _POPCOUNT[(w1 | w) & open_])
+
+
+def _optimistic_gains(state, o, r, i):
+    # Upper bound on what adding each candidate can gain, even after other
+    # additions: every new bit counted, new weaknesses ignored
+    so, r1, r2, si, w1, w2 = state
+    fresh = r & ~r1
+    return (OFFENSE_WEIGHT * _POPCOUNT[o & ~so] + RESIST_WEIGHT * _POPCOUNT[fresh]
+            + DEPTH_WEIGHT * _POPCOUNT[r & ~r2] + IMMUNE_WEIGHT * _POPCOUNT[i & ~si]
+            + STACKED_WEAKNESS * _POPCOUNT[fresh & w2] + OPEN_WEAKNESS * _POPCOUNT[fresh & w1])
+
+
+class TeamResult:
+    """One team found by the search.
+
+    Attributes:
+        score: Team score (see the weights at the top of the module).
+        rows: Dataset row positions of the members.
+        names: Member names.
+        offense: Types the team hits super-effectively.
+        resisted: Attack types at least one member resists.
+        stacked: Attack types two or more members are weak to and nobody resists.
+        elapsed: Seconds since the search started.
+    """
+
+    __slots__ = ('score', 'rows', 'names', 'offense', 'resisted', 'stacked', 'elapsed')
+
+    def __init__(self, score, rows, names, offense, resisted, stacked, elapsed):
+        self.score = score
+        self.rows = rows
+        self.names = names
+        self.offense = offense
+        self.resisted = resisted
+        self.stacked = stacked
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f'TeamResult(score={self.score}, names={self.names})'
+
+
+def _mask_names(mask):
+    return [t for i, t in enumerate(all_types) if mask >> i & 1]
+
+
+class TeamProblem:
+    """Candidate profiles for one search, after filtering and deduplication.
+
+    Args:
+        df: The dataset.
+        generations: Allowed generations, or None for all.
+        allow_legendary: Whether legendary Pokémon may be picked.
+        required: Names that must be on the team.
+        size: Team size.
+
+    Raises:
+        ValueError: For unknown or too many required members.
+    """
+
+    def __init__(self, df, generations=None, allow_legendary=True, required=(), size=TEAM_SIZE):
+        self.df = df
+        self.size = size
+        self.masks = masks = encode_profiles(df)
+        lookup = {n: i for i, n in enumerate(df['name'].str.lower())}
+        self.required = []
+        for name in required:
+            row = lookup.get(name.strip().lower())
+            if row is None:
+                raise ValueError(f'Unknown Pokémon: {name}')
+            self.required.append(row)
+        if len(self.required) > size:
+            raise ValueError(f'At most {size} required members')
+        self.slots = size - len(self.required)
+
+        eligible = np.ones(len(df), dtype=bool)
+        if generations:
+            eligible &= np.isin(df['generation'].to_numpy(), list(generations))
+        if not allow_legendary:
+            eligible &= df['is_legendary'].to_numpy() == 0
+        eligible[self.required] = False
+
+        # Group interchangeable rows, strongest (base_total) first in each group
+        order = np.argsort(-df['base_total'].to_numpy(), kind='stable')
+        groups = {}
+        for row in order[eligible[order]]:
+            groups.setdefault(tuple(masks[row].tolist()), []).append(int(row))
+
+        # Drop profiles that another, plentiful enough profile beats on every mask
+        def beats(q, p):
+            return ((p[0] & ~q[0]) | (p[1] & ~q[1]) | (p[2] & ~q[2]) | (q[3] & ~p[3])) == 0
+
+        kept = [p for p in groups
+                if not any(q != p and len(groups[q]) >= self.slots and beats(q, p) for q in groups)]
+        # Strong profiles first, so good teams turn up early and later suffixes bound tightly
+        kept.sort(key=lambda p: -team_score(add_member(EMPTY_STATE, *p)))
+        self.profiles = np.array(kept, dtype=np.int64).reshape(-1, 4)
+        self.rows = [groups[p] for p in kept]
+        self.counts = np.array([len(r) for r in self.rows], dtype=np.int64)
+
+        state = EMPTY_STATE
+        for row in self.required:
+            state = add_member(state, *masks[row].tolist())
+        self.base = state
+
+    def team_result(self, score, picks, started):
+        """Build a TeamResult from profile indices picked by the search."""
+        used = {}
+        rows = list(self.required)
+        for g in picks:
+            k = used.get(g, 0)
+            rows.append(self.rows[g][k])
+            used[g] = k + 1
+        state = EMPTY_STATE
+        for row in rows:
+            state = add_member(state, *self.masks[row].tolist())
+        names = self.df['name'].to_numpy()[rows].tolist()
+        return TeamResult(score, rows, names, _mask_names(state[0]), _mask_names(state[1]),
+                          _mask_names(state[5] & ~state[1]), time.monotonic() - started)
+
+
+def greedy_team(problem):
+    """Fill the free slots one at a time with the best-scoring addition.
+
+    Returns:
+        (score, picks) with picks as profile indices.
+    """
+    state = problem.base
+    left = problem.counts.copy()
+    o, r, i, w = problem.profiles.T
+    picks = []
+    for _ in range(problem.slots):
+        if not len(left) or left.max() == 0:
+            break
+        scores = np.where(left > 0, _scores_with(state, o, r, i, w), np.iinfo(np.int64).min)
+        g = int(np.argmax(scores))
+        left[g] -= 1
+        picks.append(g)
+        state = add_member(state, *problem.profiles[g].tolist())
+    return team_score(state), picks
+
+
+# Worker-side search state, set once per process by _init_worker
+_worker = {}
+
+
+def _init_worker(profiles, counts, base, slots, shared_best, stop, improvements, deadline):
+    _worker.update(profiles=profiles, counts=counts, base=base, slots=slots, shared_best=shared_best,
+                   stop=stop, improvements=improvements, deadline=deadline)
+
+
+def _search_subtree(first):
+    """Branch and bound over the teams whose first free pick is profile ``first``.
+
+    Picks are non-decreasing profile indices, so every team is visited once.
+
+    Returns:
+        (first, nodes visited, whether the search was cut short)
+    """
+    w = _worker
+    profiles, counts, slots = w['profiles'], w['counts'], w['slots']
+    shared_best, stop, improvements, deadline = w['shared_best'], w['stop'], w['improvements'], w['deadline']
+    o, r, i, wk = (np.ascontiguousarray(c) for c in profiles.T)
+    repeats = np.minimum(counts, slots)
+    n = len(profiles)
+    best = shared_best.value
+    nodes = 0
+    stopped = False
+    picks = [first]
+    used = np.zeros(n, dtype=np.int64)
+    used[first] = 1
+
+    def report(score, team):
+        nonlocal best
+        with shared_best.get_lock():
+            if score > shared_best.value:
+                shared_best.value = score
+                improvements.put((score, team))
+            best = shared_best.value
+
+    def visit(start, state, left):
+        nonlocal best, nodes, stopped
+        nodes += 1
+        if nodes % CHECK_INTERVAL == 0:
+            best = max(best, shared_best.value)
+            if stop.value or time.monotonic() > deadline:
+                stopped = True
+        if stopped:
+            return
+        if left == 0:
+            score = team_score(state)
+            if score > best:
+                report(score, list(picks))
+            return
+        available = counts[start:] > used[start:]
+        if left == 1:
+            # Last pick: score every candidate at once
+            scores = _scores_with(state, o[start:], r[start:], i[start:], wk[start:])
+            scores[~available] = np.iinfo(np.int64).min
+            g = int(np.argmax(scores))
+            if scores[g] > best:
+                report(int(scores[g]), picks + [start + g])
+            return
+        gains = _optimistic_gains(state, o[start:], r[start:], i[start:])
+        gains = np.repeat(gains, repeats[start:] - np.minimum(used[start:], repeats[start:]))
+        if len(gains) > left:
+            gains = np.partition(gains, len(gains) - left)[-left:]
+        if team_score(state) + int(gains.sum()) <= best:
+            return
+        for g in np.flatnonzero(available) + start:
+            g = int(g)
+            used[g] += 1
+            picks.append(g)
+            visit(g, add_member(state, *profiles[g].tolist()), left - 1)
+            picks.pop()
+            used[g] -= 1
+            if stopped:
+                return
+
+    visit(first, add_member(w['base'], *profiles[first].tolist()), slots - 1)
+    return first, nodes, stopped
+
+
+def search_teams(df, generations=None, allow_legendary=True, required=(), size=TEAM_SIZE,
+                 workers=None, time_limit=30.0, poll_interval=0.1, cancelled=None):
+    """Search for the best-covering team, yielding each improvement.
+
+    The first result comes from a greedy pass and arrives at once; the branch
+    and bound search then yields strictly better teams as workers find them.
+    The last team yielded is optimal unless the time limit cut the search
+    short. Closing the generator stops the workers.
+
+    Args:
+        df: The dataset.
+        generations: Allowed generations, or None for all.
+        allow_legendary: Whether legendary Pokémon may be picked.
+        required: Names that must be on the team.
+        size: Team size.
+        workers: Worker processes; None for one per CPU, 0 to search in-process.
+        time_limit: Seconds before the search stops trying to improve.
+        poll_interval: Seconds between checks for worker progress.
+        cancelled: Optional callable; the search stops once it returns True.
+
+    Yields:
+        TeamResult, each better than the last.
+
+    Raises:
+        ValueError: For unknown or too many required members.
+    """
+    started = time.monotonic()
+    problem = TeamProblem(df, generations, allow_legendary, required, size)
+    score, picks = greedy_team(problem)
+    yield problem.team_result(score, picks, started)
+    if problem.slots == 0 or not len(problem.profiles):
+        return
+
+    # Not fork: the Team Builder window runs this from a thread of the Qt
+    # process, and a forked child can inherit locks held by its other threads
+    ctx = multiprocessing.get_context('spawn')
+    shared_best = ctx.Value('q', score)
+    stop = ctx.Value('b', 0)
+    improvements = ctx.Queue()
+    initargs = (problem.profiles, problem.counts, problem.base, problem.slots, shared_best, stop,
+                improvements, started + time_limit)
+    best = score
+
+    def drain():
+        nonlocal best
+        while True:
+            try:
+                found, found_picks = improvements.get_nowait()
+            except Empty:
+                return
+            if found > best:
+                best = found
+                yield problem.team_result(found, found_picks, started)
+
+    if workers == 0:
+        _init_worker(*initargs)
+        for first in range(len(problem.profiles)):
+            if _search_subtree(first)[2] or (cancelled and cancelled()):
+                break
+            yield from drain()
+        # Items put by this process can take a moment to reach the queue
+        time.sleep(poll_interval)
+        yield from drain()
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=ctx,
+                               initializer=_init_worker, initargs=initargs)
+    try:
+        pending = {pool.submit(_search_subtree, first) for first in range(len(problem.profiles))}
+        while pending and not (cancelled and cancelled()):
+            done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+            yield from drain()
+        yield from drain()
+    finally:
+        stop.value = 1
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search for the team with the best type coverage.')
+    parser.add_argument('--gen', type=int, nargs='*', help='allowed generations')
+    parser.add_argument('--no-legendary', action='store_true', help='exclude legendary Pokémon')
+    parser.add_argument('--require', nargs='*', default=[], help='Pokémon that must be on the team')
+    parser.add_argument('--size', type=int, default=TEAM_SIZE, help='team size')
+    parser.add_argument('--workers', type=int, help='worker processes (0 = in-process, default = CPU count)')
+    parser.add_argument('--time-limit', type=float, default=30.0, help='seconds')
+    args = parser.parse_args(argv)
+
+    from data_store import get_store
+    result = None
+    try:
+        for result in search_teams(get_store().df, args.gen, not args.no_legendary, args.require,
+                                   args.size, args.workers, args.time_limit):
+            print(f'[{result.elapsed:7.2f}s] score {result.score:3d}: {", ".join(result.names)}')
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(f'  hits super-effectively: {", ".join(result.offense)}')
+    print(f'  resists: {", ".join(result.resisted)}')
+    print(f'  stacked weaknesses: {", ".join(result.stacked) or "none"}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
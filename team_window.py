@@ -0,0 +1,176 @@
+import os
+from PySide6.QtWidgets import (
+    QWidget, QLabel, QPushButton, QComboBox, QLineEdit, QVBoxLayout, QHBoxLayout,
+    QCheckBox, QMessageBox
+)
+from PySide6.QtGui import QIcon, QFontDatabase, QFont
+from PySide6.QtCore import Qt, QThread, Signal
+from data_store import get_store
+from raster_cache import add_shadow, paint_background
+from instrumentation import timed
+from team_builder import search_teams, TEAM_SIZE
+
+# Seconds the GUI lets a team search run before settling for the best so far
+GUI_TIME_LIMIT = 20.0
+
+
+class TeamSearchThread(QThread):
+    """Runs search_teams() off the GUI thread.
+
+    ``improved`` is emitted with each better TeamResult and ``failed`` with an
+    error message; requestInterruption() stops the search.
+    """
+
+    improved = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, df, parent=None, **options):
+        super().__init__(parent)
+        self.df = df
+        self.options = options
+
+    def run(self):
+        search = search_teams(self.df, cancelled=self.isInterruptionRequested, **self.options)
+        try:
+            for result in search:
+                self.improved.emit(result)
+        except ValueError as e:
+            self.failed.emit(str(e))
+        except Exception as e:
+            # e.g. BrokenProcessPool; the window must not be left waiting
+            self.failed.emit(f'{type(e).__name__}: {e}')
+        finally:
+            search.close()
+
+
+class TeamBuilderWindow(QWidget):
+    def __init__(self):
+        super().__init__()
+        base_dir = os.path.dirname(__file__)
+        icon_path = os.path.join(base_dir, 'ptlogo.svg')
+        if os.path.exists(icon_path):
+            self.setWindowIcon(QIcon(icon_path))
+
+        self.setWindowTitle("Team Builder")
+        self.setFixedSize(750, 450)
+
+        font_id = QFontDatabase.addApplicationFont(os.path.join(base_dir, 'font', '汉仪文黑-65W.ttf'))
+        families = QFontDatabase.applicationFontFamilies(font_id)
+        main_font = families[0] if families else ''
+
+        title_label = QLabel("Team Builder", self)
+        title_label.setFont(QFont(main_font, 20))
+        title_label.setStyleSheet("color: white;")
+        title_label.setAlignment(Qt.AlignHCenter)
+
+        container = QWidget(self)
+        container.setFixedSize(560, 330)
+        container.setStyleSheet(
+            "QWidget {"
+            "  border: 3px dashed #b0b0b0;"
+            "  border-radius: 12px;"
+            "  background-color: rgba(255,255,255,0.6);"
+            "}"
+        )
+        add_shadow(container, blur=12, offset=(0, 3), radius=12)
+
+        form_layout = QVBoxLayout(container)
+        form_layout.setContentsMargins(20, 20, 20, 20)
+        form_layout.setSpacing(10)
+
+        self.store = get_store()
+        self.generation = QComboBox()
+        self.generation.addItem("All")
+        self.generation.addItems([str(g) for g in sorted(self.store.df['generation'].unique())])
+        self.generation.setFixedHeight(36)
+        self.generation.setStyleSheet(
+            "QComboBox { padding: 5px 10px; border: 1px solid #707070; border-radius: 8px; background: white; }"
+            "QComboBox QAbstractItemView { border: none; }"
+        )
+        form_layout.addLayout(self._row("Generation:", self.generation, main_font))
+
+        self.required_entry = QLineEdit()
+        self.required_entry.setPlaceholderText("e.g. Pikachu, Garchomp")
+        self.required_entry.setFixedHeight(36)
+        self.required_entry.setStyleSheet(
+            "QLineEdit { padding: 5px 10px; border: 1px solid #707070; border-radius: 8px; background: white; }"
+        )
+        form_layout.addLayout(self._row("Required:", self.required_entry, main_font))
+
+        self.legendary_check = QCheckBox("Exclude legendary Pokémon")
+        self.legendary_check.setStyleSheet("QCheckBox { background: transparent; border: none; }")
+        form_layout.addWidget(self.legendary_check)
+
+        self.search_button = QPushButton("Find Team")
+        self.search_button.setFixedHeight(40)
+        self.search_button.setStyleSheet(
+            f"QPushButton {{ background-color: #FEE6A3; color: #7E5249; font-family: '{main_font}'; font-size: 14px; font-weight: bold; border: none; border-radius: 20px; }}"
+        )
+        self.search_button.clicked.connect(self.toggle_search)
+        form_layout.addWidget(self.search_button)
+
+        self.result_label = QLabel("")
+        self.result_label.setWordWrap(True)
+        self.result_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        self.result_label.setStyleSheet("QLabel { background: transparent; border: none; }")
+        form_layout.addWidget(self.result_label, 1)
+
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(0, 30, 0, 50)
+        main_layout.setSpacing(10)
+        main_layout.addWidget(title_label, alignment=Qt.AlignHCenter)
+        main_layout.addWidget(container, alignment=Qt.AlignHCenter | Qt.AlignTop)
+
+        self.search_thread = None
+
+    @timed('paint.team')
+    def paintEvent(self, event):
+        paint_background(self, 'bgpoke.png')
+
+    def _row(self, label_text, widget, font_family):
+        row = QHBoxLayout()
+        label = QLabel(label_text)
+        label.setFont(QFontDatabase.font(font_family, '', 12))
+        label.setStyleSheet("QLabel { background: transparent; border: none; }")
+        row.addWidget(label)
+        row.addWidget(widget)
+        return row
+
+    def toggle_search(self):
+        if self.search_thread is not None and self.search_thread.isRunning():
+            self.search_thread.requestInterruption()
+            return
+        generation = self.generation.currentText()
+        required = [n for n in self.required_entry.text().split(',') if n.strip()]
+        self.search_thread = TeamSearchThread(
+            self.store.df, self,
+            generations=None if generation == "All" else [int(generation)],
+            allow_legendary=not self.legendary_check.isChecked(),
+            required=required,
+            size=TEAM_SIZE,
+            time_limit=GUI_TIME_LIMIT,
+        )
+        self.search_thread.improved.connect(self.show_team)
+        self.search_thread.failed.connect(lambda message: QMessageBox.warning(self, "Team Builder", message))
+        self.search_thread.finished.connect(self.search_finished)
+        self.search_button.setText("Stop")
+        self.result_label.setText("Searching...")
+        self.search_thread.start()
+
+    def show_team(self, result):
+        self.result_label.setText(
+            f"<b>{', '.join(result.names)}</b><br>"
+            f"Score <span style='color:#E74C3C; font-weight:bold;'>{result.score}</span>"
+            f" ({result.elapsed:.1f}s)<br>"
+            f"Super-effective vs {len(result.offense)}/18 types, resists {len(result.resisted)}/18<br>"
+            f"Shared weaknesses: {', '.join(result.stacked) or 'none'}"
+        )
+
+    def search_finished(self):
+        self.search_button.setText("Find Team")
+
+    def closeEvent(self, event):
+        if self.search_thread is not None:
+            self.search_thread.requestInterruption()
+            self.search_thread.wait()
+        super().closeEvent(event)
@@ -0,0 +1,23 @@
+import json
+import asyncio
+from api_server import ApiServer
+
+
+def _post(server, target, body):
+    response = asyncio.run(server.respond('POST', target, {}, body))
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_batch_with_nan_record_reports_the_line():
+    body = b'\n'.join([
+        b'{"attack_type": "Fire", "defender_type1": "Grass", "stab": true, "base_damage": 80}',
+        b'{"attack_type": NaN, "defender_type1": "Grass", "base_damage": 80}',
+        b'{"attack_type": "Water", "defender_type1": "Fire", "stab": false, "base_damage": 50}',
+    ])
+    status, result = _post(ApiServer(), '/damage/batch', body)
+    assert status == 200
+    assert result['count'] == 2
+    assert [r['line'] for r in result['results']] == [1, 3]
+    assert len(result['errors']) == 1
+    assert result['errors'][0]['line'] == 2 and 'attack_type' in result['errors'][0]['error']
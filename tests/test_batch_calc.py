@@ -0,0 +1,32 @@
+import io
+import json
+from batch_calc import process_record, run_batch
+
+VALID = '{"attack_type": "Fire", "defender_type1": "Grass", "stab": true, "base_damage": 80}'
+# JSON values that are not type names; each must be reported on its own line
+NOT_TYPE_NAMES = [
+    ('{"attack_type": NaN, "defender_type1": "Grass", "base_damage": 80}', 'attack_type'),
+    ('{"attack_type": "Fire", "defender_type1": NaN, "base_damage": 80}', 'defender_type1'),
+    ('{"attack_type": true, "defender_type1": "Grass", "base_damage": 80}', 'attack_type'),
+    ('{"attack_type": "Fire", "defender_type1": "Grass", "defender_type2": true, "base_damage": 80}',
+     'defender_type2'),
+]
+
+
+def test_non_string_types_are_rejected_per_line():
+    lines = [VALID] + [line for line, _field in NOT_TYPE_NAMES] + [VALID]
+    out = io.StringIO()
+    errors = []
+    rows, rejected, _seconds = run_batch(io.StringIO('\n'.join(lines) + '\n'), out, 'jsonl',
+                                         on_error=lambda line, message: errors.append((line, message)))
+    assert (rows, rejected) == (2, len(NOT_TYPE_NAMES))
+    assert [json.loads(text)['line'] for text in out.getvalue().splitlines()] == [1, len(lines)]
+    for (line, message), (_text, field) in zip(errors, NOT_TYPE_NAMES):
+        assert field in message
+    assert [line for line, _message in errors] == list(range(2, len(NOT_TYPE_NAMES) + 2))
+
+
+def test_single_record_with_nan_type():
+    for line, field in NOT_TYPE_NAMES:
+        text, error = process_record(json.loads(line))
+        assert text == '' and field in error
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import dataset
+
+
+def _cells(series):
+    return [(type(v).__name__, 'nan' if not isinstance(v, str) and pd.isna(v) else v) for v in series]
+
+
+def test_compiled_cache_round_trips_the_source(tmp_path):
+    source = dataset.read_source()
+    cached = dataset.load_dataset(cache_dir=str(tmp_path))
+    assert list(cached.columns) == list(source.columns)
+    for col in source.columns:
+        if pd.api.types.is_numeric_dtype(source[col]):
+            np.testing.assert_array_equal(np.asarray(cached[col]), source[col].to_numpy())
+        else:
+            assert _cells(cached[col]) == _cells(source[col]), col
+
+
+def test_mixed_column_keeps_cell_types(tmp_path):
+    df = pd.DataFrame({'capture_rate': pd.Series([45, '30 (Meteorite)255 (Core)', 2.5, True, np.nan], dtype=object)})
+    xlsx = tmp_path / 'mixed.xlsx'
+    df.to_excel(xlsx, index=False)
+    cached = dataset.load_dataset(str(xlsx), str(tmp_path / 'cache'))
+    assert _cells(cached['capture_rate']) == _cells(dataset.read_source(str(xlsx))['capture_rate'])
+    assert [type(v) for v in cached['capture_rate'][:4]] == [int, str, float, bool]
@@ -0,0 +1,14 @@
+import os
+import dataset
+from matchups import MATRIX_PREFIX, MatchupMatrix
+
+
+def test_open_prunes_matrices_of_other_data(tmp_path):
+    df = dataset.read_source()
+    cache_dir = str(tmp_path)
+    stale = MatchupMatrix.open(df.head(40), cache_dir).stats['path']
+
+    current = MatchupMatrix.open(df.head(60), cache_dir).stats['path']
+    assert not os.path.exists(stale)
+    assert os.listdir(cache_dir) == [os.path.basename(current)]
+    assert os.path.basename(current).startswith(MATRIX_PREFIX)
@@ -0,0 +1,13 @@
+import pytest
+from query_engine import QuerySyntaxError, compile_query
+
+
+def test_unknown_field_is_reported_as_unknown():
+    with pytest.raises(QuerySyntaxError, match="unknown field 'foo'"):
+        compile_query('foo:bar')
+
+
+def test_known_numeric_field_still_checks_its_value():
+    with pytest.raises(QuerySyntaxError, match="hp expects a number, got 'bar'"):
+        compile_query('hp:bar')
+    assert compile_query('gen:1..3 bst>=500 against_fire<1').predicates